@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare reading a network byte order u32 attribute
+
+foreign:   mnl_attr_get_u32() foreign call and socket.ntohl()
+get_be32:  Attr.get_be32(), ctypes big endian type from_address()
+view:      AttrView.get_be32(), struct.Struct.unpack_from()
+"""
+
+from __future__ import print_function, absolute_import
+
+import socket, time
+
+import cpylmnl as mnl
+from cpylmnl import _attr
+
+
+ROUNDS = 500000
+
+
+def main():
+    nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN + 8)
+    nlh.put_be32(1, 0x0a000001)
+    attr = next(nlh.attributes(0))
+    view = next(mnl.NlmsgView(nlh.marshal_binary()).attributes(0))
+
+    for name, func in (("foreign", lambda: socket.ntohl(_attr.attr_get_u32(attr))),
+                       ("get_be32", attr.get_be32),
+                       ("view", view.get_be32)):
+        assert func() == 0x0a000001
+        start = time.time()
+        for i in range(ROUNDS):
+            func()
+        print("%-10s %8.0f ns/call" % (name, (time.time() - start) / ROUNDS * 1e9))
+
+
+if __name__ == '__main__':
+    main()
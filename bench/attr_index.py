@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare summing up conntrack counters by Policy and by AttrIndex
+
+A buffer of conntrack-like messages, orig counters and source address, is
+aggregated: total bytes and number of distinct source addresses.
+
+policy: iter_messages() and NlmsgView.parse_policy() reusing AttrTable
+index:  index_attributes() and AttrIndex.column(), requires numpy
+"""
+
+from __future__ import print_function, absolute_import
+
+import time
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl.linux.netfilter.nfnetlinkh as nfnl
+import cpylmnl.linux.netfilter.nfnetlink_conntrackh as nfnlct
+import cpylmnl as mnl
+
+
+NMSGS = 4096
+ROUNDS = 10
+
+
+def build():
+    buf = bytearray()
+    for i in range(NMSGS):
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
+        nlh.nlmsg_type = (nfnl.NFNL_SUBSYS_CTNETLINK << 8) | nfnlct.IPCTNL_MSG_CT_NEW
+        nlh.nlmsg_flags = netlink.NLM_F_MULTI
+        nlh.put_extra_header_as(nfnl.Nfgenmsg)
+        nest1 = nlh.nest_start(nfnlct.CTA_TUPLE_ORIG)
+        nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_IP)
+        nlh.put_be32(nfnlct.CTA_IP_V4_SRC, 0x0a000000 + i % 256)
+        nlh.put_be32(nfnlct.CTA_IP_V4_DST, 0x0a000001)
+        nlh.nest_end(nest2)
+        nlh.nest_end(nest1)
+        for t in (nfnlct.CTA_COUNTERS_ORIG, nfnlct.CTA_COUNTERS_REPLY):
+            nest1 = nlh.nest_start(t)
+            nlh.put_be64(nfnlct.CTA_COUNTERS_PACKETS, 1)
+            nlh.put_be64(nfnlct.CTA_COUNTERS_BYTES, i)
+            nlh.nest_end(nest1)
+        nlh.put_be32(nfnlct.CTA_MARK, 1)
+        buf += nlh.marshal_binary()
+    return buf
+
+
+ip_policy = mnl.Policy(nfnlct.CTA_IP_MAX, {nfnlct.CTA_IP_V4_SRC: mnl.MNL_TYPE_U32})
+tuple_policy = mnl.Policy(nfnlct.CTA_TUPLE_MAX,
+                          {nfnlct.CTA_TUPLE_IP: (mnl.MNL_TYPE_NESTED, 0, ip_policy)})
+counters_policy = mnl.Policy(nfnlct.CTA_COUNTERS_MAX,
+                             {nfnlct.CTA_COUNTERS_BYTES: mnl.MNL_TYPE_U64})
+ct_policy = mnl.Policy(nfnlct.CTA_MAX,
+                       {nfnlct.CTA_TUPLE_ORIG: (mnl.MNL_TYPE_NESTED, 0, tuple_policy),
+                        nfnlct.CTA_COUNTERS_ORIG: (mnl.MNL_TYPE_NESTED, 0, counters_policy),
+                        nfnlct.CTA_COUNTERS_REPLY: (mnl.MNL_TYPE_NESTED, 0, counters_policy)})
+ct_table = mnl.AttrTable(nfnlct.CTA_MAX)
+
+
+def policy(buf):
+    total = 0
+    srcs = set()
+    for msg in mnl.iter_messages(buf, 0, 0):
+        msg.parse_policy(nfnl.Nfgenmsg.csize(), ct_policy, ct_table)
+        total += ct_table.nested(nfnlct.CTA_COUNTERS_ORIG).get_be64(nfnlct.CTA_COUNTERS_BYTES)
+        srcs.add(ct_table.nested(nfnlct.CTA_TUPLE_ORIG).nested(nfnlct.CTA_TUPLE_IP)
+                 .get_be32(nfnlct.CTA_IP_V4_SRC))
+    return total, len(srcs)
+
+
+def index(buf):
+    idx = mnl.index_attributes(buf, nfnl.Nfgenmsg.csize(), ct_policy)
+    total = idx.column((nfnlct.CTA_COUNTERS_ORIG, nfnlct.CTA_COUNTERS_BYTES), ">u8").sum()
+    srcs = idx.column((nfnlct.CTA_TUPLE_ORIG, nfnlct.CTA_TUPLE_IP, nfnlct.CTA_IP_V4_SRC), ">u4")
+    return int(total), len(set(srcs.tolist()))
+
+
+def bench(name, func, buf):
+    assert func(buf) == (NMSGS * (NMSGS - 1) // 2, 256)
+    start = time.time()
+    for i in range(ROUNDS):
+        func(buf)
+    print("%-8s %10.0f msgs/s" % (name, NMSGS * ROUNDS / (time.time() - start)))
+
+
+def main():
+    buf = build()
+    for name, func in (("policy", policy), ("index", index)):
+        bench(name, func, buf)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare attribute validation by attr_cb and by Policy
+
+A conntrack-like message, nested tuple and counters, is validated and
+indexed including the nested attributes.
+
+attr_cb: Nlmsg.parse() and Attr.parse_nested() with callbacks calling
+         type_valid() and validate(), as nfct-dump.py
+policy:  Nlmsg.parse_policy(), AttrTable per message
+reuse:   Nlmsg.parse_policy() reusing AttrTable
+"""
+
+from __future__ import print_function, absolute_import
+
+import time
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl.linux.netfilter.nfnetlinkh as nfnl
+import cpylmnl.linux.netfilter.nfnetlink_conntrackh as nfnlct
+import cpylmnl as mnl
+
+
+ROUNDS = 20000
+
+
+def build():
+    nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
+    nlh.nlmsg_type = (nfnl.NFNL_SUBSYS_CTNETLINK << 8) | nfnlct.IPCTNL_MSG_CT_NEW
+    nlh.put_extra_header_as(nfnl.Nfgenmsg)
+    nest1 = nlh.nest_start(nfnlct.CTA_TUPLE_ORIG)
+    nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_IP)
+    nlh.put_u32(nfnlct.CTA_IP_V4_SRC, 0x0100000a)
+    nlh.put_u32(nfnlct.CTA_IP_V4_DST, 0x0200000a)
+    nlh.nest_end(nest2)
+    nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_PROTO)
+    nlh.put_u8(nfnlct.CTA_PROTO_NUM, 6)
+    nlh.put_u16(nfnlct.CTA_PROTO_SRC_PORT, 0x5000)
+    nlh.put_u16(nfnlct.CTA_PROTO_DST_PORT, 0x5000)
+    nlh.nest_end(nest2)
+    nlh.nest_end(nest1)
+    for t in (nfnlct.CTA_COUNTERS_ORIG, nfnlct.CTA_COUNTERS_REPLY):
+        nest1 = nlh.nest_start(t)
+        nlh.put_u64(nfnlct.CTA_COUNTERS_PACKETS, 1)
+        nlh.put_u64(nfnlct.CTA_COUNTERS_BYTES, 60)
+        nlh.nest_end(nest1)
+    nlh.put_u32(nfnlct.CTA_TIMEOUT, 1000)
+    nlh.put_u32(nfnlct.CTA_MARK, 1)
+    return mnl.Nlmsg(nlh.marshal_binary())
+
+
+def attr_cb_factory(maxtype, rules):
+    @mnl.attr_cb
+    def _cb(attr, tb):
+        try:
+            attr.type_valid(maxtype)
+        except OSError:
+            return mnl.MNL_CB_OK
+        attr_type = attr.get_type()
+        if attr_type in rules:
+            attr.validate(rules[attr_type])
+        tb[attr_type] = attr
+        return mnl.MNL_CB_OK
+    return _cb
+
+ip_cb = attr_cb_factory(nfnlct.CTA_IP_MAX, {nfnlct.CTA_IP_V4_SRC: mnl.MNL_TYPE_U32,
+                                            nfnlct.CTA_IP_V4_DST: mnl.MNL_TYPE_U32})
+proto_cb = attr_cb_factory(nfnlct.CTA_PROTO_MAX, {nfnlct.CTA_PROTO_NUM: mnl.MNL_TYPE_U8,
+                                                  nfnlct.CTA_PROTO_SRC_PORT: mnl.MNL_TYPE_U16,
+                                                  nfnlct.CTA_PROTO_DST_PORT: mnl.MNL_TYPE_U16})
+tuple_cb = attr_cb_factory(nfnlct.CTA_TUPLE_MAX, {nfnlct.CTA_TUPLE_IP: mnl.MNL_TYPE_NESTED,
+                                                  nfnlct.CTA_TUPLE_PROTO: mnl.MNL_TYPE_NESTED})
+counters_cb = attr_cb_factory(nfnlct.CTA_COUNTERS_MAX, {nfnlct.CTA_COUNTERS_PACKETS: mnl.MNL_TYPE_U64,
+                                                        nfnlct.CTA_COUNTERS_BYTES: mnl.MNL_TYPE_U64})
+data_attr_cb = attr_cb_factory(nfnlct.CTA_MAX, {nfnlct.CTA_TUPLE_ORIG: mnl.MNL_TYPE_NESTED,
+                                                nfnlct.CTA_COUNTERS_ORIG: mnl.MNL_TYPE_NESTED,
+                                                nfnlct.CTA_COUNTERS_REPLY: mnl.MNL_TYPE_NESTED,
+                                                nfnlct.CTA_TIMEOUT: mnl.MNL_TYPE_U32,
+                                                nfnlct.CTA_MARK: mnl.MNL_TYPE_U32})
+
+def attr_cb(nlh):
+    tb = {}
+    nlh.parse(nfnl.Nfgenmsg.csize(), data_attr_cb, tb)
+    tuple_tb = {}
+    tb[nfnlct.CTA_TUPLE_ORIG].parse_nested(tuple_cb, tuple_tb)
+    ip_tb = {}
+    tuple_tb[nfnlct.CTA_TUPLE_IP].parse_nested(ip_cb, ip_tb)
+    proto_tb = {}
+    tuple_tb[nfnlct.CTA_TUPLE_PROTO].parse_nested(proto_cb, proto_tb)
+    for t in (nfnlct.CTA_COUNTERS_ORIG, nfnlct.CTA_COUNTERS_REPLY):
+        counters_tb = {}
+        tb[t].parse_nested(counters_cb, counters_tb)
+    return tb
+
+
+ip_policy = mnl.Policy(nfnlct.CTA_IP_MAX, {nfnlct.CTA_IP_V4_SRC: mnl.MNL_TYPE_U32,
+                                           nfnlct.CTA_IP_V4_DST: mnl.MNL_TYPE_U32})
+proto_policy = mnl.Policy(nfnlct.CTA_PROTO_MAX, {nfnlct.CTA_PROTO_NUM: mnl.MNL_TYPE_U8,
+                                                 nfnlct.CTA_PROTO_SRC_PORT: mnl.MNL_TYPE_U16,
+                                                 nfnlct.CTA_PROTO_DST_PORT: mnl.MNL_TYPE_U16})
+tuple_policy = mnl.Policy(nfnlct.CTA_TUPLE_MAX,
+                          {nfnlct.CTA_TUPLE_IP: (mnl.MNL_TYPE_NESTED, 0, ip_policy),
+                           nfnlct.CTA_TUPLE_PROTO: (mnl.MNL_TYPE_NESTED, 0, proto_policy)})
+counters_policy = mnl.Policy(nfnlct.CTA_COUNTERS_MAX,
+                             {nfnlct.CTA_COUNTERS_PACKETS: mnl.MNL_TYPE_U64,
+                              nfnlct.CTA_COUNTERS_BYTES: mnl.MNL_TYPE_U64})
+ct_policy = mnl.Policy(nfnlct.CTA_MAX,
+                       {nfnlct.CTA_TUPLE_ORIG: (mnl.MNL_TYPE_NESTED, 0, tuple_policy),
+                        nfnlct.CTA_COUNTERS_ORIG: (mnl.MNL_TYPE_NESTED, 0, counters_policy),
+                        nfnlct.CTA_COUNTERS_REPLY: (mnl.MNL_TYPE_NESTED, 0, counters_policy),
+                        nfnlct.CTA_TIMEOUT: mnl.MNL_TYPE_U32,
+                        nfnlct.CTA_MARK: mnl.MNL_TYPE_U32})
+
+def policy(nlh):
+    return nlh.parse_policy(nfnl.Nfgenmsg.csize(), ct_policy)
+
+
+ct_table = mnl.AttrTable(nfnlct.CTA_MAX)
+
+def reuse(nlh):
+    return nlh.parse_policy(nfnl.Nfgenmsg.csize(), ct_policy, ct_table)
+
+
+def bench(name, func, nlh):
+    start = time.time()
+    for i in range(ROUNDS):
+        func(nlh)
+    print("%-8s %10.0f msgs/s" % (name, ROUNDS / (time.time() - start)))
+
+
+def main():
+    nlh = build()
+    for name, func in (("attr_cb", attr_cb), ("policy", policy), ("reuse", reuse)):
+        bench(name, func, nlh)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare decoding attributes by ctypes Attr and by AttrView
+
+Each message has 16 u32 attributes, which are summed up.
+
+ctypes: cb_run() with nlmsg_cb, Nlmsg.attributes() and Attr.get_u32()
+views:  iter_messages(), NlmsgView.attributes() and AttrView.get_u32()
+
+The peak memory allocated while decoding a datagram is also reported.
+"""
+
+from __future__ import print_function, absolute_import
+
+import time, tracemalloc
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+NMSGS = 64
+NATTRS = 16
+ROUNDS = 500
+
+
+def build():
+    buf = bytearray()
+    for i in range(NMSGS):
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN + NATTRS * 8)
+        nlh.nlmsg_type = netlink.NLMSG_MIN_TYPE
+        nlh.nlmsg_flags = netlink.NLM_F_MULTI
+        nlh.nlmsg_seq = 1
+        for j in range(NATTRS):
+            nlh.put_u32(j + 1, j)
+        buf += nlh.marshal_binary()
+    return buf
+
+
+@mnl.nlmsg_cb
+def data_cb(nlh, total):
+    for attr in nlh.attributes(0):
+        total[0] += attr.get_u32()
+    return mnl.MNL_CB_OK
+
+
+def ctypes_attrs(buf):
+    total = [0]
+    mnl.cb_run(buf, 1, 0, data_cb, total)
+    return total[0]
+
+
+def views(buf):
+    total = 0
+    for msg in mnl.iter_messages(buf, 1, 0):
+        for attr in msg.attributes(0):
+            total += attr.get_u32()
+    return total
+
+
+def bench(name, func, buf):
+    assert func(buf) == NMSGS * NATTRS * (NATTRS - 1) // 2
+    tracemalloc.start()
+    func(buf)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.time()
+    for i in range(ROUNDS):
+        func(buf)
+    print("%-8s %10.0f attrs/s, %6d bytes peak per datagram"
+          % (name, NMSGS * NATTRS * ROUNDS / (time.time() - start), peak))
+
+
+def main():
+    buf = build()
+    for name, func in (("ctypes", ctypes_attrs), ("views", views)):
+        bench(name, func, buf)
+
+
+if __name__ == '__main__':
+    main()
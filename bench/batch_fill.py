@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare filling a batch by NlmsgBatch and by PyNlmsgBatch
+
+A 64 bytes message is copied into current_v(), then next_batch() and
+reset() on overflow, without sending.
+
+libmnl:  NlmsgBatch, ctypes array cast per message
+python:  PyNlmsgBatch, memoryview slice per message
+header:  PyNlmsgBatch.put_header(), Nlmsg at the current offset
+"""
+
+from __future__ import print_function, absolute_import
+
+import time
+
+import cpylmnl as mnl
+
+
+ROUNDS = 100000
+
+
+def message():
+    nlh = mnl.Nlmsg.put_new_header(64)
+    nlh.nlmsg_len = 64
+    return bytes(nlh.marshal_binary())
+
+
+def fill(b, msg):
+    n = len(msg)
+    batches = 0
+    for i in range(ROUNDS):
+        b.current_v()[:n] = msg
+        if not b.next_batch():
+            batches += 1
+            b.reset()
+    return batches
+
+
+def put_header(b):
+    batches = 0
+    for i in range(ROUNDS):
+        b.put_header().nlmsg_len = 64
+        if not b.next_batch():
+            batches += 1
+            b.reset()
+    return batches
+
+
+def bench(name, func, *args):
+    start = time.time()
+    batches = func(*args)
+    print("%-7s %6.0f ns/msg" % (name, (time.time() - start) * 1e9 / ROUNDS))
+    return batches
+
+
+def main():
+    msg = message()
+    size = mnl.MNL_SOCKET_BUFFER_SIZE
+    with mnl.NlmsgBatch(size * 2, size) as b:
+        n = bench("libmnl", fill, b, msg)
+    with mnl.PyNlmsgBatch(size * 2, size) as b:
+        assert bench("python", fill, b, msg) == n
+    with mnl.PyNlmsgBatch(size * 2, size) as b:
+        assert bench("header", put_header, b) == n
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""per-datagram overhead of cb_run2() and CallbackTable.run()
+
+An ACK datagram, which nfct-create-batch.py receives per failed message, is
+run with a NLMSG_ERROR control callback.
+
+cb_run2:       builds the control callback array per call
+CallbackTable: compiled once, the ctypes array over the buffer is reused
+"""
+
+from __future__ import print_function, absolute_import
+
+import struct, time
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+ROUNDS = 200000
+
+
+def build():
+    nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN * 2 + 4)
+    nlh.nlmsg_type = netlink.NLMSG_ERROR
+    nlh.nlmsg_seq = 1
+    buf = nlh.marshal_binary()
+    # ACK, error 0 and no NLM_F_ACK in the request header
+    buf[mnl.MNL_NLMSG_HDRLEN:mnl.MNL_NLMSG_HDRLEN + 4] = struct.pack("i", 0)
+    return buf
+
+
+@mnl.nlmsg_cb
+def cb_err(nlh, data):
+    return mnl.MNL_CB_OK
+
+
+CB_CTL_ARRAY = {netlink.NLMSG_ERROR: cb_err}
+
+
+def bench(name, func, buf):
+    start = time.time()
+    for i in range(ROUNDS):
+        func(buf)
+    elapsed = time.time() - start
+    print("%-14s %10.0f datagrams/s %6.2f us/datagram" % (name, ROUNDS / elapsed, elapsed / ROUNDS * 1e6))
+
+
+def main():
+    buf = build()
+    table = mnl.CallbackTable(1, 0, None, None, CB_CTL_ARRAY)
+    bench("cb_run2", lambda b: mnl.cb_run2(b, 1, 0, None, None, CB_CTL_ARRAY), buf)
+    bench("CallbackTable", table.run, buf)
+
+
+if __name__ == '__main__':
+    main()
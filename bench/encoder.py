@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare building conntrack messages by Nlmsg puts and by MessageEncoder
+
+Messages like put_msg() of nfct-create-batch.py are built into a buffer.
+
+put:     put_header(), nest_start(), put_u*() and nest_end()
+encoder: MessageEncoder.encode_into()
+"""
+
+from __future__ import print_function, absolute_import
+
+import time, socket
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl.linux.netfilter.nfnetlinkh as nfnl
+import cpylmnl.linux.netfilter.nfnetlink_conntrackh as nfnlct
+import cpylmnl as mnl
+
+
+ROUNDS = 20000
+CT_TYPE = (nfnl.NFNL_SUBSYS_CTNETLINK << 8) | nfnlct.IPCTNL_MSG_CT_NEW
+CT_FLAGS = netlink.NLM_F_REQUEST | netlink.NLM_F_CREATE | netlink.NLM_F_ACK
+
+
+def put(buf, i):
+    nlh = mnl.Nlmsg(buf)
+    nlh.put_header()
+    nlh.nlmsg_type = CT_TYPE
+    nlh.nlmsg_flags = CT_FLAGS
+    nlh.nlmsg_seq = i
+    nfh = nlh.put_extra_header_as(nfnl.Nfgenmsg)
+    nfh.nfgen_family = socket.AF_INET
+    nfh.version = nfnl.NFNETLINK_V0
+    for t, sport, dport in ((nfnlct.CTA_TUPLE_ORIG, i, 1025), (nfnlct.CTA_TUPLE_REPLY, 1025, i)):
+        nest1 = nlh.nest_start(t)
+        nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_IP)
+        nlh.put_be32(nfnlct.CTA_IP_V4_SRC, 0x01010101)
+        nlh.put_be32(nfnlct.CTA_IP_V4_DST, 0x02020202)
+        nlh.nest_end(nest2)
+        nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_PROTO)
+        nlh.put_u8(nfnlct.CTA_PROTO_NUM, socket.IPPROTO_TCP)
+        nlh.put_be16(nfnlct.CTA_PROTO_SRC_PORT, sport)
+        nlh.put_be16(nfnlct.CTA_PROTO_DST_PORT, dport)
+        nlh.nest_end(nest2)
+        nlh.nest_end(nest1)
+    nlh.put_be32(nfnlct.CTA_TIMEOUT, 1000)
+    return nlh.nlmsg_len
+
+
+ip_policy = mnl.Policy(nfnlct.CTA_IP_MAX, {nfnlct.CTA_IP_V4_SRC: mnl.MNL_TYPE_U32,
+                                           nfnlct.CTA_IP_V4_DST: mnl.MNL_TYPE_U32})
+proto_policy = mnl.Policy(nfnlct.CTA_PROTO_MAX, {nfnlct.CTA_PROTO_NUM: mnl.MNL_TYPE_U8,
+                                                 nfnlct.CTA_PROTO_SRC_PORT: mnl.MNL_TYPE_U16,
+                                                 nfnlct.CTA_PROTO_DST_PORT: mnl.MNL_TYPE_U16})
+tuple_policy = mnl.Policy(nfnlct.CTA_TUPLE_MAX,
+                          {nfnlct.CTA_TUPLE_IP: (mnl.MNL_TYPE_NESTED, 0, ip_policy),
+                           nfnlct.CTA_TUPLE_PROTO: (mnl.MNL_TYPE_NESTED, 0, proto_policy)})
+ct_policy = mnl.Policy(nfnlct.CTA_MAX,
+                       {nfnlct.CTA_TUPLE_ORIG: (mnl.MNL_TYPE_NESTED, 0, tuple_policy),
+                        nfnlct.CTA_TUPLE_REPLY: (mnl.MNL_TYPE_NESTED, 0, tuple_policy),
+                        nfnlct.CTA_TIMEOUT: mnl.MNL_TYPE_U32})
+encoder = mnl.MessageEncoder(ct_policy, CT_TYPE, CT_FLAGS, ">")
+nfh = nfnl.Nfgenmsg()
+nfh.nfgen_family = socket.AF_INET
+nfh.version = nfnl.NFNETLINK_V0
+
+
+def encode(buf, i):
+    def tuple_attrs(sport, dport):
+        return {nfnlct.CTA_TUPLE_IP: {nfnlct.CTA_IP_V4_SRC: 0x01010101,
+                                      nfnlct.CTA_IP_V4_DST: 0x02020202},
+                nfnlct.CTA_TUPLE_PROTO: {nfnlct.CTA_PROTO_NUM: socket.IPPROTO_TCP,
+                                         nfnlct.CTA_PROTO_SRC_PORT: sport,
+                                         nfnlct.CTA_PROTO_DST_PORT: dport}}
+    return encoder.encode_into(buf, {nfnlct.CTA_TUPLE_ORIG: tuple_attrs(i, 1025),
+                                     nfnlct.CTA_TUPLE_REPLY: tuple_attrs(1025, i),
+                                     nfnlct.CTA_TIMEOUT: 1000}, nfh, seq=i)
+
+
+def bench(name, func):
+    buf = bytearray(mnl.MNL_SOCKET_BUFFER_SIZE)
+    start = time.time()
+    for i in range(ROUNDS):
+        n = func(buf, i)
+    print("%-8s %10.0f msgs/s" % (name, ROUNDS / (time.time() - start)))
+    return buf[:n]
+
+
+def main():
+    assert bench("put", put) == bench("encoder", encode)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare cb_run() and iter_messages() over a dump-like datagram
+
+A datagram of RTM_NEWLINK-sized messages followed by NLMSG_DONE is parsed,
+reading nlmsg_type of each data message.
+
+cb_run:        libmnl callback runqueue, ctypes callback per message
+iter_messages: pure Python walk by struct.unpack_from(), NlmsgView
+"""
+
+from __future__ import print_function, absolute_import
+
+import time
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl.linux.rtnetlinkh as rtnl
+import cpylmnl as mnl
+
+
+NMSGS = 64
+ROUNDS = 2000
+PAYLOAD = b"x" * 1000
+
+
+def build():
+    buf = bytearray()
+    for i in range(NMSGS):
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN + mnl.MNL_ALIGN(4 + len(PAYLOAD)))
+        nlh.nlmsg_type = rtnl.RTM_NEWLINK
+        nlh.nlmsg_flags = netlink.NLM_F_MULTI
+        nlh.nlmsg_seq = 1
+        nlh.put_str(1, PAYLOAD)
+        buf += nlh.marshal_binary()
+    nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN + 4)
+    nlh.nlmsg_type = netlink.NLMSG_DONE
+    nlh.nlmsg_flags = netlink.NLM_F_MULTI
+    nlh.nlmsg_seq = 1
+    buf += nlh.marshal_binary()
+    return buf
+
+
+@mnl.nlmsg_cb
+def data_cb(nlh, types):
+    types.append(nlh.nlmsg_type)
+    return mnl.MNL_CB_OK
+
+
+def cb_run(buf):
+    types = []
+    mnl.cb_run(buf, 1, 0, data_cb, types)
+    return types
+
+
+def iter_messages(buf):
+    return [msg.nlmsg_type for msg in mnl.iter_messages(buf, 1, 0)]
+
+
+def bench(name, func, buf):
+    assert len(func(buf)) == NMSGS
+    start = time.time()
+    for i in range(ROUNDS):
+        func(buf)
+    print("%-14s %10.0f msgs/s" % (name, NMSGS * ROUNDS / (time.time() - start)))
+
+
+def main():
+    buf = build()
+    for name, func in (("cb_run", cb_run), ("iter_messages", iter_messages)):
+        bench(name, func, buf)
+
+
+if __name__ == '__main__':
+    main()
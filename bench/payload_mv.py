@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare getting an attribute payload by get_payload_v() and get_payload_mv()
+
+A 16 bytes payload, IPv6 address, is got and converted to an int.
+
+v:  int.from_bytes(bytes(bytearray(Attr.get_payload_v())))
+mv: int.from_bytes(Attr.get_payload_mv())
+"""
+
+from __future__ import print_function, absolute_import
+
+import time, ctypes
+
+import cpylmnl as mnl
+
+
+ROUNDS = 100000
+
+
+def build():
+    nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
+    addr = b"\x20\x01\x0d\xb8" + b"\0" * 11 + b"\1"
+    nlh.put(1, (ctypes.c_ubyte * len(addr)).from_buffer_copy(addr))
+    return mnl.Nlmsg(nlh.marshal_binary())
+
+
+def v(attr):
+    return int.from_bytes(bytes(bytearray(attr.get_payload_v())), "big")
+
+
+def mv(attr):
+    return int.from_bytes(attr.get_payload_mv(), "big")
+
+
+def bench(name, func, attr):
+    assert func(attr) == 0x20010db8000000000000000000000001
+    start = time.time()
+    for i in range(ROUNDS):
+        func(attr)
+    print("%-4s %8.0f ns" % (name, (time.time() - start) * 1e9 / ROUNDS))
+
+
+def main():
+    nlh = build()
+    attr = next(nlh.attributes(0))
+    for name, func in (("v", v), ("mv", mv)):
+        bench(name, func, attr)
+
+
+if __name__ == '__main__':
+    main()
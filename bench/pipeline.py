@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare serial request/response with Pipeline
+
+NLMSG_NOOP requests with NLM_F_ACK are sent to NETLINK_ROUTE.
+
+serial:      send a request, recv and cb_run() until MNL_CB_STOP, repeat
+pipeline:    submit all requests, then wait for them
+submit_many: submit all requests by a sendmsg(), then wait for them
+"""
+
+from __future__ import print_function, absolute_import
+
+import sys, time
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+COUNT = 20000
+WINDOW = 64
+
+
+def build():
+    msgs = []
+    for i in range(WINDOW):
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+        nlh.nlmsg_type = netlink.NLMSG_NOOP
+        nlh.nlmsg_flags = netlink.NLM_F_ACK
+        msgs.append(nlh)
+    return msgs
+
+
+def serial(nl, msgs):
+    portid = nl.get_portid()
+    buf = bytearray(mnl.MNL_SOCKET_BUFFER_SIZE)
+    seq = 0
+    for i in range(COUNT // WINDOW):
+        for nlh in msgs:
+            seq += 1
+            nlh.nlmsg_seq = seq
+            nl.send_nlmsg(nlh)
+            ret = mnl.MNL_CB_OK
+            while ret > mnl.MNL_CB_STOP:
+                n = nl.recv_into(buf)
+                ret = mnl.cb_run(buf[:n], seq, portid, None, None)
+
+
+def pipeline(nl, msgs):
+    p = mnl.Pipeline(nl)
+    for i in range(COUNT // WINDOW):
+        txs = [p.submit(nlh) for nlh in msgs]
+        for tx in txs:
+            tx.result()
+
+
+def submit_many(nl, msgs):
+    p = mnl.Pipeline(nl)
+    for i in range(COUNT // WINDOW):
+        for tx in p.submit_many(msgs):
+            tx.result()
+
+
+def main():
+    msgs = build()
+    for name, func in (("serial", serial), ("pipeline", pipeline), ("submit_many", submit_many)):
+        with mnl.Socket(netlink.NETLINK_ROUTE) as nl:
+            nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+            start = time.time()
+            func(nl, msgs)
+            print("%-12s %10.0f requests/s" % (name, COUNT // WINDOW * WINDOW / (time.time() - start)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare putting an IPv6 address from bytes by put() and by put_bytes()
+
+put:       Nlmsg.put() with a ctypes array from_buffer_copy()
+put_bytes: Nlmsg.put_bytes() with the bytes
+"""
+
+from __future__ import print_function, absolute_import
+
+import time, socket, ctypes
+
+import cpylmnl as mnl
+
+
+ROUNDS = 100000
+ADDR = socket.inet_pton(socket.AF_INET6, "2001:db8::1")
+
+
+def put(nlh):
+    nlh.put(1, (ctypes.c_ubyte * len(ADDR)).from_buffer_copy(ADDR))
+
+
+def put_bytes(nlh):
+    nlh.put_bytes(1, ADDR)
+
+
+def bench(name, func):
+    nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
+    start = time.time()
+    for i in range(ROUNDS):
+        nlh.nlmsg_len = mnl.MNL_NLMSG_HDRLEN
+        func(nlh)
+    print("%-10s %6.0f ns" % (name, (time.time() - start) * 1e9 / ROUNDS))
+    return nlh.marshal_binary()
+
+
+def main():
+    assert bench("put", put) == bench("put_bytes", put_bytes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare per datagram Socket.recv_into() loop with Socket.recv_many()
+
+Datagrams are sent from a plain NETLINK_USERSOCK socket to a cpylmnl Socket,
+then only the receiving side is timed.
+"""
+
+from __future__ import print_function, absolute_import
+
+import sys, socket, struct, time
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+BURST = 256
+ROUNDS = 200
+MAX_MSGS = 64
+
+
+def fill(sender, portid, payload):
+    for i in range(BURST):
+        sender.sendto(payload, (portid, 0))
+
+
+def recv_loop(nl):
+    buf = bytearray(mnl.MNL_SOCKET_BUFFER_SIZE)
+    for i in range(BURST):
+        nl.recv_into(buf)
+
+
+def recv_many(nl):
+    n = 0
+    while n < BURST:
+        n += len(nl.recv_many(MAX_MSGS))
+
+
+def bench(name, func, nl, sender, payload):
+    elapsed = 0.0
+    for i in range(ROUNDS):
+        fill(sender, nl.get_portid(), payload)
+        start = time.time()
+        func(nl)
+        elapsed += time.time() - start
+    print("%-12s %10.0f datagrams/s" % (name, BURST * ROUNDS / elapsed))
+
+
+def main():
+    payload = struct.pack("IHHII", 16, netlink.NLMSG_NOOP, 0, 0, 0)
+    sender = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, netlink.NETLINK_USERSOCK)
+    sender.bind((0, 0))
+
+    with mnl.Socket(netlink.NETLINK_USERSOCK) as nl:
+        nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        bench("recv_into", recv_loop, nl, sender, payload)
+        bench("recv_many", recv_many, nl, sender, payload)
+
+    sender.close()
+
+
+if __name__ == '__main__':
+    main()
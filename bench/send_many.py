@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare ways to send prebuilt Nlmsg
+
+NLMSG_NOOP requests without NLM_F_ACK are sent to NETLINK_NETFILTER, which
+the kernel consumes without replying.
+
+send_nlmsg: a send_nlmsg() call per message
+copy:       copy messages into a buffer and sendto() it
+send_many:  sendmsg() with iovec over the messages
+send_mmsg:  sendmmsg(), a datagram per message
+"""
+
+from __future__ import print_function, absolute_import
+
+import sys, time
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+BURST = 64
+ROUNDS = 2000
+PAYLOAD = b"x" * 60
+
+
+def build():
+    msgs = []
+    for i in range(BURST):
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN + mnl.MNL_ALIGN(4 + len(PAYLOAD)))
+        nlh.nlmsg_type = netlink.NLMSG_NOOP
+        nlh.nlmsg_seq = i
+        nlh.put_str(1, PAYLOAD)
+        msgs.append(nlh)
+    return msgs
+
+
+def send_nlmsg(nl, msgs):
+    for nlh in msgs:
+        nl.send_nlmsg(nlh)
+
+
+def copy(nl, msgs):
+    buf = bytearray()
+    for nlh in msgs:
+        buf += nlh.marshal_binary()
+    nl.sendto(buf)
+
+
+def send_many(nl, msgs):
+    nl.send_many(msgs)
+
+
+def send_mmsg(nl, msgs):
+    nl.send_mmsg(msgs)
+
+
+def bench(name, func, nl, msgs):
+    start = time.time()
+    for i in range(ROUNDS):
+        func(nl, msgs)
+    print("%-12s %10.0f msgs/s" % (name, BURST * ROUNDS / (time.time() - start)))
+
+
+def main():
+    msgs = build()
+    with mnl.Socket(netlink.NETLINK_NETFILTER) as nl:
+        nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        for name, func in (("send_nlmsg", send_nlmsg), ("copy", copy),
+                           ("send_many", send_many), ("send_mmsg", send_mmsg)):
+            bench(name, func, nl, msgs)
+
+
+if __name__ == '__main__':
+    main()
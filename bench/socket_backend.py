@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare "libmnl" and "python" Socket backends
+
+send: NLMSG_NOOP requests with NLM_F_ACK to the kernel and receive the ACKs
+recv: receive datagrams queued by a plain NETLINK_USERSOCK socket
+"""
+
+from __future__ import print_function, absolute_import
+
+import sys, socket, struct, time
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+COUNT = 100000
+BURST = 256
+
+
+def bench_send(backend):
+    with mnl.Socket(netlink.NETLINK_NETFILTER, backend=backend) as nl:
+        nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        req = bytearray(struct.pack("IHHII", 16, netlink.NLMSG_NOOP, netlink.NLM_F_ACK, 1, 0))
+        buf = bytearray(mnl.MNL_SOCKET_BUFFER_SIZE)
+        start = time.time()
+        for i in range(COUNT):
+            nl.sendto(req)
+            nl.recv_into(buf)
+        return COUNT / (time.time() - start)
+
+
+def bench_recv(backend):
+    sender = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, netlink.NETLINK_USERSOCK)
+    sender.bind((0, 0))
+    payload = struct.pack("IHHII", 16, netlink.NLMSG_NOOP, 0, 0, 0)
+    elapsed = 0.0
+    with mnl.Socket(netlink.NETLINK_USERSOCK, backend=backend) as nl:
+        nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        portid = nl.get_portid()
+        buf = bytearray(mnl.MNL_SOCKET_BUFFER_SIZE)
+        for j in range(COUNT // BURST):
+            for i in range(BURST):
+                sender.sendto(payload, (portid, 0))
+            start = time.time()
+            for i in range(BURST):
+                nl.recv_into(buf)
+            elapsed += time.time() - start
+    sender.close()
+    return BURST * (COUNT // BURST) / elapsed
+
+
+def main():
+    for backend in ("libmnl", "python"):
+        print("%-8s send+ack %10.0f msgs/s  recv %10.0f msgs/s"
+              % (backend, bench_send(backend), bench_recv(backend)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""overhead of Socket counters
+
+Datagrams queued by a plain NETLINK_USERSOCK socket are received by
+Socket.recv_into() with the counters disabled and enabled.
+"""
+
+from __future__ import print_function, absolute_import
+
+import sys, socket, struct, time
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+COUNT = 100000
+BURST = 256
+
+
+def bench_recv(stats):
+    sender = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, netlink.NETLINK_USERSOCK)
+    sender.bind((0, 0))
+    payload = struct.pack("IHHII", 16, netlink.NLMSG_NOOP, 0, 0, 0)
+    elapsed = 0.0
+    with mnl.Socket(netlink.NETLINK_USERSOCK) as nl:
+        nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        nl.enable_stats(stats)
+        portid = nl.get_portid()
+        buf = bytearray(mnl.MNL_SOCKET_BUFFER_SIZE)
+        for j in range(COUNT // BURST):
+            for i in range(BURST):
+                sender.sendto(payload, (portid, 0))
+            start = time.time()
+            for i in range(BURST):
+                nl.recv_into(buf)
+            elapsed += time.time() - start
+    sender.close()
+    return BURST * (COUNT // BURST) / elapsed
+
+
+def main():
+    for stats in (False, True):
+        print("stats %-5s recv %10.0f msgs/s" % (stats, bench_recv(stats)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""compare building nfnetlink_queue verdicts by Nlmsg and by MessageTemplate
+
+build:    nfq_build_verdict() of nf-queue.py, put_header(),
+          put_extra_header_as() and put() per verdict
+template: MessageTemplate.render_into() patching verdict and id
+"""
+
+from __future__ import print_function, absolute_import
+
+import time, socket
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl.linux.netfilter.nfnetlinkh as nfnl
+import cpylmnl.linux.netfilter.nfnetlink_queueh as nfqnl
+import cpylmnl.linux.netfilterh as nf
+import cpylmnl as mnl
+
+
+ROUNDS = 100000
+QUEUE_NUM = 1
+
+
+def build_verdict(buf, packet_id, queue_num, verd):
+    nlh = mnl.Nlmsg(buf)
+    nlh.put_header()
+    nlh.nlmsg_type = (nfnl.NFNL_SUBSYS_QUEUE << 8) | nfqnl.NFQNL_MSG_VERDICT
+    nlh.nlmsg_flags = netlink.NLM_F_REQUEST
+    nfg = nlh.put_extra_header_as(nfnl.Nfgenmsg)
+    nfg.nfgen_family = socket.AF_UNSPEC
+    nfg.version = nfnl.NFNETLINK_V0
+    nfg.res_id = socket.htons(queue_num)
+
+    vh = nfqnl.NfqnlMsgVerdictHdr()
+    vh.verdict = socket.htonl(verd)
+    vh.id = socket.htonl(packet_id)
+    nlh.put(nfqnl.NFQA_VERDICT_HDR, vh)
+    return nlh
+
+
+def build(buf, packet_id):
+    build_verdict(buf, packet_id, QUEUE_NUM, nf.NF_ACCEPT)
+
+
+tmpl = mnl.MessageTemplate(build_verdict(bytearray(256), 0, QUEUE_NUM, nf.NF_ACCEPT))
+offset = tmpl.attr_offset(nfnl.Nfgenmsg.csize(), nfqnl.NFQA_VERDICT_HDR)
+tmpl.add_field("verdict", offset + nfqnl.NfqnlMsgVerdictHdr.verdict.offset, ">I")
+tmpl.add_field("id", offset + nfqnl.NfqnlMsgVerdictHdr.id.offset, ">I")
+
+def template(buf, packet_id):
+    tmpl.render_into(buf, verdict=nf.NF_ACCEPT, id=packet_id)
+
+
+def bench(name, func):
+    buf = bytearray(256)
+    start = time.time()
+    for i in range(ROUNDS):
+        func(buf, i)
+    print("%-8s %8.0f ns/verdict" % (name, (time.time() - start) * 1e9 / ROUNDS))
+    return buf[:len(tmpl)]
+
+
+def main():
+    assert bench("build", build) == bench("template", template)
+
+
+if __name__ == '__main__':
+    main()
@@ -50,7 +50,7 @@ libmnl homepage is:
 
 from __future__ import absolute_import
 
-import ctypes
+import os, errno, ctypes, select, struct
 
 from ._libmnlh import *
 
@@ -61,10 +61,40 @@ from . import _attr
 from . import _nlmsg
 from . import _callback
 from . import _socket
+from . import _pysocket
 
 from .linux import netlinkh as netlink
 
 
+# read attribute payload in place, without foreign calls
+_c_uint8 = ctypes.c_uint8
+_c_uint16 = ctypes.c_uint16
+_c_uint32 = ctypes.c_uint32
+_c_uint64 = ctypes.c_uint64
+_c_be16 = ctypes.c_uint16.__ctype_be__
+_c_be32 = ctypes.c_uint32.__ctype_be__
+_c_be64 = ctypes.c_uint64.__ctype_be__
+_c_in_addr = ctypes.c_char * 4
+_c_in6_addr = ctypes.c_char * 16
+
+
+def _memoryview_at(addr, size):
+    # array types are cached by ctypes, no new type per call. cast() makes
+    # the format plain "B" from "<B" of the ctypes array.
+    return memoryview((ctypes.c_ubyte * size).from_address(addr)).cast("B")
+
+
+def _buffer_remains(obj):
+    # bytes from obj to the end of the buffer which obj was created on by
+    # Attr(buf, offset) or Nlmsg(buf, offset). None if obj was created from
+    # a pointer, the length of the buffer is unknown then.
+    base = obj._objects and obj._objects.get("ffffffff")
+    if not isinstance(base, memoryview):
+        return None
+    start = ctypes.addressof(ctypes.c_char.from_buffer(base))
+    return base.nbytes - (ctypes.addressof(obj) - start)
+
+
 class Attr(netlink.Nlattr):
     """Netlink attribute helpers
 
@@ -123,6 +153,31 @@ class Attr(netlink.Nlattr):
         """
         return _attr.attr_get_payload_v(self)
 
+    def get_payload_mv(self, remains=None):
+        """get memoryview of the attribute payload
+
+        The memoryview refers the attribute payload in the buffer without
+        copying, and can be passed directly to bytes(), int.from_bytes() or
+        struct.unpack_from(). Same as get_payload_v(), the buffer must be
+        alive while the memoryview is used. On invalid attribute length, or
+        the attribute runs over the end of the buffer, this function raises
+        OSError ERANGE.
+
+        @type remains: number
+        @param remains: bytes from the attribute to the end of the buffer,
+        derived from the buffer if None and the attribute was created by
+        Attr(buf, offset)
+
+        @rtype: memoryview
+        @return: unsigned byte memoryview of the attribute payload
+        """
+        size = self.nla_len - MNL_ATTR_HDRLEN
+        if remains is None:
+            remains = _buffer_remains(self)
+        if size < 0 or remains is not None and self.nla_len > remains:
+            raise OSError(errno.ERANGE, errno.errorcode[errno.ERANGE])
+        return _memoryview_at(ctypes.addressof(self) + MNL_ATTR_HDRLEN, size)
+
     def get_payload_as(self, c):
         """get the attribute payload as a specified instance
 
@@ -225,7 +280,7 @@ class Attr(netlink.Nlattr):
         @rtype: number
         @return: the 8-bit value of the attribute payload
         """
-        return _attr.attr_get_u8(self)
+        return _c_uint8.from_address(ctypes.addressof(self) + MNL_ATTR_HDRLEN).value
 
     def get_u16(self):
         """returns 16-bit unsigned integer attribute payload
@@ -233,7 +288,7 @@ class Attr(netlink.Nlattr):
         @rtype: number
         @return: the 16-bit value of the attribute payload
         """
-        return _attr.attr_get_u16(self)
+        return _c_uint16.from_address(ctypes.addressof(self) + MNL_ATTR_HDRLEN).value
 
     def get_u32(self):
         """returns 32-bit unsigned integer attribute payload
@@ -241,7 +296,7 @@ class Attr(netlink.Nlattr):
         @rtype: number
         @return: the 32-bit value of the attribute payload
         """
-        return _attr.attr_get_u32(self)
+        return _c_uint32.from_address(ctypes.addressof(self) + MNL_ATTR_HDRLEN).value
 
     def get_u64(self):
         """returns 64-bit unsigned integer attribute.
@@ -249,7 +304,49 @@ class Attr(netlink.Nlattr):
         @rtype: number
         @return: the 64-bit value of the attribute payload
         """
-        return _attr.attr_get_u64(self)
+        return _c_uint64.from_address(ctypes.addressof(self) + MNL_ATTR_HDRLEN).value
+
+    def get_be16(self):
+        """returns 16-bit unsigned integer attribute payload in network byte order
+
+        @rtype: number
+        @return: the 16-bit value of the attribute payload in host byte order
+        """
+        return _c_be16.from_address(ctypes.addressof(self) + MNL_ATTR_HDRLEN).value
+
+    def get_be32(self):
+        """returns 32-bit unsigned integer attribute payload in network byte order
+
+        @rtype: number
+        @return: the 32-bit value of the attribute payload in host byte order
+        """
+        return _c_be32.from_address(ctypes.addressof(self) + MNL_ATTR_HDRLEN).value
+
+    def get_be64(self):
+        """returns 64-bit unsigned integer attribute payload in network byte order
+
+        @rtype: number
+        @return: the 64-bit value of the attribute payload in host byte order
+        """
+        return _c_be64.from_address(ctypes.addressof(self) + MNL_ATTR_HDRLEN).value
+
+    def get_in_addr(self):
+        """returns IPv4 address attribute payload, struct in_addr
+
+        Use get_be32() to get it as an integer.
+
+        @rtype: bytes
+        @return: 4 bytes packed address, for socket.inet_ntoa() for example
+        """
+        return _c_in_addr.from_address(ctypes.addressof(self) + MNL_ATTR_HDRLEN).raw
+
+    def get_in6_addr(self):
+        """returns IPv6 address attribute payload, struct in6_addr
+
+        @rtype: bytes
+        @return: 16 bytes packed address, for socket.inet_ntop() for example
+        """
+        return _c_in6_addr.from_address(ctypes.addressof(self) + MNL_ATTR_HDRLEN).raw
 
     def get_str(self):
         """returns pointer to string attribute.
@@ -326,6 +423,35 @@ class Nlmsg(netlink.Nlmsghdr):
         """
         return _attr.attr_parse(self, o, cb, d)
 
+    def parse_policy(self, offset, policy, tb=None):
+        """validate and index attributes by a policy
+
+        This function validates the attributes by the policy in one pass,
+        including nested attributes which have nested policy, and returns
+        the table of AttrView indexed by attribute type. Attributes whose
+        type is greater than the maximum of the policy are ignored.
+
+        On validation error, this function raises OSError same as
+        Attr.validate().
+
+        @type offset: number
+        @param offset: offset to start parsing from (if payload is after any header)
+        @type policy: Policy
+        @param policy: validation policy
+        @type tb: AttrTable
+        @param tb: table to reuse, cleared before parsing, created if None
+
+        @rtype: AttrTable
+        @return: attributes indexed by type
+        """
+        if tb is not None:
+            tb.clear()
+        # cast from a pointer to self, the array keeps self and its buffer
+        # alive as long as the table refers it
+        buf = ctypes.cast(ctypes.pointer(self),
+                          ctypes.POINTER(ctypes.c_ubyte * self.nlmsg_len)).contents
+        return policy.parse(buf, MNL_NLMSG_HDRLEN + MNL_ALIGN(offset), self.nlmsg_len, tb)
+
     def put(self, t, d):
         """add an attribute to netlink message
 
@@ -339,6 +465,21 @@ class Nlmsg(netlink.Nlmsghdr):
         """
         _attr.attr_put(self, t, d)
 
+    def put_bytes(self, t, d):
+        """add an attribute whose payload is copied from a buffer
+
+        This function is similar to put(), but d can be any object which
+        supports the buffer protocol, bytes, bytearray, memoryview or ctypes
+        instance for example. It is copied into the message directly, without
+        creating ctypes array.
+
+        @type t: number
+        @param t: netlink attribute type that you want to add
+        @type d: buffer
+        @param d: the data that will be stored by the new attribute
+        """
+        _attr.attr_put_bytes(self, t, d)
+
     def put_u8(self, t, d):
         """add 8-bit unsigned integer attribute to netlink message
 
@@ -391,6 +532,45 @@ class Nlmsg(netlink.Nlmsghdr):
         """
         _attr.attr_put_u64(self, t, d)
 
+    def put_be16(self, t, d):
+        """add 16-bit unsigned integer attribute in network byte order
+
+        This function updates the length field of the Netlink message (nlmsg_len)
+        by adding the size (header + payload) of the new attribute.
+
+        @type t: number
+        @param t: netlink attribute type
+        @type d: number
+        @param d: 16-bit unsigned integer data in host byte order
+        """
+        _attr.attr_put(self, t, _c_be16(d))
+
+    def put_be32(self, t, d):
+        """add 32-bit unsigned integer attribute in network byte order
+
+        This function updates the length field of the Netlink message (nlmsg_len)
+        by adding the size (header + payload) of the new attribute.
+
+        @type t: number
+        @param t: netlink attribute type
+        @type d: number
+        @param d: 32-bit unsigned integer data in host byte order
+        """
+        _attr.attr_put(self, t, _c_be32(d))
+
+    def put_be64(self, t, d):
+        """add 64-bit unsigned integer attribute in network byte order
+
+        This function updates the length field of the Netlink message (nlmsg_len)
+        by adding the size (header + payload) of the new attribute.
+
+        @type t: number
+        @param t: netlink attribute type
+        @type d: number
+        @param d: 64-bit unsigned integer data in host byte order
+        """
+        _attr.attr_put(self, t, _c_be64(d))
+
     def put_str(self, t, d):
         """add string attribute to netlink message
 
@@ -450,6 +630,24 @@ class Nlmsg(netlink.Nlmsghdr):
         """
         return _attr.attr_put_check(self, l, t, d)
 
+    def put_bytes_check(self, l, t, d):
+        """add an attribute whose payload is copied from a buffer
+
+        This function is similar to put_check(), but d can be any object
+        which supports the buffer protocol, see put_bytes().
+
+        @type l: number
+        @param l: size of buffer which stores the message
+        @type t: number
+        @param t: netlink attribute type that you want to add
+        @type d: buffer
+        @param d: the data that will be stored by the new attribute
+
+        @rtype: bool
+        @return: if the attribute could be added to the message or not
+        """
+        return _attr.attr_put_bytes_check(self, l, t, d)
+
     def put_u8_check(self, l, t, d):
         """add 8-bit unsigned int attribute to netlink message
 
@@ -713,6 +911,18 @@ class Nlmsg(netlink.Nlmsghdr):
         """
         return _nlmsg.nlmsg_get_payload_v(self)
 
+    def get_payload_mv(self):
+        """get memoryview of the payload of the netlink message
+
+        The memoryview refers the payload in the buffer without copying, see
+        Attr.get_payload_mv(). On invalid message length, this function
+        raises OSError ERANGE.
+
+        @rtype: memoryview
+        @return: unsigned byte memoryview of the payload
+        """
+        return self.get_payload_offset_mv(0)
+
     def get_payload_as(self, c):
         """get the payload of the netlink message as a specified instance
 
@@ -751,6 +961,23 @@ class Nlmsg(netlink.Nlmsghdr):
         """
         return _nlmsg.nlmsg_get_payload_offset_v(self, o)
 
+    def get_payload_offset_mv(self, o):
+        """get memoryview of the payload of the message plus a given offset
+
+        On invalid message length, or the offset is beyond the message, this
+        function raises OSError ERANGE.
+
+        @type o: number
+        @param o: offset to the payload of the attributes TLV set
+
+        @rtype: memoryview
+        @return: unsigned byte memoryview of the payload plus a given offset
+        """
+        start = MNL_NLMSG_HDRLEN + MNL_ALIGN(o)
+        if o < 0 or self.nlmsg_len < start:
+            raise OSError(errno.ERANGE, errno.errorcode[errno.ERANGE])
+        return _memoryview_at(ctypes.addressof(self) + start, self.nlmsg_len - start)
+
     def get_payload_offset_as(self, o, c):
         """get the payload of the message as a specified instance
 
@@ -932,6 +1159,81 @@ class Nlmsg(netlink.Nlmsghdr):
             yield a
             a = a.next_attribute()
 
+    def get_ext_ack(self):
+        """parse NLMSG_ERROR message
+
+        This function parses the error code and the TLVs of enum
+        nlmsgerr_attrs, which follow struct nlmsgerr if NETLINK_EXT_ACK is
+        enabled. The TLVs are found after the copy of the original request,
+        or just after the header of it if the ACK is capped (NLM_F_CAPPED).
+
+        On error, this function raises OSError EINVAL if this is not an
+        NLMSG_ERROR message.
+
+        @rtype: ExtAck
+        @return: parsed error
+        """
+        if self.nlmsg_type != netlink.NLMSG_ERROR:
+            raise OSError(errno.EINVAL, errno.errorcode[errno.EINVAL])
+        err = self.get_payload_as(netlink.Nlmsgerr)
+        ack = ExtAck(err.error)
+        if not self.nlmsg_flags & netlink.NLM_F_ACK_TLVS:
+            return ack
+        if self.nlmsg_flags & netlink.NLM_F_CAPPED:
+            offset = ctypes.sizeof(netlink.Nlmsgerr)
+        else:
+            offset = ctypes.sizeof(ctypes.c_int) + MNL_ALIGN(err.msg.nlmsg_len)
+        for attr in self.attributes(offset):
+            t = attr.get_type()
+            if t == netlink.NLMSGERR_ATTR_MSG:
+                ack.message = attr.get_str()
+            elif t == netlink.NLMSGERR_ATTR_OFFS:
+                ack.offset = attr.get_u32()
+            elif t == netlink.NLMSGERR_ATTR_COOKIE:
+                ack.cookie = bytes(attr.get_payload_mv(
+                    self.get_payload_tail() - ctypes.addressof(attr)))
+        return ack
+
+
+class ExtAck(object):
+    """error code and extended ACK attributes of NLMSG_ERROR
+
+    message, offset and cookie are None if not included.
+
+    - error: negative errno, 0 for ACK
+    - message: NLMSGERR_ATTR_MSG, same type as Attr.get_str()
+    - offset: NLMSGERR_ATTR_OFFS, offset of the invalid attribute in the
+      original request, counting from the beginning of the header
+    - cookie: NLMSGERR_ATTR_COOKIE in bytes
+    """
+    __slots__ = ["error", "message", "offset", "cookie"]
+
+    def __init__(self, error, message=None, offset=None, cookie=None):
+        self.error = error
+        self.message = message
+        self.offset = offset
+        self.cookie = cookie
+
+    def os_error(self):
+        """create OSError from this
+
+        The message is appended to the error string, and this ExtAck is
+        available as ext_ack attribute of the OSError.
+
+        @rtype: OSError
+        @return: the error
+        """
+        en = abs(self.error)
+        strerror = os.strerror(en)
+        if self.message is not None:
+            message = self.message
+            if not isinstance(message, str):
+                message = message.decode("utf-8", "replace")
+            strerror = "%s: %s" % (strerror, message)
+        e = OSError(en, strerror)
+        e.ext_ack = self
+        return e
+
 
 
 # to implement nlmsg_batch_current
@@ -1079,31 +1381,423 @@ class NlmsgBatch(object):
         return False
 
 
+# nlmsg_len, nlmsg_type, nlmsg_flags, nlmsg_seq, nlmsg_pid
+_put_nlmsghdr = struct.Struct("IHHII").pack_into
+
+class PyNlmsgBatch(object):
+    """Netlink message batch in pure Python
+
+    This class has the same semantics as NlmsgBatch, but the batch is a
+    bytearray and its state is an offset, without libmnl. The current
+    position is handed out as memoryview or Nlmsg on the buffer, so that
+    filling a batch costs a few integer operations per message:
+
+        with PyNlmsgBatch(MNL_SOCKET_BUFFER_SIZE * 2, MNL_SOCKET_BUFFER_SIZE) as b:
+            for ...:
+                nlh = b.put_header()
+                ... build nlh
+                if not b.next_batch():
+                    nl.sendto(b.head())
+                    b.reset()
+            if not b.is_empty():
+                nl.sendto(b.head())
+
+    Same as NlmsgBatch, the buffer size must be double of the limit.
+    """
+
+    def __init__(self, bufsize, limit):
+        """initialize a batch
+
+        @type bufsize: number
+        @param bufsize: buffer size
+        @type limit: number
+        @param limit: maximum size of the batch (should be MNL_SOCKET_BUFFER_SIZE)
+        """
+        if bufsize < limit: raise ValueError("bufsize is smaller than limit")
+        self._buf = bytearray(bufsize)
+        self._view = memoryview(self._buf)
+        self._limit = limit
+        # the current position is always the end of the batch
+        self._buflen = 0
+        self._overflow = False
+
+    def stop(self):
+        """release a batch
+
+        Nothing to release, for compatibility with NlmsgBatch.
+        """
+        pass
+
+    def next_batch(self):
+        """get room for the next message in the batch
+
+        @rtype: bool
+        @return: False if the last message did not fit into the batch
+        """
+        n = _nlmsg_len(self._buf, self._buflen)[0]
+        if self._buflen + n > self._limit:
+            self._overflow = True
+            return False
+        self._buflen += n
+        return True
+
+    def reset(self):
+        """reset the batch
+
+        This function moves the last message which does not fit the batch to
+        the head of the buffer, if any.
+        """
+        if self._overflow:
+            n = _nlmsg_len(self._buf, self._buflen)[0]
+            self._buf[:n] = self._view[self._buflen:self._buflen + n]
+            self._buflen = n
+            self._overflow = False
+        else:
+            self._buflen = 0
+
+    def size(self):
+        """get current size of the batch
+
+        @rtype: number
+        @return: the current size of the batch
+        """
+        return self._buflen
+
+    def head(self):
+        """get the batch to send
+
+        @rtype: memoryview
+        @return: the messages in the batch, shares the buffer
+        """
+        return self._view[:self._buflen]
+
+    def is_empty(self):
+        """check if there is any message in the batch
+
+        @rtype: bool
+        @return: if the batch is empty or not
+        """
+        return self._buflen == 0
+
+    def current(self):
+        """returns current position in the batch
+
+        @rtype: number
+        @return: offset of the current position in the buffer
+        """
+        return self._buflen
+
+    def current_v(self):
+        """returns current buffer in the batch
+
+        @rtype: memoryview
+        @return: writable view from the current position to the end of the
+                 buffer
+        """
+        return self._view[self._buflen:]
+
+    def current_nlmsg(self):
+        """get the message written at the current position
+
+        @rtype: Nlmsg
+        @return: Nlmsg on the buffer
+        """
+        return Nlmsg(self._buf, self._buflen)
+
+    def put_header(self):
+        """prepare a new message at the current position
+
+        This function initializes the Netlink header same as
+        Nlmsg.put_header().
+
+        @rtype: Nlmsg
+        @return: Nlmsg on the buffer
+        """
+        _put_nlmsghdr(self._buf, self._buflen, MNL_NLMSG_HDRLEN, 0, 0, 0, 0)
+        return Nlmsg(self._buf, self._buflen)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, v, tb):
+        self.stop()
+        return False
+
+
+class RecvBuffer(object):
+    """receive buffer lent from RecvBufferPool
+
+    The received datagram is available as memoryview by the view attribute,
+    which can be passed to cb_run() or cb_run2() without copying. You have to
+    release() it to return the storage to the pool, or use it as context:
+
+        with nl.recv_pooled() as rb:
+            cb_run(rb.view, seq, portid, cb, data)
+
+    The view must not be used after released since the storage will be
+    overwritten by the next receive.
+    """
+    __slots__ = ["_pool", "_index", "view"]
+
+    def __init__(self, pool, index, view):
+        self._pool = pool
+        self._index = index
+        self.view = view
+
+    def __len__(self):
+        return len(self.view)
+
+    def release(self):
+        """return the storage to the pool
+
+        The view is released. If the storage is still referred, by a slice
+        of the view or ctypes from_buffer() for example, this function raises
+        BufferError and the storage is not returned to the pool, so that the
+        next receive does not overwrite the data. Call it again after the
+        reference is gone.
+        """
+        if self._pool is None: return
+        self.view.release()
+        self._pool._put(self._index)
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, v, tb):
+        self.release()
+        return False
+
+
+class RecvBufferPool(object):
+    """pool of reusable receive buffers
+
+    Each buffer is allocated once and is lent as RecvBuffer. If all buffers
+    are lent, a new one is added to the pool up to max_bufs. Receiving from
+    an exhausted pool raises OSError ENOMEM, without receiving.
+    """
+
+    def __init__(self, nbufs=4, size=MNL_SOCKET_BUFFER_SIZE, max_bufs=16):
+        """create a pool
+
+        @type nbufs: number
+        @param nbufs: number of buffers to allocate beforehand
+        @type size: number
+        @param size: size of each buffer
+        @type max_bufs: number
+        @param max_bufs: maximum number of buffers, nbufs if smaller
+        """
+        self.size = size
+        self.max_bufs = max(nbufs, max_bufs)
+        self._c_type = ctypes.c_ubyte * size
+        self._bufs = []
+        self._free = []
+        for i in range(nbufs):
+            self._add()
+
+    def _add(self):
+        self._bufs.append(bytearray(self.size))
+        self._free.append(len(self._bufs) - 1)
+
+    def _put(self, i):
+        # the pool does not hold views of a buffer, so that resizing it fails
+        # while slices of the lent view or their exports are alive
+        buf = self._bufs[i]
+        buf.append(0)
+        del buf[-1]
+        self._free.append(i)
+
+    def _get(self):
+        if not self._free:
+            if len(self._bufs) >= self.max_bufs:
+                raise OSError(errno.ENOMEM, errno.errorcode[errno.ENOMEM])
+            self._add()
+        return self._free.pop()
+
+    def __len__(self):
+        return len(self._bufs)
+
+    def available(self):
+        """get the number of buffers not lent
+
+        @rtype: number
+        @return: the number of free buffers
+        """
+        return len(self._free)
+
+    def recv(self, nl):
+        """receive a netlink message into a free buffer
+
+        On error, it raises OSError same as Socket.recv_into() and the buffer
+        is returned to the pool. ENOMEM is raised if all of max_bufs buffers
+        are lent.
+
+        @type nl: Socket
+        @param nl: netlink socket to receive from
+
+        @rtype: RecvBuffer
+        @return: the buffer which holds the received datagram
+        """
+        return self._recv(nl, self._get())
+
+    def _recv(self, nl, i):
+        try:
+            n = nl._impl.socket_recvfrom(nl._nls, self._c_type.from_buffer(self._bufs[i]), self.size)
+        except:
+            self._free.append(i)
+            raise
+        return RecvBuffer(self, i, memoryview(self._bufs[i])[:n])
+
+
+_nlmsg_len = struct.Struct("I").unpack_from
+
+def _count_nlmsgs(buf, n):
+    # count messages by walking nlmsg_len only
+    if n < MNL_NLMSG_HDRLEN:
+        return 0
+    l = _nlmsg_len(buf, 0)[0]
+    if l >= n: # most of datagrams
+        return 1
+    c = 0
+    offset = 0
+    while offset + MNL_NLMSG_HDRLEN <= n:
+        l = _nlmsg_len(buf, offset)[0]
+        if l < MNL_NLMSG_HDRLEN: break
+        c += 1
+        offset += MNL_ALIGN(l)
+    return c
+
+class SocketStats(object):
+    """Socket counters
+
+    Counters are plain attributes updated by Socket methods when the stats
+    are enabled by Socket.enable_stats(). Errors are counted for receive
+    functions only.
+    """
+    __slots__ = ["tx_bytes", "tx_datagrams", "tx_syscalls",
+                 "rx_bytes", "rx_datagrams", "rx_syscalls", "rx_messages",
+                 "max_datagram", "enobufs", "eintr", "eagain"]
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """set all counters to 0
+        """
+        for k in self.__slots__:
+            setattr(self, k, 0)
+
+    def sent(self, nbytes, ndatagrams=1):
+        self.tx_syscalls += 1
+        self.tx_datagrams += ndatagrams
+        self.tx_bytes += nbytes
+
+    def _datagram(self, buf, n):
+        self.rx_datagrams += 1
+        self.rx_bytes += n
+        if n > self.max_datagram:
+            self.max_datagram = n
+        self.rx_messages += _count_nlmsgs(buf, n)
+
+    def received(self, buf, n):
+        self.rx_syscalls += 1
+        self.rx_datagrams += 1
+        self.rx_bytes += n
+        if n > self.max_datagram:
+            self.max_datagram = n
+        # inlined _count_nlmsgs() for a datagram of single message
+        if n >= MNL_NLMSG_HDRLEN and _nlmsg_len(buf)[0] >= n:
+            self.rx_messages += 1
+        else:
+            self.rx_messages += _count_nlmsgs(buf, n)
+
+    def received_many(self, bufs):
+        self.rx_syscalls += 1
+        for buf, n in bufs:
+            # n is greater than len(buf) if truncated
+            self._datagram(buf, len(buf))
+
+    def error(self, en):
+        self.rx_syscalls += 1
+        if en == errno.ENOBUFS:
+            self.enobufs += 1
+        elif en == errno.EINTR:
+            self.eintr += 1
+        elif en == errno.EAGAIN:
+            self.eagain += 1
+
+    def as_dict(self):
+        """counters in dict
+
+        "msgs_per_datagram" is added, which is the average number of netlink
+        messages in a received datagram.
+
+        @rtype: dict
+        @return: counter name to value
+        """
+        d = dict((k, getattr(self, k)) for k in self.__slots__)
+        d["msgs_per_datagram"] = self.rx_datagrams and float(self.rx_messages) / self.rx_datagrams or 0.0
+        return d
+
+
 class Socket(object):
     """Netlink socket helpers
     """
-    def __init__(self, bus_or_socket, flags=0):
+    def __init__(self, bus_or_socket, flags=0, backend="libmnl"):
         """open a netlink socket
 
         The socket object is not dup'ed, and will be closed when the socket
         object created by this is closed.
 
+        The backend selects the implementation of socket operations. "libmnl"
+        calls libmnl functions via ctypes, "python" calls Python socket module
+        directly, which avoids ctypes argument conversions on send and receive.
+
         raises OSError on error.
 
         @type bus_or_socket: number
         @param bus_or_socket: the netlink socket bus ID (see NETLINK_* constants)
                               or pre-existig socket object
+        @type flags: number
+        @param flags: flags passed to socket(), SOCK_CLOEXEC for example
+        @type backend: string
+        @param backend: "libmnl" or "python"
         """
         import socket
+        if backend == "libmnl":
+            self._impl = _socket
+        elif backend == "python":
+            self._impl = _pysocket
+        else:
+            raise ValueError("unknown backend: %r" % backend)
+
         if isinstance(bus_or_socket, socket.socket):
             # hold original socket here since socket will be invalid if caller
             # drops socket reference
             self._sock = bus_or_socket
-            self._nls = _socket.socket_fdopen(bus_or_socket.fileno())
+            if self._impl is _pysocket:
+                self._nls = _pysocket.socket_fdopen(bus_or_socket)
+            else:
+                self._nls = _socket.socket_fdopen(bus_or_socket.fileno())
         elif flags != 0:
-            self._nls = _socket.socket_open2(bus_or_socket, flags)
+            self._nls = self._impl.socket_open2(bus_or_socket, flags)
         else:
-            self._nls = _socket.socket_open(bus_or_socket)
+            self._nls = self._impl.socket_open(bus_or_socket)
+
+        self._stats = None
+        self._enobufs = 0
+        self._drops_base = 0
+        self._rcvbuf_max = 0
+        self._rcvbuf_force = False
+        self._rcvbuf_grown = 0
+        self._mmsg_bufs = None
+        self._mmsg_vec = None
+        self._recv_pool = None
+        self._aio_dispatcher = None
+        self._pktinfo_buf = None # set by dispatch_groups()
+        # for recv_into() timeout
+        self._poller = select.poll()
+        self._poller.register(self.get_fd(), select.POLLIN)
 
     def get_fd(self):
         """obtain file descriptor from netlink socket
@@ -1111,7 +1805,7 @@ class Socket(object):
         @rtype: number
         @return: the file descriptor of a given netlink socket
         """
-        return _socket.socket_get_fd(self._nls)
+        return self._impl.socket_get_fd(self._nls)
 
     def fileno(self):
         """alias for get_fd()"""
@@ -1128,7 +1822,7 @@ class Socket(object):
         @rtype: number
         @return: the Netlink PortID of a given netlink socket
         """
-        return _socket.socket_get_portid(self._nls)
+        return self._impl.socket_get_portid(self._nls)
 
     def bind(self, groups, pid):
         """bind netlink socket
@@ -1141,7 +1835,7 @@ class Socket(object):
         @type pid: number
         @param pid: the port ID you want to use (use zero for automatic selection)
         """
-        _socket.socket_bind(self._nls, groups, pid)
+        self._impl.socket_bind(self._nls, groups, pid)
 
     def sendto(self, buf):
         """send a netlink message of a certain size
@@ -1155,7 +1849,9 @@ class Socket(object):
         @rtype: number
         @return: the number of bytes sent
         """
-        return _socket.socket_sendto(self._nls, buf)
+        ret = self._impl.socket_sendto(self._nls, buf)
+        if self._stats is not None: self._stats.sent(ret)
+        return ret
 
     def send_nlmsg(self, nlh):
         """send a netlink message
@@ -1168,7 +1864,61 @@ class Socket(object):
         @rtype: number
         @return: the number of bytes sent
         """
-        return _socket.socket_send_nlmsg(self._nls, nlh)
+        ret = self._impl.socket_send_nlmsg(self._nls, nlh)
+        if self._stats is not None: self._stats.sent(ret)
+        return ret
+
+    def send_many(self, msgs):
+        """send netlink messages in a datagram without copying them
+
+        This function sends the messages by a single sendmsg() call whose
+        iovec points to each message memory, so that there is no need to
+        copy them into a batch buffer. The kernel handles the messages in
+        the datagram in order, same as a batch sent by NlmsgBatch.
+
+        On error, it raises OSError.
+
+        @type msgs: sequence of Nlmsg
+        @param msgs: sending netlink messages
+
+        @rtype: number
+        @return: the number of bytes sent
+        """
+        ret = self._impl.socket_send_nlmsgs(self._nls, msgs)
+        if self._stats is not None: self._stats.sent(ret)
+        return ret
+
+    def send_mmsg(self, msgs):
+        """send netlink messages as separate datagrams at once
+
+        This function sends each message as an independent datagram by
+        sendmmsg(), in a system call for all of them in most cases.
+
+        The vectors passed to sendmmsg() are allocated once and reused by
+        the next call, grown if msgs is longer.
+
+        On error, it raises OSError. Messages before the failed one have
+        been sent already, the number of them is the sent attribute of the
+        OSError.
+
+        @type msgs: sequence of Nlmsg
+        @param msgs: sending netlink messages
+
+        @rtype: number
+        @return: the number of datagrams sent
+        """
+        vec = self._mmsg_vec
+        if vec is None or len(vec) < len(msgs):
+            vec = self._mmsg_vec = _socket.MmsgSendVector(len(msgs))
+        try:
+            ret = self._impl.socket_sendmmsg_nlmsgs(self._nls, msgs, vec)
+        except OSError as e:
+            if self._stats is not None and e.sent:
+                self._stats.sent(sum(nlh.nlmsg_len for nlh in msgs[:e.sent]), e.sent)
+            raise
+        if self._stats is not None:
+            self._stats.sent(sum(nlh.nlmsg_len for nlh in msgs[:ret]), ret)
+        return ret
 
     def recv(self, size):
         """receive a netlink message
@@ -1181,9 +1931,15 @@ class Socket(object):
         @rtype: number
         @return: the number of bytes received
         """
-        return _socket.socket_recv(self._nls, size)
+        try:
+            buf = self._impl.socket_recv(self._nls, size)
+        except OSError as e:
+            self._recv_error(e)
+            raise
+        if self._stats is not None: self._stats.received(buf, len(buf))
+        return buf
 
-    def recv_into(self, buf):
+    def recv_into(self, buf, timeout=None):
         """receive a netlink message
 
         On error, it raises OSError. If errno is set to ENOSPC, it means that
@@ -1194,23 +1950,444 @@ class Socket(object):
         that your buffer is big enough to store the netlink message without
         truncating it.
 
+        If timeout is specified, this function waits for a message at most
+        timeout seconds, then receives it without blocking regardless of the
+        socket blocking mode. It returns None instead of raising EAGAIN if no
+        message is available. 0 means no wait, negative value means forever.
+
         @type buf: mutable buffer - bytearray
         @param buf: buffer that you want to use to store the netlink message
+        @type timeout: number
+        @param timeout: timeout in seconds
 
         @rtype: number
-        @return: the number of bytes received
+        @return: the number of bytes received, or None on timeout
+        """
+        try:
+            if timeout is None:
+                n = self._impl.socket_recv_into(self._nls, buf)
+            elif timeout and not self._poll(timeout):
+                n = None
+            else:
+                n = self._impl.socket_recv_nowait(self._nls, buf)
+        except OSError as e:
+            self._recv_error(e)
+            raise
+        if self._stats is not None:
+            if n is None:
+                self._stats.error(errno.EAGAIN)
+            else:
+                self._stats.received(buf, n)
+        return n
+
+    def _poll(self, timeout):
+        return len(self._poller.poll(timeout * 1000)) > 0
+
+    def drain(self, buf=None):
+        """receive all queued netlink messages without blocking
+
+        This generator receives datagrams by recv_into() with MSG_DONTWAIT
+        until EAGAIN, so that a poll wakeup empties the socket receive queue.
+        It yields a memoryview of buf for each datagram, which is valid until
+        the next iteration since buf is reused.
+
+        On error, it raises OSError same as recv_into().
+
+        @type buf: mutable buffer - bytearray
+        @param buf: receive buffer, MNL_SOCKET_BUFFER_SIZE one if None
+
+        @rtype: memoryview
+        @return: received datagram
+        """
+        if buf is None:
+            buf = bytearray(MNL_SOCKET_BUFFER_SIZE)
+        view = memoryview(buf)
+        while True:
+            n = self.recv_into(buf, 0)
+            if n is None:
+                return
+            yield view[:n]
+
+    def recv_into_pktinfo(self, buf):
+        """receive a netlink message with the multicast group
+
+        This function receives a datagram by recvmsg() and returns the
+        multicast group it was delivered for, which is taken from
+        NETLINK_PKTINFO control message. The group is 0 for unicast. The
+        NETLINK_PKTINFO option has to be enabled by setsockopt() beforehand,
+        or the group is always 0.
+
+        On error, it raises OSError same as recv_into().
+
+        @type buf: mutable buffer - bytearray
+        @param buf: buffer that you want to use to store the netlink message
+
+        @rtype: (number, number)
+        @return: the number of bytes received and the group number
+        """
+        try:
+            ret = self._impl.socket_recv_pktinfo(self._nls, buf)
+        except OSError as e:
+            self._recv_error(e)
+            raise
+        if self._stats is not None: self._stats.received(buf, ret[0])
+        return ret
+
+    def dispatch_groups(self, handlers, default=None, buf=None):
+        """receive a netlink message and pass it to the handler of its group
+
+        This function enables NETLINK_PKTINFO at the first call, receives a
+        datagram by recv_into_pktinfo() and calls the handler for the group
+        which the datagram was delivered for, without parsing the messages.
+        A handler is called as handler(datagram, group), where datagram is
+        a memoryview of buf, valid until the next call. Unicast datagrams,
+        replies to requests for example, are for group 0. The return value
+        of the handler is returned, or None if there is no handler.
+
+            handlers = {rtnl.RTNLGRP_LINK: on_link, rtnl.RTNLGRP_IPV4_IFADDR: on_addr}
+            while nl.dispatch_groups(handlers) != mnl.MNL_CB_ERROR:
+                pass
+
+        On error, it raises OSError same as recv_into().
+
+        @type handlers: dict
+        @param handlers: group number to handler
+        @type default: callable
+        @param default: handler for the groups not in handlers
+        @type buf: mutable buffer - bytearray
+        @param buf: receive buffer, MNL_SOCKET_BUFFER_SIZE one if None
+
+        @return: the return value of the handler
+        """
+        if self._pktinfo_buf is None:
+            self._impl.socket_setsockopt(self._nls, netlink.NETLINK_PKTINFO, bytes(ctypes.c_int(1)))
+            self._pktinfo_buf = bytearray(MNL_SOCKET_BUFFER_SIZE)
+        if buf is None:
+            buf = self._pktinfo_buf
+        n, group = self.recv_into_pktinfo(buf)
+        handler = handlers.get(group, default)
+        if handler is None:
+            return None
+        return handler(memoryview(buf)[:n], group)
+
+    def recv_many(self, max_msgs, size=MNL_SOCKET_BUFFER_SIZE):
+        """receive netlink messages in bulk
+
+        This function receives up to max_msgs datagrams by a single
+        recvmmsg() call. It blocks until at least one datagram is available
+        and then returns the datagrams that are already queued, without
+        waiting for max_msgs of them.
+
+        The datagrams are stored in buffers preallocated by the socket and
+        reused by the next call, so that the returned buffers are valid only
+        until the next recv_many() call. Each buffer can be passed to cb_run()
+        or cb_run2() as it is.
+
+        On error, it raises OSError. A datagram larger than size does not
+        fail the call, it is truncated to size and its length is the real
+        one, greater than the length of the buffer. Check it before parsing:
+
+            for buf, n in nl.recv_many(8):
+                if n > len(buf):
+                    ... truncated, see ENOSPC of recv_into()
+
+        @type max_msgs: number
+        @param max_msgs: maximum number of datagrams to receive
+        @type size: number
+        @param size: size of each buffer
+
+        @rtype: list of (memoryview, number)
+        @return: pairs of a received datagram and its length
+        """
+        mbufs = self._mmsg_bufs
+        if mbufs is None or len(mbufs) != max_msgs or mbufs.size != size:
+            mbufs = self._mmsg_bufs = _socket.MmsgBuffers(max_msgs, size)
+        views = mbufs.views
+        msgvec = mbufs.msgvec
+        try:
+            nrecv = self._impl.socket_recvmmsg(self._nls, mbufs)
+        except OSError as e:
+            self._recv_error(e)
+            raise
+        ret = []
+        for i in range(nrecv):
+            n = msgvec[i].msg_len
+            ret.append((views[i][:n], n)) # the slice stops at size
+        if self._stats is not None: self._stats.received_many(ret)
+        return ret
+
+    def set_recv_pool(self, pool):
+        """set the receive buffer pool used by recv_pooled()
+
+        @type pool: RecvBufferPool
+        @param pool: buffer pool, the default one is created if None
+        """
+        self._recv_pool = pool
+
+    def recv_pooled(self):
+        """receive a netlink message into a reused buffer
+
+        This function receives a datagram into a buffer of the pool owned by
+        this socket, see set_recv_pool(), and returns it without copying. You
+        have to release the returned buffer.
+
+        On error, it raises OSError same as recv_into(), or ENOMEM if all the
+        buffers of the pool are lent.
+
+        @rtype: RecvBuffer
+        @return: the buffer which holds the received datagram
+        """
+        pool = self._recv_pool
+        if pool is None:
+            pool = self._recv_pool = RecvBufferPool()
+        i = pool._get() # not a receive error
+        try:
+            rb = pool._recv(self, i)
+        except OSError as e:
+            self._recv_error(e)
+            raise
+        if self._stats is not None: self._stats.received(rb.view, len(rb))
+        return rb
+
+    def set_cap_ack(self, on=True):
+        """enable or disable NETLINK_CAP_ACK
+
+        With this, the kernel does not copy the payload of the original
+        request into error ACK, only its header.
+
+        On error, this function raises OSError.
+
+        @type on: bool
+        @param on: True to enable
+        """
+        self._impl.socket_setsockopt(self._nls, netlink.NETLINK_CAP_ACK, bytes(ctypes.c_int(on and 1 or 0)))
+
+    def set_ext_ack(self, on=True):
+        """enable or disable NETLINK_EXT_ACK
+
+        With this, the kernel appends NLMSGERR_ATTR_* TLVs to ACK, see
+        Nlmsg.get_ext_ack() to parse them.
+
+        On error, this function raises OSError.
+
+        @type on: bool
+        @param on: True to enable
         """
-        return _socket.socket_recv_into(self._nls, buf)
+        self._impl.socket_setsockopt(self._nls, netlink.NETLINK_EXT_ACK, bytes(ctypes.c_int(on and 1 or 0)))
+
+    def set_rcvbuf(self, size, force=False):
+        """set the receive buffer size of the socket
+
+        This function sets SO_RCVBUF, which is limited by net.core.rmem_max,
+        or SO_RCVBUFFORCE if force is True, which overrides the limit but
+        requires CAP_NET_ADMIN. Note that the kernel doubles the value to
+        allow space for bookkeeping overhead.
+
+        On error, this function raises OSError.
+
+        @type size: number
+        @param size: receive buffer size in bytes
+        @type force: bool
+        @param force: use SO_RCVBUFFORCE
+        """
+        self._impl.socket_setsockopt_int(
+            self._nls, _cproto.SOL_SOCKET,
+            force and _cproto.SO_RCVBUFFORCE or _cproto.SO_RCVBUF, size)
+
+    def get_rcvbuf(self):
+        """get the receive buffer size of the socket
+
+        @rtype: number
+        @return: SO_RCVBUF value, doubled one by the kernel
+        """
+        return self._impl.socket_getsockopt_int(self._nls, _cproto.SOL_SOCKET, _cproto.SO_RCVBUF)
+
+    def set_rcvbuf_auto(self, max_size, force=False):
+        """grow the receive buffer automatically on overrun
+
+        When a receive function of this socket fails with ENOBUFS, which
+        means the receive buffer has overrun and messages were lost, the
+        receive buffer size is doubled up to max_size. The OSError is raised
+        to the caller as usual. Passing 0 as max_size disables it.
+
+        @type max_size: number
+        @param max_size: upper limit of the receive buffer size
+        @type force: bool
+        @param force: use SO_RCVBUFFORCE, see set_rcvbuf()
+        """
+        self._rcvbuf_max = max_size
+        self._rcvbuf_force = force
+
+    def _recv_error(self, e):
+        if self._stats is not None:
+            self._stats.error(e.errno)
+        if e.errno != errno.ENOBUFS:
+            return
+        self._enobufs += 1
+        if not self._rcvbuf_max:
+            return
+        # ENOBUFS is raised to the caller even if growing failed, EPERM of
+        # SO_RCVBUFFORCE for example
+        try:
+            # get_rcvbuf() returns the doubled value
+            cur = self.get_rcvbuf()
+            if cur // 2 < self._rcvbuf_max:
+                self.set_rcvbuf(min(cur, self._rcvbuf_max), self._rcvbuf_force)
+                # SO_RCVBUF is capped by rmem_max silently
+                if self.get_rcvbuf() > cur:
+                    self._rcvbuf_grown += 1
+        except OSError:
+            pass
+
+    def overrun_stats(self):
+        """receive buffer overrun counters
+
+        This function returns a dict, which is cheap enough to be polled by
+        a monitoring loop:
+
+        - "enobufs": number of ENOBUFS errors seen by receive functions
+        - "lost": number of messages dropped by the kernel for this socket,
+          from Drops column of /proc/net/netlink. None if it is not available
+        - "rcvbuf": current receive buffer size, see get_rcvbuf()
+        - "grown": number of times the buffer actually grown by set_rcvbuf_auto()
+
+        Counters are since the socket was opened or reset_overrun_stats().
+        Note that ENOBUFS is not reported at all if NETLINK_NO_ENOBUFS is
+        set, the "lost" is still counted in that case.
+
+        @rtype: dict
+        @return: counters described above
+        """
+        drops = self._get_drops()
+        if drops is not None:
+            drops -= self._drops_base
+        return {"enobufs": self._enobufs,
+                "lost": drops,
+                "rcvbuf": self.get_rcvbuf(),
+                "grown": self._rcvbuf_grown}
+
+    def reset_overrun_stats(self):
+        """reset counters of overrun_stats()
+        """
+        self._enobufs = 0
+        self._rcvbuf_grown = 0
+        self._drops_base = self._get_drops() or 0
+
+    def _get_drops(self):
+        try:
+            return _socket.fd_drops(self.get_fd())
+        except (IOError, OSError, ValueError):
+            return None
+
+    def enable_stats(self, enable=True):
+        """enable or disable the counters of stats()
+
+        The counters cost an attribute check per call if disabled, and
+        integer additions and a walk over nlmsg_len of received messages if
+        enabled. Enabling again keeps the current counters.
+
+        @type enable: bool
+        @param enable: True to enable
+        """
+        if not enable:
+            self._stats = None
+        elif self._stats is None:
+            self._stats = SocketStats()
+
+    def stats(self):
+        """snapshot of the counters
+
+        This function returns a dict of the counters described below, or None
+        if the counters are not enabled by enable_stats().
+
+        - "tx_bytes", "tx_datagrams", "tx_syscalls": sent
+        - "rx_bytes", "rx_datagrams", "rx_syscalls": received, rx_syscalls
+          includes failed ones
+        - "rx_messages": netlink messages in received datagrams
+        - "msgs_per_datagram": rx_messages / rx_datagrams
+        - "max_datagram": the largest datagram size received
+        - "enobufs", "eintr", "eagain": errors of receive functions, eagain
+          includes non-blocking receive and timeout of recv_into() which
+          returned None
+
+        @rtype: dict
+        @return: counter name to value
+        """
+        if self._stats is None:
+            return None
+        return self._stats.as_dict()
+
+    def reset_stats(self):
+        """set the counters of stats() to 0
+        """
+        if self._stats is not None:
+            self._stats.reset()
+
+    def messages(self, loop=None):
+        """async iterator for received messages
+
+        This function registers the socket to the asyncio event loop, which
+        makes the socket non-blocking, and returns an async iterator yielding
+        Nlmsg which is not a reply to request(), e.g. multicast events. The
+        messages are queued from the first call of this function:
+
+            async for nlh in nl.messages():
+                ...
+
+        Receiving error, ENOBUFS for example, is raised as OSError from the
+        iteration. This requires Python >= 3.7
+
+        @type loop: asyncio event loop
+        @param loop: loop to register, the running one if None
+        """
+        from . import _asyncio
+        return _asyncio.dispatcher(self, loop).messages()
+
+    def request(self, nlh, loop=None, timeout=None):
+        """send a request and wait for its replies in asyncio
+
+        This function assigns a new sequence number to nlh, sends it and
+        returns an awaitable resulting in the list of reply Nlmsg. Multipart
+        replies are collected until NLMSG_DONE. If NLM_F_ACK is set, the
+        replies are collected until the ACK. Error ACK is raised as OSError.
+        Many requests can be outstanding at the same time, their replies are
+        routed by the sequence number. A request without NLM_F_ACK which gets
+        no reply, NLMSG_NOOP for example, completes only by timeout, which
+        raises OSError ETIMEDOUT.
+
+        @type nlh: Nlmsg
+        @param nlh: request message
+        @type loop: asyncio event loop
+        @param loop: loop to register, the running one if None
+        @type timeout: number
+        @param timeout: seconds to wait, forever if None
+
+        @rtype: awaitable
+        @return: the list of reply messages
+        """
+        from . import _asyncio
+        return _asyncio.dispatcher(self, loop).request(nlh, timeout)
+
+    def _detach(self):
+        d = self._aio_dispatcher
+        if d is not None:
+            d.close()
+            self._aio_dispatcher = None
 
     def close(self):
         """close a given netlink socket
 
         On error, this function raises OSError.
         """
-        if hasattr(self, "_sock"):
-            self._sock.close()
-            return 0
-        return _socket.socket_close(self._nls)
+        try:
+            self._detach()
+        finally:
+            if hasattr(self, "_sock"):
+                self._sock.close()
+                ret = 0
+            else:
+                ret = self._impl.socket_close(self._nls)
+        return ret
 
     def setsockopt(self, t, b):
         """set Netlink socket option
@@ -1238,7 +2415,7 @@ class Socket(object):
         @type b: bytes or bytearray
         @param b: the buffer that contains the data about this option
         """
-        _socket.socket_setsockopt(self._nls, t, b)
+        self._impl.socket_setsockopt(self._nls, t, b)
 
     def getsockopt(self, t, size):
         """get a Netlink socket option
@@ -1253,7 +2430,7 @@ class Socket(object):
         @rtype: bytes
         @return: the value of this option
         """
-        return _socket.socket_getsockopt(self._nls, t, size)
+        return self._impl.socket_getsockopt(self._nls, t, size)
 
     def getsockopt_as(self, t, c):
         """get a Netlink socket option
@@ -1268,13 +2445,14 @@ class Socket(object):
         @rtype: specified by param c
         @return: the option value as a specified class
         """
-        return _socket.socket_getsockopt_ctype(self._nls, t, c)
+        return self._impl.socket_getsockopt_ctype(self._nls, t, c)
 
     def __enter__(self):
         return self
 
     def __exit__(self, t, v, tb):
-        _socket.socket_close(self._nls)
+        self._detach()
+        self._impl.socket_close(self._nls)
         return False
 
 
@@ -1288,7 +2466,13 @@ def payload_attributes(payload): # buffer
         a = a.next_attribute()
 
 
-def ptrs2attrs(ptrs, size):
+def ptrs2attrs(ptrs, size, tb=None):
+    # fills AttrTable if tb is given, instead of creating a dict
+    if tb is not None:
+        tb.clear()
+        for i, j in enumerate((ctypes.POINTER(Attr) * size).from_address(ptrs)):
+            if j: tb[i] = j.contents
+        return tb
     return {i: j.contents
             for i, j in enumerate((ctypes.POINTER(Attr) * size).from_address(ptrs))
             if j}
@@ -1301,4 +2485,12 @@ attr_cb  = _callback._cb_factory(Attr, _cproto.MNL_ATTR_CB_T)
 
 from ._nlmsg import nlmsg_put_header
 from ._attr import attr_parse_payload
-from ._callback import cb_run, cb_run2, mnl_cb_t, mnl_attr_cb_t
+from ._callback import cb_run, cb_run2, CallbackTable, mnl_cb_t, mnl_attr_cb_t
+from ._transaction import Transaction, Pipeline, BatchWriter
+from ._pool import SocketPool
+from ._policy import Policy, AttrTable
+from ._view import NlmsgView, AttrView, NlmsgIterator, iter_messages, \
+    payload_attribute_views, nlmsg_view_cb, attr_view_cb
+from ._template import MessageTemplate
+from ._encoder import MessageEncoder
+from ._index import index_attributes, AttrIndex, MSG_INDEX_DTYPE, ATTR_INDEX_DTYPE
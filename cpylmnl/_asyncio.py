@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+
+"""asyncio integration of netlink Socket
+
+The socket is registered to the event loop by loop.add_reader() and every
+datagram queued in the socket is received at each wakeup, so that many
+sockets and many outstanding requests can share one event loop.
+
+This module requires Python >= 3.7
+"""
+
+from __future__ import absolute_import
+
+import os, errno, asyncio
+
+from .linux import netlinkh as netlink
+from . import _libmnlh
+from ._transaction import Router
+from ._util import os_error
+
+
+class NetlinkProtocol(object):
+    """base class of netlink protocols
+
+    Similar to asyncio.DatagramProtocol, but the received datagram is passed
+    as memoryview of the transport buffer, which will be overwritten by the
+    next datagram. Copy it if you need it after datagram_received() returns.
+    """
+
+    def connection_made(self, transport):
+        pass
+
+    def datagram_received(self, buf):
+        pass
+
+    def error_received(self, exc):
+        pass
+
+    def connection_lost(self, exc):
+        pass
+
+
+class NetlinkTransport(object):
+    """transport reading a netlink Socket in an event loop
+
+    The socket file descriptor is set to non-blocking mode. ENOBUFS is passed
+    to error_received() and reading continues, other receiving errors close
+    the transport and are passed to connection_lost().
+    """
+
+    def __init__(self, loop, nl, protocol, size=_libmnlh.MNL_SOCKET_BUFFER_SIZE):
+        self._loop = loop
+        self._nl = nl
+        self._protocol = protocol
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._fd = nl.get_fd()
+        self._closing = False
+        os.set_blocking(self._fd, False)
+        protocol.connection_made(self)
+        loop.add_reader(self._fd, self._read_ready)
+
+    def get_socket(self):
+        return self._nl
+
+    def is_closing(self):
+        return self._closing
+
+    def _read_ready(self):
+        # drain all pending datagrams per wakeup
+        while not self._closing:
+            try:
+                n = self._nl.recv_into(self._buf, 0)
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                if e.errno != errno.ENOBUFS:
+                    self._close(e)
+                    return
+                self._protocol.error_received(e)
+            else:
+                if n is None:
+                    return
+                self._protocol.datagram_received(self._view[:n])
+
+    def read(self, timeout=None):
+        """receive a datagram outside of the event loop
+
+        This blocks the event loop while waiting.
+
+        @type timeout: number
+        @param timeout: seconds to wait, forever if None
+
+        @rtype: memoryview
+        @return: the datagram, None on timeout
+        """
+        if timeout is None:
+            timeout = -1 # the socket is non-blocking
+        n = self._nl.recv_into(self._buf, timeout)
+        if n is None:
+            return None
+        return self._view[:n]
+
+    def sendto(self, buf):
+        return self._nl.sendto(buf)
+
+    def send_nlmsg(self, nlh):
+        return self._nl.send_nlmsg(nlh)
+
+    def _close(self, exc):
+        if self._closing: return
+        self._closing = True
+        if self._loop.is_closed():
+            # readers were gone with the loop, nothing to call soon
+            self._protocol.connection_lost(exc)
+            return
+        self._loop.remove_reader(self._fd)
+        self._loop.call_soon(self._protocol.connection_lost, exc)
+
+    def close(self):
+        self._close(None)
+
+
+def create_netlink_connection(protocol_factory, nl, loop=None,
+                              size=_libmnlh.MNL_SOCKET_BUFFER_SIZE):
+    """attach a protocol to netlink socket
+
+    @type protocol_factory: callable
+    @param protocol_factory: returns NetlinkProtocol instance
+    @type nl: Socket
+    @param nl: netlink socket, already bound
+    @type loop: asyncio event loop
+    @param loop: the running loop is used if None
+    @type size: number
+    @param size: receive buffer size
+
+    @rtype: (NetlinkTransport, NetlinkProtocol)
+    @return: transport and protocol
+    """
+    if loop is None: loop = asyncio.get_running_loop()
+    protocol = protocol_factory()
+    transport = NetlinkTransport(loop, nl, protocol, size)
+    return transport, protocol
+
+
+# number of requests given up by timeout or cancel, whose late replies are
+# dropped
+_EXPIRED_MAX = 1024
+
+
+def _set_future(future, tx):
+    # no one can await the future of a closed loop
+    if future.done() or future.get_loop().is_closed(): return
+    if tx._error is None:
+        future.set_result(tx.replies)
+    else:
+        future.set_exception(tx._error)
+
+
+class Dispatcher(NetlinkProtocol, Router):
+    """protocol routing replies to requests by sequence number
+
+    Messages which do not belong to any outstanding request, e.g. multicast
+    events, are put into a queue read by messages(), and discarded until
+    messages() is called. Late replies to requests given up by timeout or
+    cancel are discarded. After the connection is lost, requests fail with
+    the error which closed it.
+    """
+
+    def __init__(self, loop=None):
+        Router.__init__(self)
+        self._loop = loop or asyncio.get_running_loop()
+        self._transport = None
+        self._queue = None
+        self._lost = None
+        self._lost_error = None
+        self._expired = {}
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._portid = transport.get_socket().get_portid()
+
+    def datagram_received(self, buf):
+        self.feed(buf)
+
+    def _put(self, item):
+        if self._queue is not None:
+            self._queue.put_nowait(item)
+
+    def unmatched(self, nlh):
+        seq = nlh.nlmsg_seq
+        tx = self._expired.get(seq)
+        if tx is not None and (not self._portid or nlh.nlmsg_pid == self._portid):
+            # late reply, forget the request by its last message
+            if nlh.nlmsg_type in (netlink.NLMSG_ERROR, netlink.NLMSG_DONE) \
+               or not (nlh.nlmsg_flags & netlink.NLM_F_MULTI or tx._ack):
+                del self._expired[seq]
+            return
+        self._put(nlh)
+
+    def process(self, timeout=None):
+        """receive a datagram and route its messages, blocking the loop
+
+        This is for Transaction.result() and iteration of a transaction,
+        await request() instead in coroutines.
+
+        @type timeout: number
+        @param timeout: seconds to wait, forever if None
+
+        @rtype: bool
+        @return: False on timeout
+        """
+        if self._lost is not None:
+            raise self._lost
+        try:
+            buf = self._transport.read(timeout)
+        except OSError as e:
+            if e.errno != errno.ENOBUFS:
+                raise
+            self.error_received(e)
+            return True
+        if buf is None:
+            return False
+        self.feed(buf)
+        return True
+
+    def error_received(self, exc):
+        # replies may have been lost
+        self.fail_all(exc)
+        self._put(exc)
+
+    def connection_lost(self, exc):
+        self._lost_error = exc
+        if exc is not None:
+            # raised from messages() before its end
+            self._put(exc)
+        else:
+            exc = os_error(errno.EBADF)
+        self._lost = exc
+        self.fail_all(exc)
+        self._put(None)
+
+    def close(self):
+        """detach from the socket"""
+        if self._transport is not None:
+            self._transport.close()
+
+    def request(self, nlh, timeout=None):
+        """send a request and wait for replies
+
+        The sequence number of nlh is assigned by this function. A request
+        completes on ACK, NLMSG_DONE, or the reply if neither NLM_F_ACK nor
+        NLM_F_MULTI is set. A request which is answered by nothing, without
+        NLM_F_ACK, never completes unless timeout is specified.
+
+        @type nlh: Nlmsg
+        @param nlh: request message
+        @type timeout: number
+        @param timeout: seconds to wait, then OSError ETIMEDOUT is raised
+
+        @rtype: awaitable, resulting list of Nlmsg
+        @return: replies, without ACK nor NLMSG_DONE
+        """
+        future = self._loop.create_future()
+        tx = self._register(nlh, lambda tx: _set_future(future, tx))
+        # forget the request if the future is cancelled, by wait_for()
+        future.add_done_callback(lambda f: self._forget(tx))
+        if self._lost is not None:
+            self._finish(tx.seq, self._lost)
+            return future
+        if timeout is not None:
+            handle = self._loop.call_later(timeout, self._expire, tx)
+            future.add_done_callback(lambda f: handle.cancel())
+        try:
+            self._transport.send_nlmsg(nlh)
+        except OSError as e:
+            self._finish(tx.seq, e)
+        return future
+
+    def _give_up(self, tx):
+        expired = self._expired
+        expired[tx.seq] = tx
+        if len(expired) > _EXPIRED_MAX:
+            del expired[next(iter(expired))]
+
+    def _expire(self, tx):
+        if self._requests.get(tx.seq) is tx:
+            self._finish(tx.seq, os_error(errno.ETIMEDOUT))
+            self._give_up(tx)
+
+    def _forget(self, tx):
+        if self._requests.get(tx.seq) is tx:
+            del self._requests[tx.seq]
+            self._give_up(tx)
+
+    def messages(self):
+        """async iterator for messages not belonging to requests
+
+        Messages are queued from the first call of this function.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            if self._lost is not None:
+                if self._lost_error is not None:
+                    self._put(self._lost_error)
+                self._put(None)
+        return MessageIterator(self._queue)
+
+
+class MessageIterator(object):
+    """async iterator yielding Nlmsg from a Dispatcher queue
+
+    OSError on receiving, ENOBUFS for example, is raised from the iteration.
+    """
+
+    def __init__(self, queue):
+        self._queue = queue
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self._queue.get()
+        if item is None:
+            self._queue.put_nowait(None)
+            raise StopAsyncIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+def dispatcher(nl, loop=None):
+    """get the Dispatcher attached to a socket, creating it if needed
+    """
+    d = nl._aio_dispatcher
+    if d is None:
+        if loop is None: loop = asyncio.get_running_loop()
+        _transport, d = create_netlink_connection(lambda: Dispatcher(loop), nl, loop)
+        nl._aio_dispatcher = d
+    return d
@@ -127,6 +127,27 @@ def attr_put(nlh, attr_type, data):
         raise OSError(errno.EINVAL, "data must be ctypes type")
     _cproto.c_attr_put(nlh, attr_type, size, ctypes.byref(data))
 
+# (add) mnl_attr_put() for an object which supports the buffer protocol,
+# bytes or memoryview for example, passed without creating ctypes data
+def _buffer_arg(data):
+    # returns (length, argument). bytes is passed as char * as is, writable
+    # buffer is shared by reference to its first byte, without creating an
+    # array type for each length.
+    if not isinstance(data, bytes):
+        data = memoryview(data).cast("B")
+        if data.readonly or not data:
+            data = data.tobytes()
+    size = len(data)
+    if size > 0xffff - _libmnlh.MNL_ATTR_HDRLEN:
+        raise OSError(errno.EINVAL, "data is too long")
+    if isinstance(data, memoryview):
+        return size, ctypes.byref(ctypes.c_char.from_buffer(data))
+    return size, data
+
+def attr_put_bytes(nlh, attr_type, data):
+    size, data = _buffer_arg(data)
+    _cproto.c_attr_put(nlh, attr_type, size, data)
+
 # void mnl_attr_put_u8(struct nlmsghdr *nlh, uint16_t type, uint8_t data)
 attr_put_u8		= _cproto.c_attr_put_u8
 
@@ -158,6 +179,11 @@ def attr_put_check(nlh, buflen, attr_type, data):
         raise OSError(errno.EINVAL, "data must be ctypes type")
     return _cproto.c_attr_put_check(nlh, buflen, attr_type, size, data)
 
+# (add) mnl_attr_put_check() for an object which supports the buffer protocol
+def attr_put_bytes_check(nlh, buflen, attr_type, data):
+    size, data = _buffer_arg(data)
+    return _cproto.c_attr_put_check(nlh, buflen, attr_type, size, data)
+
 # bool
 # mnl_attr_put_u8_check(struct nlmsghdr *nlh, size_t buflen,
 #                       uint16_t type, uint8_t data)
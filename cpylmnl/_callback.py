@@ -8,6 +8,16 @@ from .linux import netlinkh as netlink
 from . import _cproto
 
 
+def _cb_ctl_array(cb_ctls):
+    if cb_ctls is None:
+        return None, 0
+    cb_ctls_len = netlink.NLMSG_MIN_TYPE
+    c_cb_ctls = (_cproto.MNL_CB_T * cb_ctls_len)()
+    for i in range(cb_ctls_len):
+        c_cb_ctls[i] = cb_ctls.get(i, _cproto.MNL_CB_T())
+    return c_cb_ctls, cb_ctls_len
+
+
 def cb_run2(buf, seq, portid, cb_data, data, cb_ctls=None):
     """callback runqueue for netlink messages
 
@@ -41,15 +51,7 @@ def cb_run2(buf, seq, portid, cb_data, data, cb_ctls=None):
     @rtype: numner
     @return: callback return value - MNL_CB_ERROR, MNL_CB_STOP or MNL_CB_OK
     """
-    if cb_ctls is not None:
-        cb_ctls_len = netlink.NLMSG_MIN_TYPE
-        c_cb_ctls = (_cproto.MNL_CB_T * cb_ctls_len)()
-        for i in range(cb_ctls_len):
-            c_cb_ctls[i] = cb_ctls.get(i, _cproto.MNL_CB_T())
-    else:
-        cb_ctls_len = 0
-        c_cb_ctls = None
-
+    c_cb_ctls, cb_ctls_len = _cb_ctl_array(cb_ctls)
     c_buf = (ctypes.c_ubyte * len(buf)).from_buffer(buf)
     if cb_data is None: cb_data = _cproto.MNL_CB_T()
 
@@ -94,6 +96,73 @@ def cb_run(buf, seq, portid, cb_data, data):
     return ret
 
 
+class CallbackTable(object):
+    """cb_run2() arguments compiled once
+
+    The control callback array is built at creation, not per datagram as
+    cb_run2() does. The ctypes array over the receive buffer is also kept
+    while the same buffer is passed to run(), so that receiving into a
+    buffer and running the table allocates nothing per datagram:
+
+        table = CallbackTable(seq, portid, data_cb, data, {NLMSG_ERROR: err_cb})
+        buf = bytearray(MNL_SOCKET_BUFFER_SIZE)
+        ret = MNL_CB_OK
+        while ret > MNL_CB_STOP:
+            n = nl.recv_into(buf)
+            ret = table.run(buf, n)
+
+    Note that the buffer can not be resized while the table refers it.
+    seq, portid and data are attributes which can be changed between runs.
+    """
+
+    def __init__(self, seq, portid, cb_data, data, cb_ctls=None):
+        """compile callbacks
+
+        @type seq: number
+        @param seq: sequence number that we expect to receive
+        @type portid: number
+        @param portid: Netlink PortID that we expect to receive
+        @type cb_data: can be used mnl_cb_t or header nlmsg_cb decorator
+        @param cb_data: callback handler for data messages
+        @type data: any
+        @param data: data that will be passed to the data callback handler
+        @type cb_ctls: map
+        @param cb_ctls: dict of custom callback handlers from control messages
+        """
+        self.seq = seq
+        self.portid = portid
+        self.data = data
+        if cb_data is None: cb_data = _cproto.MNL_CB_T()
+        self._cb_data = cb_data
+        self._cb_ctls, self._cb_ctls_len = _cb_ctl_array(cb_ctls)
+        self._buf = None
+        self._c_buf = None
+
+    def run(self, buf, size=None):
+        """callback runqueue for netlink messages, see cb_run2()
+
+        @type buf: buffer (bytearray)
+        @param buf: buffer that contains the netlink messages
+        @type size: number
+        @param size: number of bytes to parse, whole buf if None
+
+        @rtype: numner
+        @return: callback return value - MNL_CB_ERROR, MNL_CB_STOP or MNL_CB_OK
+        """
+        if buf is not self._buf:
+            self._c_buf = (ctypes.c_ubyte * len(buf)).from_buffer(buf)
+            self._buf = buf
+        if size is None:
+            size = len(self._c_buf)
+        elif size > len(self._c_buf):
+            raise OSError(errno.EINVAL, errno.errorcode[errno.EINVAL])
+
+        ret = _cproto.c_cb_run2(self._c_buf, size, self.seq, self.portid,
+                                self._cb_data, self.data, self._cb_ctls, self._cb_ctls_len)
+        if ret < 0: raise _cproto.os_error()
+        return ret
+
+
 def _cb_factory(argcls, cftype):
     def _decorator(cbfunc):
         def _inner(ptr, data):
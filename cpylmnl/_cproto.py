@@ -100,6 +100,94 @@ c_socket_getsockopt.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p,
 c_socket_getsockopt.restype = ctypes.c_int
 
 
+###
+## libc socket calls which libmnl does not provide
+###
+LIBC = ctypes.CDLL("libc.so.6", use_errno=True)
+
+SOL_SOCKET	= 1
+SO_RCVBUF	= 8
+SO_RCVBUFFORCE	= 33
+
+MSG_TRUNC	= 0x20
+MSG_DONTWAIT	= 0x40
+MSG_WAITFORONE	= 0x10000
+
+class Iovec(ctypes.Structure):
+    """struct iovec"""
+    _fields_ = [("iov_base",	ctypes.c_void_p),	# void *iov_base
+                ("iov_len",	ctypes.c_size_t)]	# size_t iov_len
+
+class Msghdr(ctypes.Structure):
+    """struct msghdr"""
+    _fields_ = [("msg_name",		ctypes.c_void_p),		# void *msg_name
+                ("msg_namelen",		c_socklen_t),			# socklen_t msg_namelen
+                ("msg_iov",		ctypes.POINTER(Iovec)),		# struct iovec *msg_iov
+                ("msg_iovlen",		ctypes.c_size_t),		# size_t msg_iovlen
+                ("msg_control",		ctypes.c_void_p),		# void *msg_control
+                ("msg_controllen",	ctypes.c_size_t),		# size_t msg_controllen
+                ("msg_flags",		ctypes.c_int)]			# int msg_flags
+
+class Mmsghdr(ctypes.Structure):
+    """struct mmsghdr"""
+    _fields_ = [("msg_hdr",	Msghdr),		# struct msghdr msg_hdr
+                ("msg_len",	ctypes.c_uint)]		# unsigned int msg_len
+
+class Cmsghdr(ctypes.Structure):
+    """struct cmsghdr"""
+    _fields_ = [("cmsg_len",	ctypes.c_size_t),	# size_t cmsg_len
+                ("cmsg_level",	ctypes.c_int),		# int cmsg_level
+                ("cmsg_type",	ctypes.c_int)]		# int cmsg_type
+
+def CMSG_ALIGN(len):	return (len + ctypes.sizeof(ctypes.c_size_t) - 1) & ~(ctypes.sizeof(ctypes.c_size_t) - 1)
+def CMSG_SPACE(len):	return CMSG_ALIGN(ctypes.sizeof(Cmsghdr)) + CMSG_ALIGN(len)
+
+c_setsockopt = LIBC.setsockopt
+c_setsockopt.__doc__ = """\
+int setsockopt(int sockfd, int level, int optname,
+               const void *optval, socklen_t optlen)"""
+c_setsockopt.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_void_p, c_socklen_t]
+c_setsockopt.restype = ctypes.c_int
+
+c_getsockopt = LIBC.getsockopt
+c_getsockopt.__doc__ = """\
+int getsockopt(int sockfd, int level, int optname,
+               void *optval, socklen_t *optlen)"""
+c_getsockopt.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(c_socklen_t)]
+c_getsockopt.restype = ctypes.c_int
+
+c_recvmsg = LIBC.recvmsg
+c_recvmsg.__doc__ = """\
+ssize_t recvmsg(int sockfd, struct msghdr *msg, int flags)"""
+c_recvmsg.argtypes = [ctypes.c_int, ctypes.POINTER(Msghdr), ctypes.c_int]
+c_recvmsg.restype = c_ssize_t
+
+c_recv = LIBC.recv
+c_recv.__doc__ = """\
+ssize_t recv(int sockfd, void *buf, size_t len, int flags)"""
+c_recv.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int]
+c_recv.restype = c_ssize_t
+
+c_sendmsg = LIBC.sendmsg
+c_sendmsg.__doc__ = """\
+ssize_t sendmsg(int sockfd, const struct msghdr *msg, int flags)"""
+c_sendmsg.argtypes = [ctypes.c_int, ctypes.POINTER(Msghdr), ctypes.c_int]
+c_sendmsg.restype = c_ssize_t
+
+c_sendmmsg = LIBC.sendmmsg
+c_sendmmsg.__doc__ = """\
+int sendmmsg(int sockfd, struct mmsghdr *msgvec, unsigned int vlen, int flags)"""
+c_sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(Mmsghdr), ctypes.c_uint, ctypes.c_int]
+c_sendmmsg.restype = ctypes.c_int
+
+c_recvmmsg = LIBC.recvmmsg
+c_recvmmsg.__doc__ = """\
+int recvmmsg(int sockfd, struct mmsghdr *msgvec, unsigned int vlen,
+             int flags, struct timespec *timeout)"""
+c_recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(Mmsghdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+c_recvmmsg.restype = ctypes.c_int
+
+
 ###
 ## Netlink message API
 ###
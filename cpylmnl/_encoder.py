@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+"""schema driven message encoding in pure Python
+
+A message is described by attributes in a dict, or a sequence of (type,
+value) pairs, and the data type of each attribute is taken from a Policy.
+The exact message size is computed before writing, then the header, the
+extra header and all attributes are written into a buffer by struct, without
+nest_start(), put_u32() and nest_end() foreign calls per attribute.
+"""
+
+from __future__ import absolute_import
+
+import errno, struct
+
+from .linux import netlinkh as netlink
+from . import _libmnlh
+from ._util import os_error
+
+
+_HDRLEN = _libmnlh.MNL_NLMSG_HDRLEN
+_ATTR_HDRLEN = _libmnlh.MNL_ATTR_HDRLEN
+_nlmsghdr = struct.Struct("=IHHII").pack_into
+_nlattr = struct.Struct("=HH").pack_into
+_PAD = b"\0" * _libmnlh.MNL_ALIGNTO
+
+_INT_FORMATS = {_libmnlh.MNL_TYPE_U8: "B",
+                _libmnlh.MNL_TYPE_U16: "H",
+                _libmnlh.MNL_TYPE_U32: "I",
+                _libmnlh.MNL_TYPE_U64: "Q",
+                _libmnlh.MNL_TYPE_MSECS: "Q"}
+
+
+def _align(n):
+    return (n + _libmnlh.MNL_ALIGNTO - 1) & ~(_libmnlh.MNL_ALIGNTO - 1)
+
+
+def _string(v):
+    # bytes-like only, bytes(n) of a number is n NULs and str needs encoding
+    if isinstance(v, bytes):
+        return v
+    try:
+        return memoryview(v).cast("B")
+    except TypeError:
+        raise os_error(errno.EINVAL)
+
+
+class MessageEncoder(object):
+    """encode messages by a Policy
+
+    The value of an attribute is by the data type of its rule:
+
+    - MNL_TYPE_U8, U16, U32, U64 and MSECS: number, in byteorder
+    - MNL_TYPE_STRING: bytes, MNL_TYPE_NUL_STRING: bytes, NUL is appended.
+      Other than bytes-like object raises OSError EINVAL, encode str first
+    - MNL_TYPE_FLAG: bool, put only if true
+    - MNL_TYPE_NESTED: dict or sequence of (type, value), encoded by the
+      nested Policy of the rule, or by no Policy
+    - others, or no rule: buffer, bytes or ctypes instance for example
+
+    An attribute whose value is None is not put. As nfct-create-batch.py:
+
+        encoder = MessageEncoder(ct_policy, nlmsg_type, nlmsg_flags, ">")
+        attrs = {CTA_TUPLE_ORIG: {CTA_TUPLE_IP: {CTA_IP_V4_SRC: 0x01010101,
+                                                 CTA_IP_V4_DST: 0x02020202},
+                                  CTA_TUPLE_PROTO: {CTA_PROTO_NUM: IPPROTO_TCP,
+                                                    CTA_PROTO_SRC_PORT: sport,
+                                                    CTA_PROTO_DST_PORT: 1025}},
+                 CTA_TIMEOUT: 1000}
+        n = encoder.encode_into(buf, attrs, nfgenmsg, seq=seq, offset=offset)
+    """
+
+    def __init__(self, policy, nlmsg_type=0, nlmsg_flags=0, byteorder="="):
+        """create an encoder
+
+        @type policy: Policy
+        @param policy: schema of the top level attributes
+        @type nlmsg_type: number
+        @param nlmsg_type: nlmsg_type of encoded messages
+        @type nlmsg_flags: number
+        @param nlmsg_flags: nlmsg_flags of encoded messages
+        @type byteorder: str
+        @param byteorder: struct byte order of numbers, ">" for nfnetlink
+        """
+        self.policy = policy
+        self.nlmsg_type = nlmsg_type
+        self.nlmsg_flags = nlmsg_flags
+        self._ints = dict((t, struct.Struct(byteorder + c).pack)
+                          for t, c in _INT_FORMATS.items())
+
+    def _plan(self, attrs, policy, ops):
+        # appends (nla_type, payload len, payload) and returns aligned size.
+        # payload of a nested attribute is None, its attributes follow.
+        if policy is None:
+            rules = types = ()
+        else:
+            rules = policy._rules
+            types = policy._types
+        if isinstance(attrs, dict):
+            attrs = attrs.items()
+        total = 0
+        for t, v in attrs:
+            if v is None:
+                continue
+            if t < len(types) and types[t] is not None:
+                data_type = types[t]
+                min_len, max_len, check, nested = rules[t]
+            else:
+                data_type = None
+                min_len, max_len, check, nested = 0, None, None, None
+
+            if data_type == _libmnlh.MNL_TYPE_NESTED or (data_type is None
+                                                         and isinstance(v, (dict, list, tuple))):
+                i = len(ops)
+                ops.append(None)
+                plen = self._plan(v, nested, ops)
+                ops[i] = (t | netlink.NLA_F_NESTED, plen, None)
+                total += _ATTR_HDRLEN + plen
+                continue
+
+            if data_type in self._ints:
+                payload = self._ints[data_type](v)
+            elif data_type == _libmnlh.MNL_TYPE_FLAG:
+                if not v:
+                    continue
+                payload = b""
+            elif data_type == _libmnlh.MNL_TYPE_STRING:
+                payload = _string(v)
+            elif data_type == _libmnlh.MNL_TYPE_NUL_STRING:
+                payload = bytes(_string(v)) + b"\0"
+            elif isinstance(v, bytes):
+                payload = v
+            else:
+                payload = memoryview(v).cast("B")
+            plen = len(payload)
+            if plen < min_len or max_len is not None and plen > max_len:
+                raise os_error(errno.ERANGE)
+            ops.append((t, plen, payload))
+            total += _align(_ATTR_HDRLEN + plen)
+        return total
+
+    def size(self, attrs, extra=None):
+        """get exact size of a message
+
+        @type attrs: dict or sequence
+        @param attrs: attributes
+        @type extra: buffer
+        @param extra: extra header, ctypes instance or bytes
+
+        @rtype: number
+        @return: nlmsg_len of the message
+        """
+        elen = extra is not None and memoryview(extra).nbytes or 0
+        return _HDRLEN + _align(elen) + self._plan(attrs, self.policy, [])
+
+    def encode_into(self, buf, attrs, extra=None, seq=0, pid=0, offset=0):
+        """write a message into a buffer
+
+        On not enough space in buf, this function raises OSError ENOSPC and
+        nothing is written. On a payload length which does not match the
+        rule, it raises OSError ERANGE same as Attr.validate().
+
+        @type buf: bytearray or writable buffer
+        @param buf: destination
+        @type attrs: dict or sequence
+        @param attrs: attributes
+        @type extra: buffer
+        @param extra: extra header, ctypes instance or bytes
+        @type seq: number
+        @param seq: nlmsg_seq
+        @type pid: number
+        @param pid: nlmsg_pid
+        @type offset: number
+        @param offset: offset in buf
+
+        @rtype: number
+        @return: nlmsg_len of the message
+        """
+        ops = []
+        size = self._plan(attrs, self.policy, ops)
+        if extra is not None:
+            extra = memoryview(extra).cast("B")
+            elen = len(extra)
+        else:
+            elen = 0
+        size += _HDRLEN + _align(elen)
+        if len(buf) - offset < size:
+            raise os_error(errno.ENOSPC)
+        if not isinstance(buf, bytearray):
+            # ctypes array of NlmsgBatch.current_v() for example, or memoryview
+            buf = memoryview(buf).cast("B")
+
+        _nlmsghdr(buf, offset, size, self.nlmsg_type, self.nlmsg_flags, seq, pid)
+        o = offset + _HDRLEN
+        if elen:
+            buf[o:o + elen] = extra
+            pad = _align(elen) - elen
+            buf[o + elen:o + elen + pad] = _PAD[:pad]
+            o += elen + pad
+        for t, plen, payload in ops:
+            _nlattr(buf, o, _ATTR_HDRLEN + plen, t)
+            o += _ATTR_HDRLEN
+            if payload is None:
+                continue
+            buf[o:o + plen] = payload
+            pad = _align(plen) - plen
+            buf[o + plen:o + plen + pad] = _PAD[:pad]
+            o += plen + pad
+        return size
+
+    def encode(self, attrs, extra=None, seq=0, pid=0):
+        """create a message, see encode_into()
+
+        @rtype: bytearray
+        @return: the message
+        """
+        buf = bytearray(self.size(attrs, extra))
+        self.encode_into(buf, attrs, extra, seq, pid)
+        return buf
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""whole buffer attribute index by NumPy, for analytics over large dumps
+
+The buffer is scanned once in Python and every attribute header is recorded
+in a NumPy structured array. Then attribute payloads are selected and
+converted for all messages at once by array operations, instead of calling
+an attr_cb per attribute per message. NumPy is an optional dependency, it is
+required only when an index is created.
+"""
+
+from __future__ import absolute_import
+
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .linux import netlinkh as netlink
+from . import _libmnlh
+
+
+_nlmsghdr = struct.Struct("IHH").unpack_from
+_nlattr = struct.Struct("HH").unpack_from
+
+_HDRLEN = _libmnlh.MNL_NLMSG_HDRLEN
+_ATTR_HDRLEN = _libmnlh.MNL_ATTR_HDRLEN
+_ALIGN_MASK = ~(_libmnlh.MNL_ALIGNTO - 1)
+
+if numpy is not None:
+    # a data message
+    MSG_INDEX_DTYPE = numpy.dtype([("offset", numpy.uint32),	# in the buffer
+                                   ("len", numpy.uint32),	# nlmsg_len
+                                   ("type", numpy.uint16),	# nlmsg_type
+                                   ("flags", numpy.uint16)])	# nlmsg_flags
+
+    # an attribute, parent attribute precedes its nested attributes
+    ATTR_INDEX_DTYPE = numpy.dtype([("msg", numpy.uint32),	# index of MSG_INDEX_DTYPE
+                                    ("parent", numpy.int32),	# index of parent, -1 if top level
+                                    ("depth", numpy.uint16),	# 0 if top level
+                                    ("type", numpy.uint16),	# masked by NLA_TYPE_MASK
+                                    ("offset", numpy.uint32),	# of the header in the buffer
+                                    ("len", numpy.uint16)])	# nla_len
+else:
+    MSG_INDEX_DTYPE = ATTR_INDEX_DTYPE = None
+
+
+def _scan(buf, offset, end, policy, msg, parent, depth, records):
+    # records attributes in offset to end, and nested ones by policy
+    rules = policy is not None and policy._rules or ()
+    nrules = len(rules)
+    while end - offset >= _ATTR_HDRLEN:
+        alen, atype = _nlattr(buf, offset)
+        if alen < _ATTR_HDRLEN or alen > end - offset:
+            break
+        t = atype & netlink.NLA_TYPE_MASK
+        records.append((msg, parent, depth, t, offset, alen))
+        if t < nrules and rules[t] is not None and rules[t][3] is not None:
+            _scan(buf, offset + _ATTR_HDRLEN, offset + alen, rules[t][3],
+                  msg, len(records) - 1, depth + 1, records)
+        offset += (alen + _libmnlh.MNL_ALIGNTO - 1) & _ALIGN_MASK
+
+
+def index_attributes(buf, hdrlen, policy=None):
+    """index all attributes of the data messages in a buffer
+
+    The buffer can be a received datagram, or a concatenation of many. Only
+    data messages, whose type is NLMSG_MIN_TYPE or greater, are indexed.
+    Attributes are not validated. Nested attributes are indexed only if the
+    rule of the attribute in policy has a nested Policy.
+
+    @type buf: buffer
+    @param buf: buffer which holds netlink messages
+    @type hdrlen: number
+    @param hdrlen: length of the extra header, Nfgenmsg.csize() for example
+    @type policy: Policy
+    @param policy: policy to find nested attributes
+
+    @rtype: AttrIndex
+    @return: the index
+    """
+    if numpy is None:
+        raise ImportError("index_attributes requires numpy")
+    msgs = []
+    records = []
+    offset = 0
+    size = len(buf)
+    attr_start = _HDRLEN + _libmnlh.MNL_ALIGN(hdrlen)
+    while size - offset >= _HDRLEN:
+        nlmsg_len, nlmsg_type, nlmsg_flags = _nlmsghdr(buf, offset)
+        if nlmsg_len < _HDRLEN or nlmsg_len > size - offset:
+            break
+        if nlmsg_type >= netlink.NLMSG_MIN_TYPE:
+            _scan(buf, offset + attr_start, offset + nlmsg_len, policy,
+                  len(msgs), -1, 0, records)
+            msgs.append((offset, nlmsg_len, nlmsg_type, nlmsg_flags))
+        offset += (nlmsg_len + _libmnlh.MNL_ALIGNTO - 1) & _ALIGN_MASK
+    return AttrIndex(buf,
+                     numpy.array(msgs, dtype=MSG_INDEX_DTYPE),
+                     numpy.array(records, dtype=ATTR_INDEX_DTYPE))
+
+
+class AttrIndex(object):
+    """attributes of messages in a buffer, created by index_attributes()
+
+    An attribute is specified by a path, types from the top level to the
+    attribute. Fixed width payloads are gathered into a column, an array
+    which has an element per message:
+
+        idx = index_attributes(buf, Nfgenmsg.csize(), ct_policy)
+        orig_bytes = idx.column((CTA_COUNTERS_ORIG, CTA_COUNTERS_BYTES), ">u8")
+        src = idx.column((CTA_TUPLE_ORIG, CTA_TUPLE_IP, CTA_IP_V4_SRC), ">u4")
+
+    The index refers to the buffer, so it is valid only while the buffer
+    content is not overwritten.
+    """
+
+    def __init__(self, buf, msgs, attrs):
+        """create an index, use index_attributes()
+
+        @type buf: buffer
+        @param buf: buffer which holds netlink messages
+        @type msgs: numpy.ndarray
+        @param msgs: data messages, MSG_INDEX_DTYPE
+        @type attrs: numpy.ndarray
+        @param attrs: attributes, ATTR_INDEX_DTYPE
+        """
+        self.buf = buf
+        self.msgs = msgs
+        self.attrs = attrs
+
+    def __len__(self):
+        return len(self.msgs)
+
+    def select(self, path):
+        """get indexes of the attributes at a path
+
+        @type path: tuple
+        @param path: attribute types from the top level
+
+        @rtype: numpy.ndarray
+        @return: indexes of self.attrs
+        """
+        attrs = self.attrs
+        depth = len(path) - 1
+        found = numpy.flatnonzero((attrs["depth"] == depth) & (attrs["type"] == path[-1]))
+        parents = found
+        for t in reversed(path[:-1]):
+            parents = attrs["parent"][parents]
+            ok = attrs["type"][parents] == t
+            found = found[ok]
+            parents = parents[ok]
+        return found
+
+    def present(self, path):
+        """get which messages have the attribute at a path
+
+        @type path: tuple
+        @param path: attribute types from the top level
+
+        @rtype: numpy.ndarray
+        @return: bool per message
+        """
+        mask = numpy.zeros(len(self.msgs), dtype=bool)
+        mask[self.attrs["msg"][self.select(path)]] = True
+        return mask
+
+    def column(self, path, dtype, fill=0):
+        """gather a fixed width attribute payload per message
+
+        Byte order of the payload is specified by dtype, ">u4" for an IPv4
+        address or a network byte order value for example, and the column is
+        converted to native byte order at once. If a message has no such
+        attribute, or the payload is shorter than dtype, fill is set. If a
+        message has the attribute more than once, the last one is used.
+
+        @type path: tuple
+        @param path: attribute types from the top level
+        @type dtype: numpy.dtype
+        @param dtype: dtype of the payload
+        @type fill: number
+        @param fill: value for messages without the attribute
+
+        @rtype: numpy.ndarray
+        @return: a value per message, native byte order
+        """
+        dtype = numpy.dtype(dtype)
+        width = dtype.itemsize
+        found = self.select(path)
+        found = found[self.attrs["len"][found] >= _ATTR_HDRLEN + width]
+        starts = self.attrs["offset"][found].astype(numpy.intp) + _ATTR_HDRLEN
+        octets = numpy.frombuffer(self.buf, dtype=numpy.uint8)
+        values = octets[starts[:, None] + numpy.arange(width)].view(dtype).ravel()
+
+        col = numpy.full(len(self.msgs), fill, dtype=dtype.newbyteorder("="))
+        col[self.attrs["msg"][found]] = values
+        return col
+
+    def columns(self, spec, fill=0):
+        """gather columns, see column()
+
+        @type spec: dict
+        @param spec: name to (path, dtype)
+        @type fill: number
+        @param fill: value for messages without the attribute
+
+        @rtype: dict
+        @return: name to column
+        """
+        return dict((name, self.column(path, dtype, fill))
+                    for name, (path, dtype) in spec.items())
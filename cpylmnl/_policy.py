@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+
+"""declarative attribute validation, like struct nla_policy of the kernel
+
+Rules of a Policy are compiled into a list indexed by attribute type, so
+that validating an attribute is a lookup and a few comparisons in Python,
+instead of type_valid(), validate() and validate2() foreign calls from an
+attr_cb per attribute.
+"""
+
+from __future__ import absolute_import
+
+import errno, struct
+
+from .linux import netlinkh as netlink
+from . import _libmnlh
+from ._view import AttrView
+from ._util import os_error
+
+
+_nlattr = struct.Struct("HH").unpack_from
+_ATTR_HDRLEN = _libmnlh.MNL_ATTR_HDRLEN
+
+# static const size_t mnl_attr_data_type_len[MNL_TYPE_MAX]
+_DATA_TYPE_LEN = {_libmnlh.MNL_TYPE_U8: 1,
+                  _libmnlh.MNL_TYPE_U16: 2,
+                  _libmnlh.MNL_TYPE_U32: 4,
+                  _libmnlh.MNL_TYPE_U64: 8,
+                  _libmnlh.MNL_TYPE_MSECS: 8}
+
+# additional checks in __mnl_attr_validate()
+_CHECK_NONE = 0
+_CHECK_NUL = 1		# MNL_TYPE_NUL_STRING, terminated by NUL
+_CHECK_NESTED = 2	# MNL_TYPE_NESTED, empty or at least an attribute header
+
+
+class AttrTable(object):
+    """parsed attributes indexed by type, tb[] of libmnl examples
+
+    The table is a fixed size list sized from the *_MAX constant, instead of
+    a dict per message. An entry is AttrView, or None if the attribute is
+    not in the message. Attributes validated by a nested Policy are also
+    parsed, and their table is got by nested(). A table can be reused for
+    messages of the same type by clear(), or by passing it to parse_policy():
+
+        tb = AttrTable(CTA_MAX)
+        for nlh in messages:
+            nlh.parse_policy(Nfgenmsg.csize(), ct_policy, tb)
+            mark = tb.get_u32(CTA_MARK)
+            tuple_tb = tb.nested(CTA_TUPLE_ORIG)
+
+    The table can also be filled by attr_cb as a dict, tb[attr_type] = attr,
+    then ctypes Attr is stored. Typed accessors work with both.
+    """
+    __slots__ = ["attrs", "nesteds", "_empty"]
+
+    def __init__(self, maxtype):
+        """create an empty table
+
+        @type maxtype: number
+        @param maxtype: maximum attribute type, *_MAX constant
+        """
+        self._empty = (None, ) * (maxtype + 1)
+        self.attrs = list(self._empty)
+        self.nesteds = list(self._empty)
+
+    def clear(self):
+        """remove all attributes to reuse the table
+
+        Tables of nested attributes are kept to be reused too.
+        """
+        self.attrs[:] = self._empty
+
+    def __len__(self):
+        return len(self.attrs)
+
+    def __getitem__(self, t):
+        return self.attrs[t]
+
+    def __setitem__(self, t, attr):
+        self.attrs[t] = attr
+
+    def __contains__(self, t):
+        return 0 <= t < len(self.attrs) and self.attrs[t] is not None
+
+    def get(self, t, default=None):
+        """get an attribute
+
+        @type t: number
+        @param t: attribute type
+        @type default: any
+        @param default: returned if the attribute is not in the message
+
+        @rtype: AttrView
+        @return: the attribute
+        """
+        if t in self:
+            return self.attrs[t]
+        return default
+
+    def nested(self, t):
+        """get the table of a nested attribute parsed by nested policy
+
+        @type t: number
+        @param t: attribute type
+
+        @rtype: AttrTable
+        @return: table of the nested attributes, None if not in the message
+        """
+        if t in self:
+            return self.nesteds[t]
+        return None
+
+    def _nested_table(self, t, maxtype):
+        # reuse the nested table parsed before
+        ntb = self.nesteds[t]
+        if ntb is None:
+            ntb = self.nesteds[t] = AttrTable(maxtype)
+        else:
+            ntb.clear()
+        return ntb
+
+    def get_u8(self, t, default=None):
+        """get 8-bit unsigned integer attribute payload
+
+        @type t: number
+        @param t: attribute type
+        @type default: any
+        @param default: returned if the attribute is not in the message
+
+        @rtype: number
+        @return: the 8-bit value of the attribute payload
+        """
+        a = self.attrs[t]
+        return default if a is None else a.get_u8()
+
+    def get_u16(self, t, default=None):
+        """get 16-bit unsigned integer attribute payload, see get_u8()
+        """
+        a = self.attrs[t]
+        return default if a is None else a.get_u16()
+
+    def get_u32(self, t, default=None):
+        """get 32-bit unsigned integer attribute payload, see get_u8()
+        """
+        a = self.attrs[t]
+        return default if a is None else a.get_u32()
+
+    def get_u64(self, t, default=None):
+        """get 64-bit unsigned integer attribute payload, see get_u8()
+        """
+        a = self.attrs[t]
+        return default if a is None else a.get_u64()
+
+    def get_be16(self, t, default=None):
+        """get 16-bit attribute payload in network byte order, see get_u8()
+        """
+        a = self.attrs[t]
+        return default if a is None else a.get_be16()
+
+    def get_be32(self, t, default=None):
+        """get 32-bit attribute payload in network byte order, see get_u8()
+        """
+        a = self.attrs[t]
+        return default if a is None else a.get_be32()
+
+    def get_be64(self, t, default=None):
+        """get 64-bit attribute payload in network byte order, see get_u8()
+        """
+        a = self.attrs[t]
+        return default if a is None else a.get_be64()
+
+    def get_in_addr(self, t, default=None):
+        """get IPv4 address attribute payload as packed bytes, see get_u8()
+        """
+        a = self.attrs[t]
+        return default if a is None else a.get_in_addr()
+
+    def get_in6_addr(self, t, default=None):
+        """get IPv6 address attribute payload as packed bytes, see get_u8()
+        """
+        a = self.attrs[t]
+        return default if a is None else a.get_in6_addr()
+
+    def get_str(self, t, default=None):
+        """get string attribute payload, see get_u8()
+        """
+        a = self.attrs[t]
+        return default if a is None else a.get_str()
+
+    def get_flag(self, t):
+        """get whether a flag attribute is in the message
+
+        @type t: number
+        @param t: attribute type
+
+        @rtype: bool
+        @return: True if the attribute is in the message
+        """
+        return self.attrs[t] is not None
+
+
+class Policy(object):
+    """attribute validation policy
+
+    A policy maps attribute type to a rule, which is one of:
+
+    - MNL_TYPE_*, validated same as Attr.validate()
+    - (MNL_TYPE_*, expected length), same as Attr.validate2(), 0 for the
+      default length of the type
+    - (MNL_TYPE_NESTED, 0, Policy), the nested attributes are also validated
+      and parsed by the Policy
+
+    Attributes whose type is greater than maxtype are ignored, same as
+    examples skip attributes failed in Attr.type_valid(). Attributes which
+    have no rule are accepted without validation:
+
+        ip_policy = Policy(CTA_IP_MAX, {CTA_IP_V4_SRC: MNL_TYPE_U32,
+                                        CTA_IP_V6_SRC: (MNL_TYPE_BINARY, 16)})
+        tuple_policy = Policy(CTA_TUPLE_MAX,
+                              {CTA_TUPLE_IP: (MNL_TYPE_NESTED, 0, ip_policy)})
+    """
+
+    def __init__(self, maxtype, rules):
+        """compile rules
+
+        On an invalid data type, this function raises OSError EINVAL same as
+        Attr.validate().
+
+        @type maxtype: number
+        @param maxtype: maximum attribute type, *_MAX constant
+        @type rules: dict
+        @param rules: attribute type to rule
+        """
+        self.maxtype = maxtype
+        # (min payload len, max payload len or None, check, nested Policy)
+        self._rules = [None] * (maxtype + 1)
+        # MNL_TYPE_* of the rule, for encoding
+        self._types = [None] * (maxtype + 1)
+        for t, rule in rules.items():
+            if t < 0 or t > maxtype:
+                raise os_error(errno.EOPNOTSUPP)
+            self._rules[t] = self._compile(rule)
+            self._types[t] = rule[0] if isinstance(rule, tuple) else rule
+
+    @staticmethod
+    def _compile(rule):
+        if not isinstance(rule, tuple):
+            rule = (rule, )
+        data_type = rule[0]
+        exp_len = len(rule) > 1 and rule[1] or 0
+        nested = len(rule) > 2 and rule[2] or None
+        if data_type < 0 or data_type >= _libmnlh.MNL_TYPE_MAX:
+            raise os_error(errno.EINVAL)
+        if not exp_len:
+            exp_len = _DATA_TYPE_LEN.get(data_type, 0)
+        if nested is not None and data_type != _libmnlh.MNL_TYPE_NESTED:
+            raise os_error(errno.EINVAL)
+
+        min_len = exp_len
+        max_len = exp_len or None
+        check = _CHECK_NONE
+        if data_type == _libmnlh.MNL_TYPE_FLAG:
+            max_len = 0
+        elif data_type == _libmnlh.MNL_TYPE_NUL_STRING:
+            min_len = max(min_len, 1)
+            check = _CHECK_NUL
+        elif data_type == _libmnlh.MNL_TYPE_STRING:
+            min_len = max(min_len, 1)
+        elif data_type == _libmnlh.MNL_TYPE_NESTED:
+            check = _CHECK_NESTED
+        return min_len, max_len, check, nested
+
+    def parse(self, buf, offset, end, tb=None):
+        """validate and index attributes in a buffer
+
+        On validation error, this function raises OSError ERANGE or EINVAL,
+        same as Attr.validate().
+
+        @type buf: buffer
+        @param buf: buffer which holds the attributes
+        @type offset: number
+        @param offset: offset of the first attribute
+        @type end: number
+        @param end: end of the attributes
+        @type tb: AttrTable
+        @param tb: table to store, created if None, not cleared
+
+        @rtype: AttrTable
+        @return: the table
+        """
+        if tb is None:
+            tb = AttrTable(self.maxtype)
+        rules = self._rules
+        attrs = tb.attrs
+        maxtype = self.maxtype
+        while end - offset >= _ATTR_HDRLEN:
+            header = _nlattr(buf, offset)
+            alen, atype = header
+            if alen < _ATTR_HDRLEN or alen > end - offset:
+                break
+            t = atype & netlink.NLA_TYPE_MASK
+            if t <= maxtype:
+                rule = rules[t]
+                if rule is not None:
+                    plen = alen - _ATTR_HDRLEN
+                    min_len, max_len, check, nested = rule
+                    if plen < min_len:
+                        raise os_error(errno.ERANGE)
+                    if check == _CHECK_NUL:
+                        if buf[offset + alen - 1] not in (0, b"\0"):
+                            raise os_error(errno.EINVAL)
+                    elif check == _CHECK_NESTED:
+                        if 0 < plen < _ATTR_HDRLEN:
+                            raise os_error(errno.ERANGE)
+                    if max_len is not None and plen > max_len:
+                        raise os_error(errno.ERANGE)
+                    if nested is not None:
+                        nested.parse(buf, offset + _ATTR_HDRLEN, offset + alen,
+                                     tb._nested_table(t, nested.maxtype))
+                attrs[t] = AttrView(buf, offset, header)
+            offset += (alen + _libmnlh.MNL_ALIGNTO - 1) & ~(_libmnlh.MNL_ALIGNTO - 1)
+        return tb
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+"""thread-safe pool of bound netlink Socket
+"""
+
+from __future__ import absolute_import
+
+import errno, threading, time
+
+_now = getattr(time, "monotonic", time.time)
+
+
+class SocketPool(object):
+    """bounded pool of bound Socket shared by threads
+
+    Sockets are opened and bound lazily up to maxsize, and lent one thread
+    at a time so that sequence tracking is never shared:
+
+        pool = SocketPool(netlink.NETLINK_ROUTE)
+        with pool.socket() as nl:
+            nl.send_nlmsg(nlh)
+            ...
+
+    A socket is health-checked when it is returned, and closed instead of
+    being pooled again if:
+
+    - OSError EBADF or ENOBUFS was raised in the with block
+    - ENOBUFS was counted by the socket while lent, even if it was caught
+    - data remains in the receive queue, a dump left half-read for example
+    """
+
+    DISCARD_ERRNOS = (errno.EBADF, errno.ENOBUFS)
+
+    def __init__(self, bus, flags=0, maxsize=8, groups=0, backend="libmnl"):
+        """create a pool
+
+        @type bus: number
+        @param bus: the netlink socket bus ID (see NETLINK_* constants)
+        @type flags: number
+        @param flags: flags passed to socket(), see Socket
+        @type maxsize: number
+        @param maxsize: maximum number of sockets, idle and lent
+        @type groups: number
+        @param groups: the group of message passed to Socket.bind()
+        @type backend: string
+        @param backend: Socket backend, "libmnl" or "python"
+        """
+        self.bus = bus
+        self.flags = flags
+        self.maxsize = maxsize
+        self.groups = groups
+        self.backend = backend
+        self._idle = []
+        self._nsockets = 0
+        self._lent = {}
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._created = 0
+        self._discarded = 0
+
+    def _open(self):
+        from . import Socket, MNL_SOCKET_AUTOPID
+        nl = Socket(self.bus, self.flags, self.backend)
+        try:
+            nl.bind(self.groups, MNL_SOCKET_AUTOPID)
+        except:
+            nl.close()
+            raise
+        return nl
+
+    def acquire(self, timeout=None):
+        """get a socket from the pool
+
+        This function blocks while maxsize sockets are lent. The time spent
+        waiting is accounted in stats().
+
+        On timeout, this function raises OSError ETIMEDOUT.
+
+        @type timeout: number
+        @param timeout: seconds to wait, forever if None
+
+        @rtype: Socket
+        @return: bound socket, which must be returned by release()
+        """
+        start = _now()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise OSError(errno.EBADF, "pool is closed")
+                if self._idle or self._nsockets < self.maxsize:
+                    break
+                remain = None
+                if timeout is not None:
+                    remain = timeout - (_now() - start)
+                    if remain <= 0:
+                        self._account_wait(start)
+                        raise OSError(errno.ETIMEDOUT, "no socket available in pool")
+                waited = True
+                self._cond.wait(remain)
+            if waited:
+                self._account_wait(start)
+            if self._idle:
+                nl = self._idle.pop()
+            else:
+                # reserve the slot, open outside the lock
+                self._nsockets += 1
+                nl = None
+
+        if nl is None:
+            try:
+                nl = self._open()
+            except:
+                with self._cond:
+                    self._nsockets -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._created += 1
+
+        self._lent[id(nl)] = nl._enobufs
+        return nl
+
+    def _account_wait(self, start):
+        # with self._cond held
+        elapsed = _now() - start
+        self._waits += 1
+        self._wait_time += elapsed
+        if elapsed > self._max_wait:
+            self._max_wait = elapsed
+
+    def _healthy(self, nl, exc):
+        if isinstance(exc, EnvironmentError) and exc.errno in self.DISCARD_ERRNOS:
+            return False
+        if nl._enobufs != self._lent.get(id(nl), nl._enobufs):
+            return False
+        try:
+            # remaining data, a dump left half-read or unexpected replies
+            return not nl._poll(0)
+        except (EnvironmentError, ValueError):
+            return False
+
+    def release(self, nl, exc=None):
+        """return a socket to the pool
+
+        @type nl: Socket
+        @param nl: socket got by acquire()
+        @type exc: Exception
+        @param exc: error raised while using the socket, if any
+        """
+        healthy = self._healthy(nl, exc)
+        self._lent.pop(id(nl), None)
+        with self._cond:
+            keep = healthy and not self._closed
+            if keep:
+                self._idle.append(nl)
+            else:
+                self._nsockets -= 1
+                if not healthy:
+                    self._discarded += 1
+            self._cond.notify()
+        if not keep:
+            try:
+                nl.close()
+            except EnvironmentError:
+                pass
+
+    def socket(self, timeout=None):
+        """context manager lending a socket
+
+        @type timeout: number
+        @param timeout: seconds to wait, see acquire()
+        """
+        return _Lease(self, timeout)
+
+    def stats(self):
+        """pool counters
+
+        - "size": number of sockets opened now, idle and lent
+        - "idle": number of sockets in the pool
+        - "created", "discarded": sockets opened and closed by health-check
+        - "waits": number of acquire() which had to wait
+        - "wait_time", "max_wait": total and maximum seconds spent waiting
+
+        @rtype: dict
+        @return: counter name to value
+        """
+        with self._cond:
+            return {"size": self._nsockets,
+                    "idle": len(self._idle),
+                    "created": self._created,
+                    "discarded": self._discarded,
+                    "waits": self._waits,
+                    "wait_time": self._wait_time,
+                    "max_wait": self._max_wait}
+
+    def close(self):
+        """close idle sockets, lent ones are closed when returned
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._nsockets -= len(idle)
+            self._cond.notify_all()
+        for nl in idle:
+            nl.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, v, tb):
+        self.close()
+        return False
+
+
+class _Lease(object):
+    __slots__ = ["_pool", "_timeout", "_nl"]
+
+    def __init__(self, pool, timeout):
+        self._pool = pool
+        self._timeout = timeout
+        self._nl = None
+
+    def __enter__(self):
+        self._nl = self._pool.acquire(self._timeout)
+        return self._nl
+
+    def __exit__(self, t, v, tb):
+        nl, self._nl = self._nl, None
+        self._pool.release(nl, v)
+        return False
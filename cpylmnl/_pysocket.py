@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+libmnl (http://www.netfilter.org/projects/libmnl/) socket.c
+    implementation by python socket module, same interface as _socket.py.
+    nl is a socket.socket object here.
+"""
+
+from __future__ import print_function, absolute_import
+
+import errno, ctypes, socket
+
+from .linux import netlinkh as netlink
+from . import _libmnlh
+from . import _cproto
+from . import _socket
+
+_KERNEL = (0, 0)
+
+# int mnl_socket_get_fd(const struct mnl_socket *nl)
+def socket_get_fd(nl):
+    return nl.fileno()
+
+# unsigned int mnl_socket_get_portid(const struct mnl_socket *nl)
+def socket_get_portid(nl):
+    return nl.getsockname()[0]
+
+# struct mnl_socket *mnl_socket_open(int bus)
+def socket_open(bus):
+    return socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, bus)
+
+# struct mnl_socket *mnl_socket_open2(int bus, int flags)
+def socket_open2(bus, flags):
+    return socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | flags, bus)
+
+# struct mnl_socket *mnl_socket_fdopen(int fd)
+def socket_fdopen(sock):
+    # pass socket.socket, not fd
+    if sock.family != socket.AF_NETLINK or sock.type != socket.SOCK_RAW:
+        raise OSError(errno.EINVAL, errno.errorcode[errno.EINVAL])
+    return sock
+
+# int mnl_socket_bind(struct mnl_socket *nl, unsigned int groups, pid_t pid)
+def socket_bind(nl, groups, pid):
+    nl.bind((pid, groups))
+
+# mnl_socket_sendto(const struct mnl_socket *nl, const void *buf, size_t len)
+def socket_sendto(nl, buf):
+    if buf is None:
+        return nl.sendto(b"", _KERNEL)
+    return nl.sendto(buf, _KERNEL)
+
+def _nlmsg_buffer(nlh):
+    # memoryview from nlh to the end of the buffer which nlh was created on
+    # by Nlmsg(buf, offset), cached in the instance. None if nlh was created
+    # from a pointer.
+    try:
+        return nlh.__dict__["_buffer"]
+    except KeyError:
+        pass
+    base = nlh._objects and nlh._objects.get("ffffffff")
+    if isinstance(base, memoryview):
+        base = base.cast("B")
+        offset = ctypes.addressof(nlh) - ctypes.addressof(ctypes.c_char.from_buffer(base))
+        mv = base[offset:]
+    else:
+        mv = None
+    nlh.__dict__["_buffer"] = mv
+    return mv
+
+def _nlmsg_view(nlh):
+    n = nlh.nlmsg_len
+    mv = _nlmsg_buffer(nlh)
+    if mv is None or n > len(mv):
+        return (ctypes.c_ubyte * n).from_address(ctypes.addressof(nlh))
+    return mv[:n]
+
+def socket_send_nlmsg(nl, nlh):
+    return nl.sendto(_nlmsg_view(nlh), _KERNEL)
+
+# ssize_t sendmsg(int sockfd, const struct msghdr *msg, int flags)
+def socket_send_nlmsgs(nl, msgs):
+    return nl.sendmsg([_nlmsg_view(nlh) for nlh in msgs], (), 0, _KERNEL)
+
+# int sendmmsg(int sockfd, struct mmsghdr *msgvec, unsigned int vlen, int flags)
+def socket_sendmmsg_nlmsgs(nl, msgs, vec):
+    return _socket.fd_sendmmsg_nlmsgs(nl.fileno(), msgs, vec)
+
+# ssize_t
+# mnl_socket_recvfrom(const struct mnl_socket *nl, void *buf, size_t bufsiz)
+def socket_recv(nl, size):
+    buf = bytearray(size)
+    ret = socket_recv_into(nl, buf)
+    del buf[ret:]
+    return buf
+
+def socket_recv_into(nl, buf):
+    return socket_recvfrom(nl, buf, len(buf))
+
+def socket_recvfrom(nl, buf, size):
+    # MSG_TRUNC makes netlink return the real length of the datagram
+    ret, addr = nl.recvfrom_into(buf, size, _cproto.MSG_TRUNC)
+    if ret > size:
+        raise OSError(errno.ENOSPC, errno.errorcode[errno.ENOSPC])
+    # same as mnl_socket_recvfrom() checks addrlen, address is None
+    # if the kernel did not fill sockaddr_nl
+    if addr is None:
+        raise OSError(errno.EINVAL, errno.errorcode[errno.EINVAL])
+    return ret
+
+# ssize_t recv(int sockfd, void *buf, size_t len, int flags)
+def socket_recv_nowait(nl, buf):
+    # returns None instead of raising EAGAIN
+    size = len(buf)
+    try:
+        ret = nl.recv_into(buf, size, _cproto.MSG_DONTWAIT | _cproto.MSG_TRUNC)
+    except BlockingIOError:
+        return None
+    if ret > size:
+        raise OSError(errno.ENOSPC, errno.errorcode[errno.ENOSPC])
+    return ret
+
+_PKTINFO_SPACE = socket.CMSG_SPACE(ctypes.sizeof(netlink.NlPktinfo))
+
+# ssize_t recvmsg(int sockfd, struct msghdr *msg, int flags)
+def socket_recv_pktinfo(nl, buf):
+    # returns (nbytes, group) from NETLINK_PKTINFO control message,
+    # group is 0 if it was not a multicast message
+    nbytes, ancdata, flags, addr = nl.recvmsg_into([buf], _PKTINFO_SPACE)
+    if flags & _cproto.MSG_TRUNC:
+        raise OSError(errno.ENOSPC, errno.errorcode[errno.ENOSPC])
+    for level, optype, data in ancdata:
+        if level == _libmnlh.SOL_NETLINK and optype == netlink.NETLINK_PKTINFO:
+            return nbytes, netlink.NlPktinfo.from_buffer_copy(data).group
+    return nbytes, 0
+
+# int recvmmsg(int sockfd, struct mmsghdr *msgvec, unsigned int vlen,
+#              int flags, struct timespec *timeout)
+def socket_recvmmsg(nl, mbufs, flags=_cproto.MSG_WAITFORONE):
+    return _socket.fd_recvmmsg(nl.fileno(), mbufs, flags)
+
+# int mnl_socket_close(struct mnl_socket *nl)
+def socket_close(nl):
+    nl.close()
+    return 0
+
+# int mnl_socket_setsockopt(const struct mnl_socket *nl, int type,
+#                           void *buf, socklen_t len)
+def socket_setsockopt(nl, optype, buf):
+    nl.setsockopt(_libmnlh.SOL_NETLINK, optype, bytes(buf))
+
+# int mnl_socket_getsockopt(const struct mnl_socket *nl, int type,
+#                           void *buf, socklen_t *len)
+def socket_getsockopt(nl, optype, size):
+    return nl.getsockopt(_libmnlh.SOL_NETLINK, optype, size)
+
+def socket_getsockopt_ctype(nl, optype, cls):
+    try:
+        size = ctypes.sizeof(cls)
+    except TypeError:
+        raise OSError(errno.EINVAL, "value must be ctypes type")
+    return cls.from_buffer_copy(nl.getsockopt(_libmnlh.SOL_NETLINK, optype, size)).value
+
+# int setsockopt(int sockfd, int level, int optname,
+#                const void *optval, socklen_t optlen)
+def socket_setsockopt_int(nl, level, optname, value):
+    nl.setsockopt(level, optname, value)
+
+# int getsockopt(int sockfd, int level, int optname,
+#                void *optval, socklen_t *optlen)
+def socket_getsockopt_int(nl, level, optname):
+    return nl.getsockopt(level, optname)
@@ -2,9 +2,10 @@
 
 from __future__ import print_function, absolute_import
 
-import ctypes
+import os, errno, ctypes, socket, struct
 
 from .linux import netlinkh as netlink
+from . import _libmnlh
 from . import _cproto
 
 # int mnl_socket_get_fd(const struct mnl_socket *nl)
@@ -53,16 +54,100 @@ def socket_send_nlmsg(nl, nlh):
     if ret < 0: raise _cproto.os_error()
     return ret
 
+# destination of sendmsg() and sendmmsg(), the kernel
+_KERNEL = netlink.SockaddrNl(nl_family=socket.AF_NETLINK)
+
+def _nlmsg_iovecs(msgs):
+    iovs = (_cproto.Iovec * len(msgs))()
+    for i, nlh in enumerate(msgs):
+        iovs[i].iov_base = ctypes.addressof(nlh)
+        iovs[i].iov_len = nlh.nlmsg_len
+    return iovs
+
+def _set_msghdr(hdr, iov, iovlen):
+    hdr.msg_name = ctypes.addressof(_KERNEL)
+    hdr.msg_namelen = ctypes.sizeof(_KERNEL)
+    hdr.msg_iov = iov
+    hdr.msg_iovlen = iovlen
+
+# ssize_t sendmsg(int sockfd, const struct msghdr *msg, int flags)
+def socket_send_nlmsgs(nl, msgs):
+    return fd_send_nlmsgs(_cproto.c_socket_get_fd(nl), msgs)
+
+def fd_send_nlmsgs(fd, msgs):
+    iovs = _nlmsg_iovecs(msgs)
+    hdr = _cproto.Msghdr()
+    _set_msghdr(hdr, iovs, len(iovs))
+    ret = _cproto.c_sendmsg(fd, hdr, 0)
+    if ret < 0: raise _cproto.os_error()
+    return ret
+
+# int sendmmsg(int sockfd, struct mmsghdr *msgvec, unsigned int vlen, int flags)
+class MmsgSendVector(object):
+    """preallocated struct iovec and mmsghdr vectors for sendmmsg()
+
+    msgvec[i] refers iovs[i], which is set to a message by set() with one
+    struct.pack_into() for all of them.
+    """
+
+    def __init__(self, nmsgs):
+        self.iovs = (_cproto.Iovec * nmsgs)()
+        self.msgvec = (_cproto.Mmsghdr * nmsgs)()
+        base = ctypes.addressof(self.iovs)
+        isize = ctypes.sizeof(_cproto.Iovec)
+        iovp = ctypes.POINTER(_cproto.Iovec)
+        for i in range(nmsgs):
+            _set_msghdr(self.msgvec[i].msg_hdr, ctypes.cast(base + i * isize, iovp), 1)
+        self._pack_n = 0
+        self._pack = None
+
+    def __len__(self):
+        return len(self.msgvec)
+
+    def set(self, msgs):
+        n = len(msgs)
+        if n != self._pack_n:
+            # iov_base and iov_len
+            self._pack = struct.Struct("PN" * n).pack_into
+            self._pack_n = n
+        iovs = []
+        for nlh in msgs:
+            iovs.append(ctypes.addressof(nlh))
+            iovs.append(nlh.nlmsg_len)
+        self._pack(self.iovs, 0, *iovs)
+
+def socket_sendmmsg_nlmsgs(nl, msgs, vec):
+    return fd_sendmmsg_nlmsgs(_cproto.c_socket_get_fd(nl), msgs, vec)
+
+def fd_sendmmsg_nlmsgs(fd, msgs, vec):
+    # vec is MmsgSendVector, not shorter than msgs
+    nmsgs = len(msgs)
+    vec.set(msgs)
+    msgvec = vec.msgvec
+    # sendmmsg() may return before sending all, error is reported
+    # by the next call in that case
+    sent = 0
+    while sent < nmsgs:
+        ret = _cproto.c_sendmmsg(fd, sent and ctypes.byref(msgvec[sent]) or msgvec,
+                                 nmsgs - sent, 0)
+        if ret < 0:
+            e = _cproto.os_error()
+            # messages before the failed one have been sent
+            e.sent = sent
+            raise e
+        sent += ret
+    return sent
+
 # ssize_t
 # mnl_socket_recvfrom(const struct mnl_socket *nl, void *buf, size_t bufsiz)
 def socket_recv(nl, size):
     # returns mutable buffer
     buf = bytearray(size)
     ret = socket_recv_into(nl, buf)
-    if ret < 0: raise _cproto.os_error()
-    # We did not read as many bytes as we anticipated, resize the
-    # string if possible and be successful.
-    return buf[:ret]
+    # We did not read as many bytes as we anticipated, shrink the
+    # buffer in place instead of copying it by slicing.
+    del buf[ret:]
+    return buf
 
 def socket_recv_into(nl, buf):
     c_buf = (ctypes.c_char * len(buf)).from_buffer(buf)
@@ -70,6 +155,119 @@ def socket_recv_into(nl, buf):
     if ret < 0: raise _cproto.os_error()
     return ret
 
+def socket_recvfrom(nl, c_buf, size):
+    # c_buf is a ctypes object prepared by caller
+    ret = _cproto.c_socket_recvfrom(nl, c_buf, size)
+    if ret < 0: raise _cproto.os_error()
+    return ret
+
+# ssize_t recv(int sockfd, void *buf, size_t len, int flags)
+def socket_recv_nowait(nl, buf):
+    return fd_recv_nowait(_cproto.c_socket_get_fd(nl), buf)
+
+def fd_recv_nowait(fd, buf):
+    # returns None instead of raising EAGAIN
+    size = len(buf)
+    c_buf = (ctypes.c_char * size).from_buffer(buf)
+    ret = _cproto.c_recv(fd, c_buf, size, _cproto.MSG_DONTWAIT | _cproto.MSG_TRUNC)
+    if ret < 0:
+        e = _cproto.os_error()
+        if e.errno == errno.EAGAIN: return None
+        raise e
+    # MSG_TRUNC makes netlink return the real length of the datagram
+    if ret > size:
+        raise OSError(errno.ENOSPC, errno.errorcode[errno.ENOSPC])
+    return ret
+
+# ssize_t recvmsg(int sockfd, struct msghdr *msg, int flags)
+def socket_recv_pktinfo(nl, buf):
+    return fd_recv_pktinfo(_cproto.c_socket_get_fd(nl), buf)
+
+def fd_recv_pktinfo(fd, buf):
+    # returns (nbytes, group) from NETLINK_PKTINFO control message,
+    # group is 0 if it was not a multicast message
+    size = len(buf)
+    c_buf = (ctypes.c_char * size).from_buffer(buf)
+    addr = netlink.SockaddrNl()
+    iov = _cproto.Iovec(ctypes.addressof(c_buf), size)
+    control = (ctypes.c_ubyte * _cproto.CMSG_SPACE(ctypes.sizeof(netlink.NlPktinfo)))()
+    hdr = _cproto.Msghdr()
+    hdr.msg_name = ctypes.addressof(addr)
+    hdr.msg_namelen = ctypes.sizeof(addr)
+    hdr.msg_iov = ctypes.pointer(iov)
+    hdr.msg_iovlen = 1
+    hdr.msg_control = ctypes.addressof(control)
+    hdr.msg_controllen = ctypes.sizeof(control)
+    ret = _cproto.c_recvmsg(fd, hdr, 0)
+    if ret < 0: raise _cproto.os_error()
+    # same as mnl_socket_recvfrom() checks
+    if hdr.msg_flags & _cproto.MSG_TRUNC:
+        raise OSError(errno.ENOSPC, errno.errorcode[errno.ENOSPC])
+    if hdr.msg_namelen != ctypes.sizeof(addr):
+        raise OSError(errno.EINVAL, errno.errorcode[errno.EINVAL])
+
+    hdrlen = _cproto.CMSG_ALIGN(ctypes.sizeof(_cproto.Cmsghdr))
+    offset = 0
+    while offset + hdrlen <= hdr.msg_controllen:
+        cmsg = _cproto.Cmsghdr.from_buffer(control, offset)
+        if cmsg.cmsg_len < hdrlen:
+            break
+        if cmsg.cmsg_level == _libmnlh.SOL_NETLINK and cmsg.cmsg_type == netlink.NETLINK_PKTINFO:
+            return ret, netlink.NlPktinfo.from_buffer(control, offset + hdrlen).group
+        offset += _cproto.CMSG_ALIGN(cmsg.cmsg_len)
+    return ret, 0
+
+# int recvmmsg(int sockfd, struct mmsghdr *msgvec, unsigned int vlen,
+#              int flags, struct timespec *timeout)
+class MmsgBuffers(object):
+    """preallocated receive buffers and struct mmsghdr vector for recvmmsg()"""
+
+    def __init__(self, nmsgs, size):
+        self.size = size
+        self.bufs = [bytearray(size) for i in range(nmsgs)]
+        self.views = [memoryview(b) for b in self.bufs]
+        self._c_bufs = [(ctypes.c_ubyte * size).from_buffer(b) for b in self.bufs]
+        self._addrs = (netlink.SockaddrNl * nmsgs)()
+        self._iovs = (_cproto.Iovec * nmsgs)()
+        self.msgvec = (_cproto.Mmsghdr * nmsgs)()
+        for i in range(nmsgs):
+            self._iovs[i].iov_base = ctypes.addressof(self._c_bufs[i])
+            self._iovs[i].iov_len = size
+            hdr = self.msgvec[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._addrs[i])
+            hdr.msg_iov = ctypes.pointer(self._iovs[i])
+            hdr.msg_iovlen = 1
+            hdr.msg_namelen = ctypes.sizeof(netlink.SockaddrNl)
+        self.nrecv = 0
+
+    def __len__(self):
+        return len(self.bufs)
+
+
+def socket_recvmmsg(nl, mbufs, flags=_cproto.MSG_WAITFORONE):
+    return fd_recvmmsg(_cproto.c_socket_get_fd(nl), mbufs, flags)
+
+# MSG_TRUNC makes netlink set the real length of each datagram to msg_len,
+# a truncated datagram is not an error of the whole call
+def fd_recvmmsg(fd, mbufs, flags=_cproto.MSG_WAITFORONE):
+    # msg_namelen and msg_flags are value-result, reset the ones
+    # which the kernel wrote at the previous call
+    namelen = ctypes.sizeof(netlink.SockaddrNl)
+    for i in range(mbufs.nrecv):
+        hdr = mbufs.msgvec[i].msg_hdr
+        hdr.msg_namelen = namelen
+        hdr.msg_flags = 0
+    mbufs.nrecv = 0
+    ret = _cproto.c_recvmmsg(fd, mbufs.msgvec, len(mbufs), flags | _cproto.MSG_TRUNC, None)
+    if ret < 0: raise _cproto.os_error()
+    mbufs.nrecv = ret
+    # same as mnl_socket_recvfrom() checks, except truncation
+    for i in range(ret):
+        hdr = mbufs.msgvec[i].msg_hdr
+        if hdr.msg_namelen != namelen:
+            raise OSError(errno.EINVAL, errno.errorcode[errno.EINVAL])
+    return ret
+
 # int mnl_socket_close(struct mnl_socket *nl)
 def socket_close(nl):
     ret = _cproto.c_socket_close(nl)
@@ -104,3 +302,34 @@ def socket_getsockopt_ctype(nl, optype, cls):
     if ret < 0: raise _cproto.os_error()
     # return optval
     return optval.value
+
+# int setsockopt(int sockfd, int level, int optname,
+#                const void *optval, socklen_t optlen)
+def socket_setsockopt_int(nl, level, optname, value):
+    optval = ctypes.c_int(value)
+    ret = _cproto.c_setsockopt(_cproto.c_socket_get_fd(nl), level, optname,
+                               ctypes.byref(optval), ctypes.sizeof(optval))
+    if ret < 0: raise _cproto.os_error()
+
+# int getsockopt(int sockfd, int level, int optname,
+#                void *optval, socklen_t *optlen)
+def socket_getsockopt_int(nl, level, optname):
+    optval = ctypes.c_int()
+    optlen = _cproto.c_socklen_t(ctypes.sizeof(optval))
+    ret = _cproto.c_getsockopt(_cproto.c_socket_get_fd(nl), level, optname,
+                               ctypes.byref(optval), ctypes.byref(optlen))
+    if ret < 0: raise _cproto.os_error()
+    return optval.value
+
+def fd_drops(fd):
+    """number of datagrams dropped by the kernel from /proc/net/netlink"""
+    ino = os.fstat(fd).st_ino
+    with open("/proc/net/netlink") as f:
+        fields = f.readline().split()
+        idrops = fields.index("Drops")
+        iino = fields.index("Inode")
+        for line in f:
+            cols = line.split()
+            if int(cols[iino]) == ino:
+                return int(cols[idrops])
+    return None
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""precompiled message, copied and patched per send
+
+A message which differs only in a few fields per send, a verdict of
+nfnetlink_queue for example, is built once by Nlmsg. Then sending it costs
+a buffer copy and struct.pack_into() per changed field, instead of
+put_header(), put_extra_header_as() and put() ctypes calls per message.
+"""
+
+from __future__ import absolute_import
+
+import errno, struct
+
+from . import _libmnlh
+from ._view import NlmsgView
+from ._util import os_error
+
+
+# struct nlmsghdr, nlmsg_len is fixed by the template
+_HEADER_FIELDS = (("type", 4, "=H"),
+                  ("flags", 6, "=H"),
+                  ("seq", 8, "=I"),
+                  ("pid", 12, "=I"))
+
+
+class MessageTemplate(object):
+    """netlink message template
+
+    Fields of the netlink header, type, flags, seq and pid, are defined in
+    native byte order. Other fields are added by offset in the message and
+    struct format. For example, a verdict of nf-queue.py:
+
+        tmpl = MessageTemplate(nlh)
+        tmpl.add_field("queue_num", MNL_NLMSG_HDRLEN + Nfgenmsg.res_id.offset, ">H")
+        off = tmpl.attr_offset(Nfgenmsg.csize(), NFQA_VERDICT_HDR)
+        tmpl.add_field("verdict", off + NfqnlMsgVerdictHdr.verdict.offset, ">I")
+        tmpl.add_field("id", off + NfqnlMsgVerdictHdr.id.offset, ">I")
+        ...
+        n = tmpl.render_into(buf, seq=seq, verdict=NF_ACCEPT, id=packet_id)
+        nl.sendto(memoryview(buf)[:n])
+    """
+
+    def __init__(self, nlh, fields=None):
+        """create a template from a message
+
+        The message is copied, so that nlh can be reused after this.
+
+        @type nlh: Nlmsg
+        @param nlh: the message, nlmsg_len must be set
+        @type fields: dict
+        @param fields: additional field name to (offset, format)
+        """
+        self._msg = bytes(nlh.marshal_binary())
+        self._fields = {}
+        for name, offset, fmt in _HEADER_FIELDS:
+            self.add_field(name, offset, fmt)
+        for name, (offset, fmt) in (fields or {}).items():
+            self.add_field(name, offset, fmt)
+
+    def __len__(self):
+        return len(self._msg)
+
+    def add_field(self, name, offset, fmt):
+        """add a field patched by render_into()
+
+        On a field which exceeds the message, this function raises OSError
+        EINVAL.
+
+        @type name: str
+        @param name: keyword for render_into()
+        @type offset: number
+        @param offset: offset in the message, including the netlink header
+        @type fmt: str
+        @param fmt: struct format, ">I" for network byte order u32 for example
+        """
+        s = struct.Struct(fmt)
+        if offset < 0 or offset + s.size > len(self._msg):
+            raise os_error(errno.EINVAL)
+        self._fields[name] = (s.pack_into, offset)
+
+    def attr_offset(self, hdrlen, *path):
+        """get the payload offset of an attribute in the message
+
+        On no such attribute, this function raises OSError ENOENT, on empty
+        path OSError EINVAL.
+
+        @type hdrlen: number
+        @param hdrlen: length of the extra header
+        @type path: numbers
+        @param path: attribute types from the top level, for nested one
+
+        @rtype: number
+        @return: offset of the attribute payload in the message
+        """
+        if not path:
+            raise os_error(errno.EINVAL)
+        attrs = NlmsgView(self._msg).attributes(hdrlen)
+        for t in path:
+            for attr in attrs:
+                if attr.get_type() == t:
+                    break
+            else:
+                raise os_error(errno.ENOENT)
+            attrs = attr.nesteds()
+        return attr.offset + _libmnlh.MNL_ATTR_HDRLEN
+
+    def render_into(self, buf, offset=0, **fields):
+        """copy the message into a buffer and patch fields
+
+        On not enough space in the buffer, this function raises OSError
+        ENOSPC, on unknown field name OSError EINVAL.
+
+        @type buf: bytearray or writable buffer
+        @param buf: destination
+        @type offset: number
+        @param offset: offset in buf
+        @type fields: numbers
+        @param fields: field name to value
+
+        @rtype: number
+        @return: length of the message
+        """
+        msg = self._msg
+        size = len(msg)
+        if len(buf) - offset < size:
+            raise os_error(errno.ENOSPC)
+        buf[offset:offset + size] = msg
+        defs = self._fields
+        for name, value in fields.items():
+            try:
+                pack_into, foff = defs[name]
+            except KeyError:
+                raise os_error(errno.EINVAL)
+            pack_into(buf, offset + foff, value)
+        return size
+
+    def render(self, **fields):
+        """create a message from the template, see render_into()
+
+        @type fields: numbers
+        @param fields: field name to value
+
+        @rtype: bytearray
+        @return: the message
+        """
+        buf = bytearray(len(self._msg))
+        self.render_into(buf, 0, **fields)
+        return buf
@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+
+"""pipelined request and response over netlink Socket
+
+Each request gets its own sequence number, so that many requests can be in
+flight on a socket at the same time. Replies, multipart dumps terminated by
+NLMSG_DONE and ACKs are routed back to the request by nlmsg_seq.
+"""
+
+from __future__ import absolute_import
+
+import errno, struct, itertools, time, abc
+
+from .linux import netlinkh as netlink
+from . import _libmnlh
+from ._util import os_error
+
+
+# nlmsg_len, nlmsg_type, nlmsg_flags, nlmsg_seq, nlmsg_pid
+_nlmsghdr = struct.Struct("IHHII").unpack_from
+_errno = struct.Struct("i").unpack_from
+_errno_size = struct.calcsize("i")
+_now = getattr(time, "monotonic", time.time)
+
+
+class Transaction(object):
+    """a request in flight
+
+    This is a future-like object of the replies to a request. Replies are
+    Nlmsg except ACK and NLMSG_DONE, which complete the transaction. Error
+    ACK and error in NLMSG_DONE are raised as OSError, same as cb_run()
+    which also raises EINTR if a dump was interrupted (NLM_F_DUMP_INTR).
+    Extended ACK is available as ext_ack attribute of the OSError, see
+    ExtAck.os_error().
+    """
+    __slots__ = ["seq", "replies", "_ack", "_done", "_error", "_intr",
+                 "_router", "_callback"]
+
+    def __init__(self, router, seq, ack, callback=None):
+        self.seq = seq
+        self.replies = []
+        self._ack = ack
+        self._done = False
+        self._error = None
+        self._intr = False
+        self._router = router
+        self._callback = callback
+
+    def _complete(self, exc=None):
+        self._done = True
+        self._error = exc
+        self._router = None
+        if self._callback is not None:
+            self._callback(self)
+
+    def done(self):
+        """whether the transaction has been completed
+
+        @rtype: bool
+        @return: True if completed
+        """
+        return self._done
+
+    def exception(self, timeout=None):
+        """wait for the completion and get the error
+
+        @type timeout: number
+        @param timeout: seconds to wait, forever if None
+
+        @rtype: OSError
+        @return: the error, None if succeeded
+        """
+        if not self._done:
+            self._router.wait(self, timeout)
+        return self._error
+
+    def result(self, timeout=None):
+        """wait for the completion and get the replies
+
+        On error, this function raises OSError. ETIMEDOUT is raised if the
+        transaction is not completed in timeout.
+
+        @type timeout: number
+        @param timeout: seconds to wait, forever if None
+
+        @rtype: list of Nlmsg
+        @return: reply messages
+        """
+        if not self._done:
+            self._router.wait(self, timeout)
+        if self._error is not None:
+            raise self._error
+        return self.replies
+
+    def __iter__(self):
+        """iterate replies as they arrive
+
+        The error is raised after all the replies received.
+        """
+        i = 0
+        while True:
+            while i < len(self.replies):
+                yield self.replies[i]
+                i += 1
+            if self._done:
+                break
+            self._router.process()
+        if self._error is not None:
+            raise self._error
+
+
+# abstract base class for both Python 2 and 3
+_ABC = abc.ABCMeta("_ABC", (object, ), {})
+
+
+class Router(_ABC):
+    """routes netlink messages to Transaction by sequence number
+
+    This class does not send nor receive. Received datagrams are passed to
+    feed(), messages which do not belong to any transaction, e.g. multicast
+    events or messages from other port, are passed to unmatched(). As
+    cb_run(), a message belongs to a transaction only if its nlmsg_pid is 0
+    or the port ID of the socket. Subclasses implement process() which
+    receives a datagram and feeds it, on which wait() and Transaction rely.
+    """
+
+    def __init__(self, portid=0):
+        """create a router
+
+        @type portid: number
+        @param portid: port ID of the socket, 0 not to check nlmsg_pid
+        """
+        self._requests = {}
+        self._seq = itertools.count(1)
+        self._portid = portid
+
+    def _next_seq(self):
+        while True:
+            seq = next(self._seq) & 0xffffffff
+            if seq != 0 and seq not in self._requests:
+                return seq
+
+    def _register(self, nlh, callback=None):
+        seq = self._next_seq()
+        nlh.nlmsg_seq = seq
+        tx = Transaction(self, seq, nlh.nlmsg_flags & netlink.NLM_F_ACK, callback)
+        self._requests[seq] = tx
+        return tx
+
+    def pending(self):
+        """get the number of transactions in flight
+
+        @rtype: number
+        @return: the number of not completed transactions
+        """
+        return len(self._requests)
+
+    def feed(self, buf):
+        """route messages in a received datagram
+
+        @type buf: buffer
+        @param buf: a datagram, copied if it has messages other than ACK
+                    and NLMSG_DONE since Nlmsg refers it
+        """
+        from . import Nlmsg
+        size = len(buf)
+        offset = 0
+        copy = None
+        portid = self._portid
+        while size - offset >= _libmnlh.MNL_NLMSG_HDRLEN:
+            # read the header without Nlmsg, most of messages are ACKs
+            mlen, mtype, mflags, seq, pid = _nlmsghdr(buf, offset)
+            if mlen < _libmnlh.MNL_NLMSG_HDRLEN or mlen > size - offset:
+                break
+            if portid and pid and pid != portid:
+                # from other port, not a reply to us
+                tx = None
+            else:
+                tx = self._requests.get(seq)
+            if tx is not None and (mtype == netlink.NLMSG_ERROR or mtype == netlink.NLMSG_DONE):
+                # nlmsgerr.error or the error of dump in NLMSG_DONE
+                error = 0
+                if mlen >= _libmnlh.MNL_NLMSG_HDRLEN + _errno_size:
+                    error = _errno(buf, offset + _libmnlh.MNL_NLMSG_HDRLEN)[0]
+                if error < 0 and mtype == netlink.NLMSG_ERROR and mflags & netlink.NLM_F_ACK_TLVS:
+                    if copy is None:
+                        copy = bytearray(buf)
+                    self._finish(seq, Nlmsg(copy, offset).get_ext_ack().os_error())
+                elif error < 0:
+                    self._finish(seq, os_error(-error))
+                elif error > 0 and mtype == netlink.NLMSG_ERROR:
+                    self._finish(seq, os_error(error))
+                elif tx._intr:
+                    self._finish(seq, os_error(errno.EINTR))
+                else:
+                    self._finish(seq)
+            else:
+                if copy is None:
+                    # one copy per datagram, Nlmsg needs mutable buffer
+                    copy = bytearray(buf)
+                nlh = Nlmsg(copy, offset)
+                if tx is None:
+                    self.unmatched(nlh)
+                else:
+                    if mflags & netlink.NLM_F_DUMP_INTR:
+                        tx._intr = True
+                    tx.replies.append(nlh)
+                    if not mflags & netlink.NLM_F_MULTI and not tx._ack:
+                        self._finish(seq)
+            offset += _libmnlh.MNL_ALIGN(mlen)
+
+    def _finish(self, seq, exc=None):
+        self._requests.pop(seq)._complete(exc)
+
+    def fail_all(self, exc):
+        """complete all transactions in flight with an error
+
+        @type exc: Exception
+        @param exc: the error
+        """
+        for seq in list(self._requests):
+            self._finish(seq, exc)
+
+    def unmatched(self, nlh):
+        """called for a message not belonging to any transaction
+
+        This default implementation discards it.
+        """
+        pass
+
+    @abc.abstractmethod
+    def process(self, timeout=None):
+        """receive a datagram and route its messages
+
+        @type timeout: number
+        @param timeout: seconds to wait, forever if None
+
+        @rtype: bool
+        @return: False on timeout
+        """
+
+    def wait(self, tx, timeout=None):
+        """receive until a transaction is completed
+
+        @type tx: Transaction
+        @param tx: transaction to wait for, all the in flight if None
+        @type timeout: number
+        @param timeout: seconds to wait, forever if None
+        """
+        deadline = timeout is not None and _now() + timeout
+        while (not tx.done()) if tx is not None else self._requests:
+            remain = None
+            if deadline:
+                remain = deadline - _now()
+                if remain <= 0:
+                    raise os_error(errno.ETIMEDOUT)
+            self.process(remain)
+
+    def wait_all(self, timeout=None):
+        """receive until all transactions in flight are completed
+
+        @type timeout: number
+        @param timeout: seconds to wait, forever if None
+        """
+        self.wait(None, timeout)
+
+
+class Pipeline(Router):
+    """pipelined transactions over a Socket
+
+    Requests are sent without waiting for the replies to the previous ones,
+    then the replies are received by Transaction.result() or iteration:
+
+        p = Pipeline(nl)
+        txs = [p.submit(nlh) for nlh in requests]
+        for tx in txs:
+            for nlh in tx.result():
+                ...
+
+    A Pipeline owns the sequence numbers of the socket, do not send other
+    requests on it. Note that the kernel allows only one dump in progress
+    per socket, a dump request while another is not finished is answered
+    by EBUSY.
+    """
+
+    def __init__(self, nl, size=_libmnlh.MNL_SOCKET_BUFFER_SIZE, unmatched=None):
+        """create a pipeline
+
+        @type nl: Socket
+        @param nl: netlink socket, already bound
+        @type size: number
+        @param size: receive buffer size
+        @type unmatched: callable
+        @param unmatched: called with Nlmsg not belonging to any
+                          transaction, discarded if None
+        """
+        Router.__init__(self, nl.get_portid())
+        self._nl = nl
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        if unmatched is not None:
+            self.unmatched = unmatched
+
+    def submit(self, nlh):
+        """assign a sequence number and send a request
+
+        Error on sending completes the transaction with the error.
+
+        @type nlh: Nlmsg
+        @param nlh: request message, its nlmsg_seq is overwritten
+
+        @rtype: Transaction
+        @return: the transaction of the request
+        """
+        tx = self._register(nlh)
+        try:
+            self._nl.send_nlmsg(nlh)
+        except OSError as e:
+            self._finish(tx.seq, e)
+        return tx
+
+    def submit_many(self, msgs):
+        """assign sequence numbers and send requests by a system call
+
+        This function sends the requests in a datagram by Socket.send_many().
+        Error on sending completes all the transactions with the error.
+
+        @type msgs: sequence of Nlmsg
+        @param msgs: request messages, their nlmsg_seq are overwritten
+
+        @rtype: list of Transaction
+        @return: the transactions of the requests
+        """
+        txs = [self._register(nlh) for nlh in msgs]
+        try:
+            self._nl.send_many(msgs)
+        except OSError as e:
+            for tx in txs:
+                self._finish(tx.seq, e)
+        return txs
+
+    def process(self, timeout=None):
+        """receive a datagram and route its messages
+
+        ENOBUFS completes all the transactions in flight with the error,
+        since their replies may have been lost.
+
+        @type timeout: number
+        @param timeout: seconds to wait, see Socket.recv_into()
+
+        @rtype: bool
+        @return: False on timeout
+        """
+        try:
+            n = self._nl.recv_into(self._buf, timeout)
+        except OSError as e:
+            if e.errno != errno.ENOBUFS:
+                raise
+            self.fail_all(e)
+            return True
+        if n is None:
+            return False
+        self.feed(self._view[:n])
+        return True
+
+
+class BatchWriter(Pipeline):
+    """batched requests with a bounded window of ACKs over a Socket
+
+    Messages are built in place in a batch, a PyNlmsgBatch of double the
+    size, and the batch is sent when a message does not fit it. Every message is
+    acknowledged, commit() sets NLM_F_ACK and assigns its own sequence
+    number, and gets a Transaction. Before sending, ACKs are received until
+    the messages sent but not acknowledged fit in window, so that ACKs do
+    not overrun the socket receive buffer. As nfct-create-batch.py:
+
+        with BatchWriter(nl) as w:
+            for attrs in conntracks:
+                encoder.encode_into(w.current(), attrs, nfh)
+                w.commit()
+        for tx in w.failed:
+            print(tx.seq, tx.exception())
+
+    The rest of the batch is sent and all the ACKs are received by flush(),
+    on exiting the context. Failed transactions are appended to failed.
+    """
+
+    def __init__(self, nl, size=_libmnlh.MNL_SOCKET_BUFFER_SIZE, window=256,
+                 callback=None, unmatched=None):
+        """create a batch writer
+
+        @type nl: Socket
+        @param nl: netlink socket, already bound
+        @type size: number
+        @param size: batch size, and receive buffer size
+        @type window: number
+        @param window: maximum number of messages waiting for ACK
+        @type callback: callable
+        @param callback: called with each completed Transaction
+        @type unmatched: callable
+        @param unmatched: called with Nlmsg not belonging to any
+                          transaction, discarded if None
+        """
+        from . import PyNlmsgBatch
+        Pipeline.__init__(self, nl, size, unmatched)
+        self._batch = PyNlmsgBatch(size * 2, size)
+        self._unsent = []
+        self._window = window
+        self._callback = callback
+        self.failed = []
+
+    def _completed(self, tx):
+        if tx.exception() is not None:
+            self.failed.append(tx)
+        if self._callback is not None:
+            self._callback(tx)
+
+    def current(self):
+        """get room for the next message
+
+        @rtype: memoryview
+        @return: writable buffer at the current position of the batch
+        """
+        return self._batch.current_v()
+
+    def commit(self):
+        """add the message written in current() to the batch
+
+        nlmsg_seq of the message is overwritten and NLM_F_ACK is set. If the
+        message does not fit the batch, the batch without it is sent.
+
+        @rtype: Transaction
+        @return: the transaction of the message
+        """
+        nlh = self._batch.current_nlmsg()
+        nlh.nlmsg_flags |= netlink.NLM_F_ACK
+        tx = self._register(nlh, self._completed)
+        self._unsent.append(tx)
+        if not self._batch.next_batch():
+            self._send(len(self._unsent) - 1)
+            self._batch.reset()
+        return tx
+
+    def _send(self, n):
+        # sends the first n unsent messages, which are the batch
+        if n == 0:
+            return
+        while True:
+            in_flight = self.pending() - len(self._unsent)
+            if in_flight == 0 or in_flight + n <= self._window:
+                break
+            self.process()
+        txs = self._unsent[:n]
+        del self._unsent[:n]
+        try:
+            self._nl.sendto(self._batch.head())
+        except OSError as e:
+            for tx in txs:
+                if not tx.done():
+                    self._finish(tx.seq, e)
+            return
+        # drain ACKs already arrived
+        while self.pending() > len(self._unsent) and self.process(0):
+            pass
+
+    def flush(self, timeout=None):
+        """send the rest of the batch and receive all the ACKs
+
+        @type timeout: number
+        @param timeout: seconds to wait, forever if None
+        """
+        if not self._batch.is_empty():
+            self._send(len(self._unsent))
+            self._batch.reset()
+        self.wait_all(timeout)
+
+    def fail_all(self, exc):
+        # not sent ones still can be sent
+        unsent = set(tx.seq for tx in self._unsent)
+        for seq in list(self._requests):
+            if seq not in unsent:
+                self._finish(seq, exc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, v, tb):
+        try:
+            if t is None:
+                self.flush()
+        finally:
+            self._batch.stop()
+        return False
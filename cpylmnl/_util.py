@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+"""helpers shared by the pure Python modules
+"""
+
+from __future__ import absolute_import
+
+import errno
+
+
+def os_error(en):
+    """create OSError from an errno value
+
+    The message is the errno name, same as _cproto.os_error().
+    """
+    return OSError(en, errno.errorcode[en])
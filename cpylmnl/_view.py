@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+
+"""read-only views of netlink messages and attributes without ctypes
+
+A view holds a buffer, an offset and the header fields decoded by
+struct.unpack_from(), instead of creating ctypes instances and pointer
+casts per message and attribute.
+"""
+
+from __future__ import absolute_import
+
+import errno, struct, ctypes
+
+from .linux import netlinkh as netlink
+from . import _libmnlh
+from . import _cproto
+from ._util import os_error
+
+
+# struct nlmsghdr and struct nlattr, native byte order
+_nlmsghdr = struct.Struct("IHHII").unpack_from
+_nlattr = struct.Struct("HH").unpack_from
+_int = struct.Struct("i").unpack_from
+_u8 = struct.Struct("B").unpack_from
+_u16 = struct.Struct("H").unpack_from
+_u32 = struct.Struct("I").unpack_from
+_u64 = struct.Struct("Q").unpack_from
+_be16 = struct.Struct(">H").unpack_from
+_be32 = struct.Struct(">I").unpack_from
+_be64 = struct.Struct(">Q").unpack_from
+
+_HDRLEN = _libmnlh.MNL_NLMSG_HDRLEN
+_ATTR_HDRLEN = _libmnlh.MNL_ATTR_HDRLEN
+_NLMSGERR_LEN = struct.calcsize("i") + _HDRLEN
+
+
+class NlmsgView(object):
+    """read-only view of a netlink message in a buffer
+
+    The header fields are decoded at creation. The view refers to the buffer,
+    so it is valid only while the buffer content is not overwritten, by the
+    next receive for example.
+    """
+    __slots__ = ["buf", "offset",
+                 "nlmsg_len", "nlmsg_type", "nlmsg_flags", "nlmsg_seq", "nlmsg_pid"]
+
+    def __init__(self, buf, offset=0, header=None):
+        """create a view
+
+        @type buf: buffer
+        @param buf: buffer which holds the message
+        @type offset: number
+        @param offset: offset of the message in buf
+        @type header: tuple
+        @param header: decoded header fields, decoded from buf if None
+        """
+        self.buf = buf
+        self.offset = offset
+        (self.nlmsg_len, self.nlmsg_type, self.nlmsg_flags,
+         self.nlmsg_seq, self.nlmsg_pid) = header or _nlmsghdr(buf, offset)
+
+    def get_payload_len(self):
+        """get the length of the netlink payload
+
+        @rtype: number
+        @return: the length of the payload
+        """
+        return self.nlmsg_len - _HDRLEN
+
+    def get_payload(self):
+        """get the payload
+
+        @rtype: memoryview
+        @return: the payload, without copying
+        """
+        start = self.offset + _HDRLEN
+        return memoryview(self.buf)[start:self.offset + self.nlmsg_len]
+
+    def get_payload_offset(self, o):
+        """get the payload after o bytes, an extra header for example
+
+        @type o: number
+        @param o: offset from the beginning of the payload
+
+        @rtype: memoryview
+        @return: the rest of the payload, without copying
+        """
+        start = self.offset + _HDRLEN + _libmnlh.MNL_ALIGN(o)
+        return memoryview(self.buf)[start:self.offset + self.nlmsg_len]
+
+    # same name as Nlmsg
+    get_payload_mv = get_payload
+    get_payload_offset_mv = get_payload_offset
+
+    def get_type(self):
+        """get the message type
+
+        @rtype: number
+        @return: nlmsg_type
+        """
+        return self.nlmsg_type
+
+    def get_len(self):
+        """get the message length, including the header
+
+        @rtype: number
+        @return: nlmsg_len
+        """
+        return self.nlmsg_len
+
+    def attributes(self, offset):
+        """iterate attributes, same as Nlmsg.attributes()
+
+        @type offset: number
+        @param offset: offset of the attributes in the payload, the size of
+                       the extra header
+
+        @rtype: iterator of AttrView
+        @return: attributes in the payload
+        """
+        return _attributes(self.buf,
+                           self.offset + _HDRLEN + _libmnlh.MNL_ALIGN(offset),
+                           self.offset + self.nlmsg_len)
+
+    def parse_policy(self, offset, policy, tb=None):
+        """validate and index attributes, see Nlmsg.parse_policy()
+
+        @type offset: number
+        @param offset: offset of the attributes in the payload, the size of
+                       the extra header
+        @type policy: Policy
+        @param policy: validation policy
+        @type tb: AttrTable
+        @param tb: table to reuse, cleared before parsing
+
+        @rtype: AttrTable
+        @return: attributes indexed by type
+        """
+        if tb is not None:
+            tb.clear()
+        return policy.parse(self.buf,
+                            self.offset + _HDRLEN + _libmnlh.MNL_ALIGN(offset),
+                            self.offset + self.nlmsg_len, tb)
+
+    def to_nlmsg(self):
+        """create Nlmsg at the same position, the buffer must be writable
+
+        @rtype: Nlmsg
+        @return: ctypes netlink message sharing the buffer
+        """
+        from . import Nlmsg
+        return Nlmsg(self.buf, self.offset)
+
+
+class AttrView(object):
+    """read-only view of a netlink attribute in a buffer
+
+    This class has the getters of Attr without creating ctypes instances.
+    Same as NlmsgView, the view is valid while the buffer is not
+    overwritten.
+    """
+    __slots__ = ["buf", "offset", "nla_len", "nla_type"]
+
+    def __init__(self, buf, offset=0, header=None):
+        """create a view
+
+        @type buf: buffer
+        @param buf: buffer which holds the attribute
+        @type offset: number
+        @param offset: offset of the attribute in buf
+        @type header: tuple
+        @param header: decoded (nla_len, nla_type), decoded from buf if None
+        """
+        self.buf = buf
+        self.offset = offset
+        self.nla_len, self.nla_type = header or _nlattr(buf, offset)
+
+    def get_type(self):
+        """get type of netlink attribute
+
+        @rtype: number
+        @return: the attribute type
+        """
+        return self.nla_type & netlink.NLA_TYPE_MASK
+
+    def get_len(self):
+        """get length of netlink attribute
+
+        @rtype: number
+        @return: the attribute length that is the attribute header plus the
+        attribute payload
+        """
+        return self.nla_len
+
+    def get_payload_len(self):
+        """get the attribute payload-value length
+
+        @rtype: number
+        @return: the attribute payload-value length
+        """
+        return self.nla_len - _ATTR_HDRLEN
+
+    def get_payload(self):
+        """get the attribute payload
+
+        @rtype: memoryview
+        @return: the payload, without copying
+        """
+        start = self.offset + _ATTR_HDRLEN
+        return memoryview(self.buf)[start:self.offset + self.nla_len]
+
+    # same name as Attr
+    get_payload_mv = get_payload
+
+    def get_u8(self):
+        """returns 8-bit unsigned integer attribute payload
+
+        @rtype: number
+        @return: the 8-bit value of the attribute payload
+        """
+        return _u8(self.buf, self.offset + _ATTR_HDRLEN)[0]
+
+    def get_u16(self):
+        """returns 16-bit unsigned integer attribute payload
+
+        @rtype: number
+        @return: the 16-bit value of the attribute payload
+        """
+        return _u16(self.buf, self.offset + _ATTR_HDRLEN)[0]
+
+    def get_u32(self):
+        """returns 32-bit unsigned integer attribute payload
+
+        @rtype: number
+        @return: the 32-bit value of the attribute payload
+        """
+        return _u32(self.buf, self.offset + _ATTR_HDRLEN)[0]
+
+    def get_u64(self):
+        """returns 64-bit unsigned integer attribute.
+
+        @rtype: number
+        @return: the 64-bit value of the attribute payload
+        """
+        return _u64(self.buf, self.offset + _ATTR_HDRLEN)[0]
+
+    def get_be16(self):
+        """returns 16-bit unsigned integer attribute payload in network byte order
+
+        @rtype: number
+        @return: the 16-bit value of the attribute payload in host byte order
+        """
+        return _be16(self.buf, self.offset + _ATTR_HDRLEN)[0]
+
+    def get_be32(self):
+        """returns 32-bit unsigned integer attribute payload in network byte order
+
+        @rtype: number
+        @return: the 32-bit value of the attribute payload in host byte order
+        """
+        return _be32(self.buf, self.offset + _ATTR_HDRLEN)[0]
+
+    def get_be64(self):
+        """returns 64-bit unsigned integer attribute payload in network byte order
+
+        @rtype: number
+        @return: the 64-bit value of the attribute payload in host byte order
+        """
+        return _be64(self.buf, self.offset + _ATTR_HDRLEN)[0]
+
+    def get_in_addr(self):
+        """returns IPv4 address attribute payload, struct in_addr
+
+        Use get_be32() to get it as an integer.
+
+        @rtype: bytes
+        @return: 4 bytes packed address, for socket.inet_ntoa() for example
+        """
+        start = self.offset + _ATTR_HDRLEN
+        return memoryview(self.buf)[start:start + 4].tobytes()
+
+    def get_in6_addr(self):
+        """returns IPv6 address attribute payload, struct in6_addr
+
+        @rtype: bytes
+        @return: 16 bytes packed address, for socket.inet_ntop() for example
+        """
+        start = self.offset + _ATTR_HDRLEN
+        return memoryview(self.buf)[start:start + 16].tobytes()
+
+    def get_str(self):
+        """returns string attribute, up to the terminating NUL if any
+
+        @rtype: bytes
+        @return: the payload of string attribute value
+        """
+        b = self.get_payload().tobytes()
+        i = b.find(b"\0")
+        if i < 0:
+            return b
+        return b[:i]
+
+    def nesteds(self):
+        """iterate nested attributes, same as Attr.nesteds()
+
+        @rtype: iterator of AttrView
+        @return: attributes in the payload
+        """
+        return _attributes(self.buf, self.offset + _ATTR_HDRLEN, self.offset + self.nla_len)
+
+    def parse_policy(self, policy, tb=None):
+        """validate and index nested attributes
+
+        @type policy: Policy
+        @param policy: validation policy
+        @type tb: AttrTable
+        @param tb: table to reuse, cleared before parsing
+
+        @rtype: AttrTable
+        @return: attributes indexed by type
+        """
+        if tb is not None:
+            tb.clear()
+        return policy.parse(self.buf, self.offset + _ATTR_HDRLEN, self.offset + self.nla_len, tb)
+
+
+def _attributes(buf, offset, end):
+    # mnl_attr_ok() for each
+    while end - offset >= _ATTR_HDRLEN:
+        header = _nlattr(buf, offset)
+        alen = header[0]
+        if alen < _ATTR_HDRLEN or alen > end - offset:
+            break
+        yield AttrView(buf, offset, header)
+        offset += (alen + _libmnlh.MNL_ALIGNTO - 1) & ~(_libmnlh.MNL_ALIGNTO - 1)
+
+
+def payload_attribute_views(payload):
+    """iterate attributes in a buffer, same as payload_attributes()
+
+    @type payload: buffer
+    @param payload: sequence of attributes
+
+    @rtype: iterator of AttrView
+    @return: attributes in payload
+    """
+    return _attributes(payload, 0, len(payload))
+
+
+# callbacks receive the address, not POINTER(), to create no ctypes instance
+_VIEW_CB_T = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.py_object, use_errno=True)
+
+def nlmsg_view_cb(cbfunc):
+    """decorator of data and control callbacks for cb_run() receiving
+    NlmsgView instead of Nlmsg
+
+    The view is over the buffer passed to cb_run(), and valid while the
+    buffer is not overwritten.
+    """
+    def _inner(addr, data):
+        n = ctypes.c_uint32.from_address(addr).value
+        return cbfunc(NlmsgView((ctypes.c_ubyte * n).from_address(addr)), data)
+    # cast() keeps _inner CFUNCTYPE alive
+    return ctypes.cast(_VIEW_CB_T(_inner), _cproto.MNL_CB_T)
+
+def attr_view_cb(cbfunc):
+    """decorator of callbacks for Nlmsg.parse() and the like, receiving
+    AttrView instead of Attr
+    """
+    def _inner(addr, data):
+        n = ctypes.c_uint16.from_address(addr).value
+        return cbfunc(AttrView((ctypes.c_ubyte * n).from_address(addr)), data)
+    return ctypes.cast(_VIEW_CB_T(_inner), _cproto.MNL_ATTR_CB_T)
+
+
+class NlmsgIterator(object):
+    """iterator over netlink messages in a buffer, see iter_messages()
+
+    ret attribute is set to MNL_CB_STOP when NLMSG_DONE or a successful ACK
+    terminates the iteration, or stays MNL_CB_OK if the buffer is exhausted,
+    same as the return value of cb_run().
+    """
+    __slots__ = ["_buf", "_offset", "_size", "_seq", "_portid", "ret"]
+
+    def __init__(self, buf, seq, portid):
+        if not isinstance(buf, memoryview):
+            buf = memoryview(buf)
+        self._buf = buf
+        self._offset = 0
+        self._size = len(buf)
+        self._seq = seq
+        self._portid = portid
+        self.ret = _libmnlh.MNL_CB_OK
+
+    def __iter__(self):
+        return self
+
+    def _stop(self):
+        self.ret = _libmnlh.MNL_CB_STOP
+        self._offset = self._size
+        raise StopIteration
+
+    def __next__(self):
+        buf = self._buf
+        size = self._size
+        offset = self._offset
+        while size - offset >= _HDRLEN:
+            header = _nlmsghdr(buf, offset)
+            mlen, mtype, mflags, mseq, mpid = header
+            if mlen < _HDRLEN or mlen > size - offset:
+                break
+            # consume before raising, same as callbacks were called
+            self._offset = offset + ((mlen + _libmnlh.MNL_ALIGNTO - 1) & ~(_libmnlh.MNL_ALIGNTO - 1))
+            if mpid and self._portid and mpid != self._portid:
+                raise os_error(errno.ESRCH)
+            if mseq and self._seq and mseq != self._seq:
+                raise os_error(errno.EPROTO)
+            if mflags & netlink.NLM_F_DUMP_INTR:
+                raise os_error(errno.EINTR)
+            if mtype >= netlink.NLMSG_MIN_TYPE:
+                return NlmsgView(buf, offset, header)
+            if mtype == netlink.NLMSG_ERROR:
+                if mlen < _NLMSGERR_LEN:
+                    raise os_error(errno.EBADMSG)
+                error = _int(buf, offset + _HDRLEN)[0]
+                if error == 0:
+                    self._stop()
+                raise os_error(abs(error))
+            if mtype == netlink.NLMSG_DONE:
+                self._stop()
+            # NLMSG_NOOP, NLMSG_OVERRUN and unknown control messages
+            offset = self._offset
+        self._offset = size
+        raise StopIteration
+
+    next = __next__
+
+
+def iter_messages(buf, seq, portid):
+    """iterate netlink data messages in a buffer without callbacks
+
+    This is a pure Python counterpart of cb_run(). It walks the messages by
+    struct.unpack_from() and yields NlmsgView of the data messages, whose
+    type is NLMSG_MIN_TYPE or greater. Control messages are handled same as
+    the default control callbacks of mnl_cb_run2():
+
+    - NLMSG_NOOP and NLMSG_OVERRUN are skipped
+    - NLMSG_DONE and an ACK whose error is 0 stop the iteration, and ret
+      attribute of the iterator becomes MNL_CB_STOP
+    - an ACK whose error is not 0 raises OSError
+
+    OSError is also raised if the portID is not the expected (ESRCH), the
+    sequence number is not the expected (EPROTO) or the dump was interrupted
+    (EINTR). Iteration over a datagram is typically:
+
+        it = iter_messages(buf, seq, portid)
+        for msg in it:
+            ...
+        if it.ret == MNL_CB_STOP:
+            # no more datagrams for this request
+
+    @type buf: buffer
+    @param buf: buffer that contains the netlink messages
+    @type seq: number
+    @param seq: sequence number that we expect to receive, 0 for any
+    @type portid: number
+    @param portid: Netlink PortID that we expect to receive, 0 for any
+
+    @rtype: NlmsgIterator
+    @return: iterator of NlmsgView
+    """
+    return NlmsgIterator(buf, seq, portid)
@@ -123,7 +123,7 @@ def log_cb(nlh, data):
 
     ph = tb[nfulnl.NFULA_PACKET_HDR].get_payload_as(nfulnl.NfulnlMsgPacketHdr)
     # copying - dpkt require bytes, it uses struct.unpack
-    pkt_buffer = bytes(bytearray(tb[nfulnl.NFULA_PAYLOAD].get_payload_v()))
+    pkt_buffer = bytes(tb[nfulnl.NFULA_PAYLOAD].get_payload_mv())
     k = make_tuple(socket.ntohs(ph.hw_protocol), pkt_buffer)
     if k is not None:
         data[k] = data.get(k, 0) + len(pkt_buffer)
@@ -72,7 +72,7 @@ def log_cb(nlh, data):
     if nfulnl.NFULA_PREFIX in tb:
         prefix = tb[nfulnl.NFULA_PREFIX].get_str()
     if nfulnl.NFULA_MARK in tb:
-        mark = socket.ntohl(tb[nfulnl.NFULA_MARK].get_u32())
+        mark = tb[nfulnl.NFULA_MARK].get_be32()
 
     # not exist in original
     if nfulnl.NFULA_PAYLOAD in tb:
@@ -143,6 +143,16 @@ def nfq_build_verdict(buf, packet_id, queue_num, verd):
     return nlh
 
 
+def nfq_verdict_template(queue_num):
+    # verdict differs only in packet id and verdict per packet
+    nlh = nfq_build_verdict(bytearray(mnl.MNL_SOCKET_BUFFER_SIZE), 0, queue_num, nf.NF_ACCEPT)
+    tmpl = mnl.MessageTemplate(nlh)
+    offset = tmpl.attr_offset(nfnl.Nfgenmsg.csize(), nfqnl.NFQA_VERDICT_HDR)
+    tmpl.add_field("verdict", offset + nfqnl.NfqnlMsgVerdictHdr.verdict.offset, ">I")
+    tmpl.add_field("id", offset + nfqnl.NfqnlMsgVerdictHdr.id.offset, ">I")
+    return tmpl
+
+
 def main():
     if len(sys.argv) != 2:
         print("Usage: %s [queue_num]" % sys.argv[0])
@@ -168,6 +178,9 @@ def main():
         nlh = nfq_build_cfg_params(buf, nfqnl.NFQNL_COPY_PACKET, 0xFFFF, queue_num)
         nl.send_nlmsg(nlh)
 
+        verdict_tmpl = nfq_verdict_template(queue_num)
+        verdict_buf = bytearray(len(verdict_tmpl))
+
         ret = mnl.MNL_CB_OK
         while ret > mnl.MNL_CB_STOP:
             try:
@@ -184,9 +197,9 @@ def main():
                 raise
 
             packet_id = ret - mnl.MNL_CB_OK
-            nlh = nfq_build_verdict(buf, packet_id, queue_num, nf.NF_ACCEPT)
+            verdict_tmpl.render_into(verdict_buf, id=packet_id, verdict=nf.NF_ACCEPT)
             try:
-                nl.send_nlmsg(nlh)
+                nl.sendto(verdict_buf)
             except Exception as e:
                 print("mnl_socket_sendto: %s" % e, file=sys.stderr)
 
@@ -3,7 +3,7 @@
 
 from __future__ import print_function, absolute_import
 
-import sys, os, logging, socket, time, select
+import sys, os, logging, socket
 import ipaddr
 
 import cpylmnl.linux.netlinkh as netlink
@@ -17,113 +17,83 @@ import cpylmnl as mnl
 log = logging.getLogger(__name__)
 
 
-def put_msg(buf, i, seq):
-    nlh = mnl.Nlmsg(buf)
-    nlh.put_header()
-    nlh.nlmsg_type = (nfnl.NFNL_SUBSYS_CTNETLINK << 8) | nfnlct.IPCTNL_MSG_CT_NEW
-    nlh.nlmsg_flags = netlink.NLM_F_REQUEST | netlink.NLM_F_CREATE | netlink.NLM_F_EXCL | netlink.NLM_F_ACK
-    nlh.nlmsg_seq = seq
-
-    nfh = nlh.put_extra_header_as(nfnl.Nfgenmsg)
-    nfh.nfgen_family = socket.AF_INET
-    nfh.version = nfnl.NFNETLINK_V0
-    nfh.res_id = 0
-
-    # 1.1.1.1:i -> 2.2.2.2:1025
-    nest1 = nlh.nest_start(nfnlct.CTA_TUPLE_ORIG)
-    nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_IP)
-    nlh.put_u32(nfnlct.CTA_IP_V4_SRC, int(ipaddr.IPv4Address("1.1.1.1")))
-    nlh.put_u32(nfnlct.CTA_IP_V4_DST, int(ipaddr.IPv4Address("2.2.2.2")))
-    nlh.nest_end(nest2)
-    nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_PROTO)
-    nlh.put_u8(nfnlct.CTA_PROTO_NUM, socket.IPPROTO_TCP)
-    nlh.put_u16(nfnlct.CTA_PROTO_SRC_PORT, socket.htons(i))
-    nlh.put_u16(nfnlct.CTA_PROTO_DST_PORT, socket.htons(1025))
-    nlh.nest_end(nest2)
-    nlh.nest_end(nest1)
-
-    # 2.2.2.2:1025 -> 1.1.1.1:i
-    nest1 = nlh.nest_start(nfnlct.CTA_TUPLE_REPLY)
-    nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_IP)
-    nlh.put_u32(nfnlct.CTA_IP_V4_SRC, int(ipaddr.IPv4Address("2.2.2.2")))
-    nlh.put_u32(nfnlct.CTA_IP_V4_DST, int(ipaddr.IPv4Address("1.1.1.1")))
-    nlh.nest_end(nest2)
-    nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_PROTO)
-    nlh.put_u8(nfnlct.CTA_PROTO_NUM, socket.IPPROTO_TCP)
-    nlh.put_u16(nfnlct.CTA_PROTO_SRC_PORT, socket.htons(1025))
-    nlh.put_u16(nfnlct.CTA_PROTO_DST_PORT, socket.htons(i))
-    nlh.nest_end(nest2)
-    nlh.nest_end(nest1)
-
-    # TCP SYN
-    nest1 = nlh.nest_start(nfnlct.CTA_PROTOINFO)
-    nest2 = nlh.nest_start(nfnlct.CTA_PROTOINFO_TCP)
-    nlh.put_u8(nfnlct.CTA_PROTOINFO_TCP_STATE, nfcttcp.TCP_CONNTRACK_SYN_SENT)
-    nlh.nest_end(nest2)
-    nlh.nest_end(nest1)
-
-    # status and timeout
-    nlh.put_u32(nfnlct.CTA_STATUS, socket.htonl(nfctcm.IPS_CONFIRMED))
-    nlh.put_u32(nfnlct.CTA_TIMEOUT, socket.htonl(1000))
-
-
-@mnl.nlmsg_cb
-def cb_err(nlh, data):
-    err = nlh.get_payload_as(netlink.Nlmsgerr)
-    if err.error != 0:
-        print("message with seq %u has failed: %s" % (nlh.nlmsg_seq, os.strerror(-err.error)), file=sys.stderr)
-
-    return mnl.MNL_CB_OK
-
-
-CB_CTL_ARRAY = {netlink.NLMSG_ERROR: cb_err}
-
-def send_batch(nl, b, portid):
-    fd = nl.get_fd()
-    size = b.size()
-
-    try:
-        nl.sendto(b.head())
-    except Exception as e:
-        print("mnl_socket_sendto: %s" % e, file=sys.stderr)
-        raise
-
-    while True:
-        rlist, _wlist, _xlist = select.select([fd], [], [], 0.0)
-        if not fd in rlist:
-            break
-
-        try:
-            rcv_buf = nl.recv(mnl.MNL_SOCKET_BUFFER_SIZE)
-            if len(rcv_buf) == 0: break
-        except Exception as e:
-            print("mnl_socket_recvfrom: %s" % e, file=sys.stderr)
-            raise
-
-        try:
-            mnl.cb_run2(rcv_buf, 0, portid, None, None, CB_CTL_ARRAY)
-        except Exception as e:
-            print("mnl_cb_run2: %s" % e, file=sys.stderr)
-            raise
+ip_policy = mnl.Policy(nfnlct.CTA_IP_MAX, {nfnlct.CTA_IP_V4_SRC: mnl.MNL_TYPE_U32,
+                                           nfnlct.CTA_IP_V4_DST: mnl.MNL_TYPE_U32})
+proto_policy = mnl.Policy(nfnlct.CTA_PROTO_MAX, {nfnlct.CTA_PROTO_NUM: mnl.MNL_TYPE_U8,
+                                                 nfnlct.CTA_PROTO_SRC_PORT: mnl.MNL_TYPE_U16,
+                                                 nfnlct.CTA_PROTO_DST_PORT: mnl.MNL_TYPE_U16})
+tuple_policy = mnl.Policy(nfnlct.CTA_TUPLE_MAX,
+                          {nfnlct.CTA_TUPLE_IP: (mnl.MNL_TYPE_NESTED, 0, ip_policy),
+                           nfnlct.CTA_TUPLE_PROTO: (mnl.MNL_TYPE_NESTED, 0, proto_policy)})
+tcp_policy = mnl.Policy(nfnlct.CTA_PROTOINFO_TCP_MAX,
+                        {nfnlct.CTA_PROTOINFO_TCP_STATE: mnl.MNL_TYPE_U8})
+protoinfo_policy = mnl.Policy(nfnlct.CTA_PROTOINFO_MAX,
+                              {nfnlct.CTA_PROTOINFO_TCP: (mnl.MNL_TYPE_NESTED, 0, tcp_policy)})
+ct_policy = mnl.Policy(nfnlct.CTA_MAX,
+                       {nfnlct.CTA_TUPLE_ORIG: (mnl.MNL_TYPE_NESTED, 0, tuple_policy),
+                        nfnlct.CTA_TUPLE_REPLY: (mnl.MNL_TYPE_NESTED, 0, tuple_policy),
+                        nfnlct.CTA_PROTOINFO: (mnl.MNL_TYPE_NESTED, 0, protoinfo_policy),
+                        nfnlct.CTA_STATUS: mnl.MNL_TYPE_U32,
+                        nfnlct.CTA_TIMEOUT: mnl.MNL_TYPE_U32})
+
+# ctnetlink attributes are in network byte order
+encoder = mnl.MessageEncoder(ct_policy,
+                             (nfnl.NFNL_SUBSYS_CTNETLINK << 8) | nfnlct.IPCTNL_MSG_CT_NEW,
+                             netlink.NLM_F_REQUEST | netlink.NLM_F_CREATE | netlink.NLM_F_EXCL | netlink.NLM_F_ACK,
+                             ">")
+
+nfh = nfnl.Nfgenmsg()
+nfh.nfgen_family = socket.AF_INET
+nfh.version = nfnl.NFNETLINK_V0
+nfh.res_id = 0
+
+addr1 = int(ipaddr.IPv4Address("1.1.1.1"))
+addr2 = int(ipaddr.IPv4Address("2.2.2.2"))
+
+
+def put_msg(buf, i):
+    attrs = {
+        # 1.1.1.1:i -> 2.2.2.2:1025
+        nfnlct.CTA_TUPLE_ORIG: {nfnlct.CTA_TUPLE_IP: {nfnlct.CTA_IP_V4_SRC: addr1,
+                                                      nfnlct.CTA_IP_V4_DST: addr2},
+                                nfnlct.CTA_TUPLE_PROTO: {nfnlct.CTA_PROTO_NUM: socket.IPPROTO_TCP,
+                                                         nfnlct.CTA_PROTO_SRC_PORT: i,
+                                                         nfnlct.CTA_PROTO_DST_PORT: 1025}},
+        # 2.2.2.2:1025 -> 1.1.1.1:i
+        nfnlct.CTA_TUPLE_REPLY: {nfnlct.CTA_TUPLE_IP: {nfnlct.CTA_IP_V4_SRC: addr2,
+                                                       nfnlct.CTA_IP_V4_DST: addr1},
+                                 nfnlct.CTA_TUPLE_PROTO: {nfnlct.CTA_PROTO_NUM: socket.IPPROTO_TCP,
+                                                          nfnlct.CTA_PROTO_SRC_PORT: 1025,
+                                                          nfnlct.CTA_PROTO_DST_PORT: i}},
+        # TCP SYN
+        nfnlct.CTA_PROTOINFO: {nfnlct.CTA_PROTOINFO_TCP: {
+            nfnlct.CTA_PROTOINFO_TCP_STATE: nfcttcp.TCP_CONNTRACK_SYN_SENT}},
+        # status and timeout
+        nfnlct.CTA_STATUS: nfctcm.IPS_CONFIRMED,
+        nfnlct.CTA_TIMEOUT: 1000,
+    }
+    encoder.encode_into(buf, attrs, nfh)
+
+
+def report(tx):
+    err = tx.exception()
+    if err is not None:
+        print("message with seq %u has failed: %s" % (tx.seq, err.strerror), file=sys.stderr)
 
 
 def main():
     with mnl.Socket(netlink.NETLINK_NETFILTER) as nl:
         nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
-        portid = nl.get_portid()
-
-        with mnl.NlmsgBatch(mnl.MNL_SOCKET_BUFFER_SIZE * 2, mnl.MNL_SOCKET_BUFFER_SIZE) as b:
-            seq = int(time.time())
-            for j, i in enumerate(list(range(1024, 65535))):
-                put_msg(b.current_v(), i, seq + j)
-                if b.next_batch():
-                    continue
-
-                send_batch(nl, b, portid)
-                b.reset()
-
-            if not b.is_empty():
-                send_batch(nl, b, portid)
+        # Error ACKs carry the request header only, not the whole request,
+        # and the reason of the error if the kernel has one
+        nl.set_cap_ack()
+        nl.set_ext_ack()
+
+        # sent when the batch is full, ACKs are received on the way
+        with mnl.BatchWriter(nl, callback=report) as w:
+            for i in range(1024, 65535):
+                put_msg(w.current(), i)
+                w.commit()
 
 
 if __name__ == '__main__':
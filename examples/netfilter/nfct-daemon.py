@@ -49,18 +49,14 @@ def parse_counters_cb(attr, tb):
     return mnl.MNL_CB_OK
 
 
-def be64toh(q):
-    return struct.unpack(">Q", struct.pack("Q", q))[0]
-
-
 def parse_counters(nest, ns):
     tb = dict()
 
     nest.parse_nested(parse_counters_cb, tb)
     if nfnlct.CTA_COUNTERS_PACKETS in tb:
-        ns.pkts += be64toh(tb[nfnlct.CTA_COUNTERS_PACKETS].get_u64())
+        ns.pkts += tb[nfnlct.CTA_COUNTERS_PACKETS].get_be64()
     if nfnlct.CTA_COUNTERS_BYTES in tb:
-        ns.bytes += be64toh(tb[nfnlct.CTA_COUNTERS_BYTES].get_u64())
+        ns.bytes += tb[nfnlct.CTA_COUNTERS_BYTES].get_be64()
 
 
 @mnl.attr_cb
@@ -95,11 +91,9 @@ def parse_ip(nest, ns):
 
     nest.parse_nested(parse_ip_cb, tb)
     if nfnlct.CTA_IP_V4_SRC in tb:
-        # ns.addr = ipaddr.IPv4Address(struct.unpack(">I", bytes(bytearray(tb[nfnlct.CTA_IP_V4_SRC].get_payload_v()))))
-        ns.addr = ipaddr.IPv4Address(".".join("%d" % i for i in tb[nfnlct.CTA_IP_V4_SRC].get_payload_v()))
+        ns.addr = ipaddr.IPv4Address(tb[nfnlct.CTA_IP_V4_SRC].get_be32())
     if nfnlct.CTA_IP_V6_SRC in tb:
-        v6addr = tb[nfnlct.CTA_IP_V6_SRC].get_payload_v()
-        ns.addr = ipaddr.IPv6Address(":".join(["%x%x" % (a[i], a[i + 1]) for i in range(0, len(v6addr), 2)]))
+        ns.addr = ipaddr.IPv6Address(socket.inet_ntop(socket.AF_INET6, tb[nfnlct.CTA_IP_V6_SRC].get_in6_addr()))
 
 
 @mnl.attr_cb
@@ -228,10 +222,8 @@ def main():
         nl_socket.bind(nfnlcm.NF_NETLINK_CONNTRACK_DESTROY, mnl.MNL_SOCKET_AUTOPID)
 
         # Set netlink receiver buffer to 16 MBytes, to avoid packet drops
-        # XXX: has to use python's. socket.fromfd() is available only in Unix
         buffersize = 1 << 22
-        sock = socket.fromfd(nl_socket.get_fd(), socket.AF_NETLINK, socket.SOCK_RAW)
-        sock.setsockopt(socket.SOL_SOCKET, 33, buffersize) # SO_RCVBUFFORCE
+        nl_socket.set_rcvbuf(buffersize, True) # SO_RCVBUFFORCE
 
         # The two tweaks below enable reliable event delivery, packets may
         # be dropped if the netlink receiver buffer overruns. This happens...
@@ -3,7 +3,7 @@
 
 from __future__ import print_function, absolute_import
 
-import sys, logging, socket, time, struct
+import sys, logging, socket, time
 
 import cpylmnl.linux.netlinkh as netlink
 import cpylmnl.linux.netfilter.nfnetlinkh as nfnl
@@ -39,9 +39,9 @@ def print_counters(prefix, nest):
     nest.parse_nested(parse_counters_cb, tb)
     print("%s " % prefix, end='')
     if nfnlct.CTA_COUNTERS_PACKETS in tb:
-        print("packets=%u " % struct.unpack("Q", struct.pack(">Q", tb[nfnlct.CTA_COUNTERS_PACKETS].get_u64())), end='')
+        print("packets=%u " % tb[nfnlct.CTA_COUNTERS_PACKETS].get_be64(), end='')
     if nfnlct.CTA_COUNTERS_BYTES in tb:
-        print("bytes=%u " % struct.unpack("Q", struct.pack(">Q", tb[nfnlct.CTA_COUNTERS_BYTES].get_u64())), end='')
+        print("bytes=%u " % tb[nfnlct.CTA_COUNTERS_BYTES].get_be64(), end='')
 
 
 @mnl.attr_cb
@@ -77,13 +77,13 @@ def print_ip(nest):
 
     nest.parse_nested(parse_ip_cb, tb)
     if nfnlct.CTA_IP_V4_SRC in tb:
-        print("src=%s " % socket.inet_ntoa(tb[nfnlct.CTA_IP_V4_SRC].get_payload_v()), end='')
+        print("src=%s " % socket.inet_ntoa(tb[nfnlct.CTA_IP_V4_SRC].get_in_addr()), end='')
     if nfnlct.CTA_IP_V4_DST in tb:
-        print("dst=%s " % socket.inet_ntoa(tb[nfnlct.CTA_IP_V4_DST].get_payload_v()), end='')
+        print("dst=%s " % socket.inet_ntoa(tb[nfnlct.CTA_IP_V4_DST].get_in_addr()), end='')
     if nfnlct.CTA_IP_V6_SRC in tb:
-        print("src=%s " % socket.inet_ntop(socket.AF_INET6, tb[nfnlct.CTA_IP_V6_SRC].get_payload_v()), end='')
+        print("src=%s " % socket.inet_ntop(socket.AF_INET6, tb[nfnlct.CTA_IP_V6_SRC].get_in6_addr()), end='')
     if nfnlct.CTA_IP_V6_DST in tb:
-        print("dst=%s " % socket.inet_ntop(socket.AF_INET6, tb[nfnlct.CTA_IP_V6_DST].get_payload_v()), end='')
+        print("dst=%s " % socket.inet_ntop(socket.AF_INET6, tb[nfnlct.CTA_IP_V6_DST].get_in6_addr()), end='')
 
 
 @mnl.attr_cb
@@ -123,9 +123,9 @@ def print_proto(nest):
     nest.parse_nested(parse_proto_cb, tb)
     nfnlct.CTA_PROTO_NUM in tb       and print("proto=%u " % tb[nfnlct.CTA_PROTO_NUM].get_u8(), end='')
     nfnlct.CTA_PROTO_SRC_PORT in tb  and \
-        print("sport=%u " % socket.ntohs(tb[nfnlct.CTA_PROTO_SRC_PORT].get_u16()), end='')
+        print("sport=%u " % tb[nfnlct.CTA_PROTO_SRC_PORT].get_be16(), end='')
     nfnlct.CTA_PROTO_DST_PORT in tb  and \
-        print("dport=%u " % socket.ntohs(tb[nfnlct.CTA_PROTO_DST_PORT].get_u16()), end='')
+        print("dport=%u " % tb[nfnlct.CTA_PROTO_DST_PORT].get_be16(), end='')
     nfnlct.CTA_PROTO_ICMP_ID in tb   and print("id=%u " % tb[nfnlct.CTA_PROTO_ICMP_ID].get_u16(), end='')
     nfnlct.CTA_PROTO_ICMP_TYPE in tb and print("type=%u " % tb[nfnlct.CTA_PROTO_ICMP_TYPE].get_u8(), end='')
     nfnlct.CTA_PROTO_ICMP_CODE in tb and print("code=%u " % tb[nfnlct.CTA_PROTO_ICMP_CODE].get_u8(), end='')
@@ -204,8 +204,8 @@ def data_cb(nlh, data):
 
     nlh.parse(nfnl.Nfgenmsg.csize(), data_attr_cb, tb)
     nfnlct.CTA_TUPLE_ORIG in tb     and print_tuple(tb[nfnlct.CTA_TUPLE_ORIG])
-    nfnlct.CTA_MARK in tb           and print("mark=%u " % socket.ntohl(tb[nfnlct.CTA_MARK].get_u32()), end='')
-    nfnlct.CTA_SECMARK in tb        and print("secmark=%u " % socket.ntohl(tb[nfnlct.CTA_SECMARK].get_u32()), end='')
+    nfnlct.CTA_MARK in tb           and print("mark=%u " % tb[nfnlct.CTA_MARK].get_be32(), end='')
+    nfnlct.CTA_SECMARK in tb        and print("secmark=%u " % tb[nfnlct.CTA_SECMARK].get_be32(), end='')
     nfnlct.CTA_COUNTERS_ORIG in tb  and print_counters("original", tb[nfnlct.CTA_COUNTERS_ORIG])
     nfnlct.CTA_COUNTERS_REPLY in tb and print_counters("reply", tb[nfnlct.CTA_COUNTERS_REPLY])
     print()
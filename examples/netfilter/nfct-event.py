@@ -42,9 +42,9 @@ def print_ip(nest):
     nest.parse_nested(parse_ip_cb, tb)
     if nfnlct.CTA_IP_V4_SRC in tb:
         # socket.inet_ntoa can accept (ctypes.c_ubyte * n) !
-        print("src=%s " % socket.inet_ntoa(tb[nfnlct.CTA_IP_V4_SRC].get_payload_v()), end='')
+        print("src=%s " % socket.inet_ntoa(tb[nfnlct.CTA_IP_V4_SRC].get_in_addr()), end='')
     if nfnlct.CTA_IP_V4_DST in tb:
-        print("dst=%s " % socket.inet_ntoa(tb[nfnlct.CTA_IP_V4_DST].get_payload_v()), end='')
+        print("dst=%s " % socket.inet_ntoa(tb[nfnlct.CTA_IP_V4_DST].get_in_addr()), end='')
 
 
 @mnl.attr_cb
@@ -84,11 +84,11 @@ def print_proto(nest):
     nest.parse_nested(parse_proto_cb, tb)
     if nfnlct.CTA_PROTO_NUM in tb:       print("proto=%u " % tb[nfnlct.CTA_PROTO_NUM].get_u8(), end='')
     if nfnlct.CTA_PROTO_SRC_PORT in tb:
-        print("sport=%u " % socket.ntohs(tb[nfnlct.CTA_PROTO_SRC_PORT].get_u16()), end='')
+        print("sport=%u " % tb[nfnlct.CTA_PROTO_SRC_PORT].get_be16(), end='')
     if nfnlct.CTA_PROTO_DST_PORT in tb:
-        print("dport=%u " % socket.ntohs(tb[nfnlct.CTA_PROTO_DST_PORT].get_u16()), end='')
+        print("dport=%u " % tb[nfnlct.CTA_PROTO_DST_PORT].get_be16(), end='')
     if nfnlct.CTA_PROTO_ICMP_ID in tb:
-        print("id=%u " % socket.ntohs(tb[nfnlct.CTA_PROTO_ICMP_ID].get_u16()), end='')
+        print("id=%u " % tb[nfnlct.CTA_PROTO_ICMP_ID].get_be16(), end='')
     if nfnlct.CTA_PROTO_ICMP_TYPE in tb: print("type=%u " % tb[nfnlct.CTA_PROTO_ICMP_TYPE].get_u8(), end='')
     if nfnlct.CTA_PROTO_ICMP_CODE in tb: print("code=%u " % tb[nfnlct.CTA_PROTO_ICMP_CODE].get_u8(), end='')
 
@@ -169,8 +169,8 @@ def data_cb(nlh, tb):
 
     nlh.parse(nfnl.Nfgenmsg.csize(), data_attr_cb, tb)
     if nfnlct.CTA_TUPLE_ORIG in tb: print_tuple(tb[nfnlct.CTA_TUPLE_ORIG])
-    if nfnlct.CTA_MARK in tb:       print("mark=%u " % socket.ntohl(tb[nfnlct.CTA_MARK].get_u32()), end='')
-    if nfnlct.CTA_SECMARK in tb:    print("secmark=%u " % socket.ntohl(tb[nfnlct.CTA_SECMARK].get_u32()), end='')
+    if nfnlct.CTA_MARK in tb:       print("mark=%u " % tb[nfnlct.CTA_MARK].get_be32(), end='')
+    if nfnlct.CTA_SECMARK in tb:    print("secmark=%u " % tb[nfnlct.CTA_SECMARK].get_be32(), end='')
     print()
 
     return mnl.MNL_CB_OK
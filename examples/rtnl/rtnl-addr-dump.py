@@ -46,7 +46,7 @@ def data_cb(nlh, data):
     print("addr=", end='')
     if if_addr.IFA_ADDRESS in tb:
         attr = tb[if_addr.IFA_ADDRESS]
-        addr = attr.get_payload_v()
+        addr = attr.get_payload_mv()
         out = socket.inet_ntop(ifa.ifa_family, addr)
         print("%s " % out, end='')
 
@@ -56,7 +56,7 @@ def data_cb(nlh, tb):
     if if_linkh.IFLA_IFNAME in tb:
         print("name=%s " % tb[if_linkh.IFLA_IFNAME].get_str(), end='')
     if if_linkh.IFLA_ADDRESS in tb:
-        hwaddr = tb[if_linkh.IFLA_ADDRESS].get_payload_v()
+        hwaddr = tb[if_linkh.IFLA_ADDRESS].get_payload_mv()
         print("hwaddr=%s" % ":".join("%02x" % i for i in hwaddr), end='')
 
     print()
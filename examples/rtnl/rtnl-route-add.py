@@ -38,16 +38,16 @@ def main():
 
     try:
         # dst = struct.unpack("I", socket.inet_pton(socket.AF_INET, sys.argv[2]))[0]
-        dst = bytearray(socket.inet_pton(socket.AF_INET, sys.argv[2]))
+        dst = socket.inet_pton(socket.AF_INET, sys.argv[2])
         family = socket.AF_INET
     except OSError as e:
-        dst = bytearray(socket.inet_pton(socket.AF_INET6, sys.argv[2]))
+        dst = socket.inet_pton(socket.AF_INET6, sys.argv[2])
         family = socket.AF_INET6
 
     prefix = int(sys.argv[3])
 
     if len(sys.argv) == 5:
-        gw = bytearray(socket.inet_pton(family, sys.argv[4]))
+        gw = socket.inet_pton(family, sys.argv[4])
 
     nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
     nlh.nlmsg_type = rtnl.RTM_NEWROUTE
@@ -68,12 +68,12 @@ def main():
     rtm.rtm_flags = 0
 
     log.debug("family: %d, dst len: %d" % (family, len(dst)))
-    nlh.put(rtnl.RTA_DST, dst)
+    nlh.put_bytes(rtnl.RTA_DST, dst)
 
     nlh.put_u32(rtnl.RTA_OIF, iface)
     if len(sys.argv) == 5:
         log.info("family: %d, gw len: %d" % (family, len(gw)))
-        nlh.put(rtnl.RTA_GATEWAY, gw)
+        nlh.put_bytes(rtnl.RTA_GATEWAY, gw)
 
     with mnl.Socket(netlink.NETLINK_ROUTE) as nl:
         nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
@@ -36,7 +36,7 @@ def attributes_show_ipv4(tb):
         print(fmt % attr.get_u32(), end='')
 
     def _print_addr(fmt, attr):
-        addr = attr.get_payload_v()
+        addr = attr.get_payload_mv()
         print(fmt % socket.inet_ntoa(addr), end='')
 
     rtnl.RTA_TABLE in tb    and _print_u32("table=%u ", tb[rtnl.RTA_TABLE])
@@ -63,7 +63,7 @@ def attributes_show_ipv6(tb):
         print(fmt % attr.get_u32(), end='')
 
     def _print_addr6(fmt, attr):
-        addr = attr.get_payload_v()
+        addr = attr.get_payload_mv()
         print(fmt % inet6_ntoa(addr), end='')
 
     rtnl.RTA_TABLE in tb    and _print_u32("table=%u ", tb[rtnl.RTA_TABLE])
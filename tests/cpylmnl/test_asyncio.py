@@ -0,0 +1,242 @@
+#! /usr/bin/env python
+# -*- coding:utf-8 -*-
+
+from __future__ import print_function
+
+import sys, os, unittest, errno, socket, struct
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl.linux.rtnetlinkh as rtnl
+import cpylmnl as mnl
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+@unittest.skipIf(asyncio is None, "requires asyncio")
+class TestSuite(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+
+    def test_request_ack(self):
+        async def run():
+            with mnl.Socket(netlink.NETLINK_NETFILTER) as nl:
+                nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+                reqs = []
+                for i in range(100):
+                    nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+                    nlh.nlmsg_type = netlink.NLMSG_NOOP
+                    nlh.nlmsg_flags = netlink.NLM_F_ACK
+                    reqs.append(nl.request(nlh))
+                return await asyncio.gather(*reqs)
+
+        ret = self.loop.run_until_complete(run())
+        self.assertEqual(ret, [[]] * 100)
+
+
+    def test_request_dump(self):
+        async def run():
+            with mnl.Socket(netlink.NETLINK_ROUTE) as nl:
+                nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+                nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
+                nlh.nlmsg_type = rtnl.RTM_GETLINK
+                nlh.nlmsg_flags = netlink.NLM_F_REQUEST | netlink.NLM_F_DUMP
+                rt = nlh.put_extra_header_as(rtnl.Rtgenmsg)
+                rt.rtgen_family = socket.AF_PACKET
+                return await nl.request(nlh)
+
+        ret = self.loop.run_until_complete(run())
+        self.assertTrue(len(ret) > 0) # lo at least
+        for nlh in ret:
+            self.assertEqual(nlh.nlmsg_type, rtnl.RTM_NEWLINK)
+
+
+    def test_request_error(self):
+        async def run():
+            with mnl.Socket(netlink.NETLINK_ROUTE) as nl:
+                nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+                nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
+                nlh.nlmsg_type = 0xffff
+                nlh.nlmsg_flags = netlink.NLM_F_REQUEST | netlink.NLM_F_ACK
+                return await nl.request(nlh)
+
+        self.assertRaises(OSError, self.loop.run_until_complete, run())
+
+
+    def test_messages(self):
+        sender = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, netlink.NETLINK_USERSOCK)
+        sender.bind((0, 0))
+
+        async def run(nl):
+            for seq in range(3):
+                sender.sendto(struct.pack("IHHII", 16, netlink.NLMSG_NOOP, 0, seq, 0),
+                              (nl.get_portid(), 0))
+            ret = []
+            async for nlh in nl.messages():
+                ret.append(nlh.nlmsg_seq)
+                if len(ret) == 3: break
+            return ret
+
+        with mnl.Socket(netlink.NETLINK_USERSOCK) as nl:
+            nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+            self.assertEqual(self.loop.run_until_complete(run(nl)), [0, 1, 2])
+        sender.close()
+
+
+    def test_request_timeout(self):
+        async def run():
+            with mnl.Socket(netlink.NETLINK_ROUTE) as nl:
+                nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+                # no reply without NLM_F_ACK
+                nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+                nlh.nlmsg_type = netlink.NLMSG_NOOP
+                try:
+                    await nl.request(nlh, timeout=0.05)
+                except OSError as e:
+                    self.assertEqual(e.errno, errno.ETIMEDOUT)
+                else:
+                    self.fail("not raise OSError")
+                self.assertEqual(nl._aio_dispatcher.pending(), 0)
+
+                # cancelled by wait_for()
+                try:
+                    await asyncio.wait_for(nl.request(nlh), 0.05)
+                except asyncio.TimeoutError:
+                    pass
+                else:
+                    self.fail("not timed out")
+                self.assertEqual(nl._aio_dispatcher.pending(), 0)
+
+        self.loop.run_until_complete(run())
+
+
+    def test_recv_error(self):
+        def fail(buf, timeout=None):
+            raise OSError(errno.EIO, "Input/output error")
+
+        async def run(nl):
+            nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+            nlh.nlmsg_type = netlink.NLMSG_NOOP
+            nlh.nlmsg_flags = netlink.NLM_F_ACK
+            ret = await asyncio.gather(nl.request(nlh), nl.request(nlh),
+                                       return_exceptions=True)
+            self.assertEqual([e.errno for e in ret], [errno.EIO, errno.EIO])
+            # the reader is removed
+            self.assertFalse(self.loop.remove_reader(nl.get_fd()))
+            # and later requests fail
+            with self.assertRaises(OSError) as cm:
+                await nl.request(nlh)
+            self.assertEqual(cm.exception.errno, errno.EIO)
+            with self.assertRaises(OSError) as cm:
+                async for nlh in nl.messages():
+                    pass
+            self.assertEqual(cm.exception.errno, errno.EIO)
+
+        with mnl.Socket(netlink.NETLINK_ROUTE) as nl:
+            nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+            # persistent receiving error
+            nl.recv_into = fail
+            self.loop.run_until_complete(run(nl))
+
+
+
+    def test_late_replies(self):
+        async def drop(nl):
+            nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
+            nlh.nlmsg_type = rtnl.RTM_GETLINK
+            nlh.nlmsg_flags = netlink.NLM_F_REQUEST | netlink.NLM_F_DUMP
+            rt = nlh.put_extra_header_as(rtnl.Rtgenmsg)
+            rt.rtgen_family = socket.AF_PACKET
+            future = nl.request(nlh)
+            future.cancel()
+            d = nl._aio_dispatcher
+            late = []
+            unmatched = d.unmatched
+            def count(nlh):
+                late.append(nlh.nlmsg_type)
+                unmatched(nlh)
+            d.unmatched = count
+            for i in range(100):
+                if netlink.NLMSG_DONE in late: break
+                await asyncio.sleep(0.01)
+            del d.unmatched
+            # dropped until NLMSG_DONE
+            self.assertTrue(rtnl.RTM_NEWLINK in late)
+            self.assertEqual(len(d._expired), 0)
+            return d
+
+        async def run():
+            with mnl.Socket(netlink.NETLINK_ROUTE) as nl:
+                nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+                # not queued without messages()
+                d = await drop(nl)
+                self.assertEqual(d._queue, None)
+                nl.messages()
+                await drop(nl)
+                self.assertEqual(d._queue.qsize(), 0)
+
+        self.loop.run_until_complete(run())
+
+
+    def test_close_after_loop(self):
+        nl = mnl.Socket(netlink.NETLINK_ROUTE)
+        nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+        nlh.nlmsg_type = netlink.NLMSG_NOOP
+        nlh.nlmsg_flags = netlink.NLM_F_ACK
+
+        async def run():
+            self.assertEqual(await nl.request(nlh), [])
+            # pending on closing the loop
+            nl.request(nlh)
+        self.loop.run_until_complete(run())
+        d = nl._aio_dispatcher
+        self.loop.close()
+
+        fd = nl.get_fd()
+        nl.close()
+        self.assertEqual(d.pending(), 0)
+        # the fd is closed
+        with self.assertRaises(OSError) as cm:
+            os.fstat(fd)
+        self.assertEqual(cm.exception.errno, errno.EBADF)
+
+
+    def test_transaction(self):
+        # Transaction of the Dispatcher, received outside of the loop
+        async def run():
+            with mnl.Socket(netlink.NETLINK_ROUTE) as nl:
+                nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+                d = mnl._asyncio.dispatcher(nl)
+                nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
+                nlh.nlmsg_type = rtnl.RTM_GETLINK
+                nlh.nlmsg_flags = netlink.NLM_F_REQUEST | netlink.NLM_F_DUMP
+                rt = nlh.put_extra_header_as(rtnl.Rtgenmsg)
+                rt.rtgen_family = socket.AF_PACKET
+                dump = d._register(nlh)
+                nl.send_nlmsg(nlh)
+                links = [nlh.nlmsg_type for nlh in dump]
+
+                self.assertFalse(d.process(0.01))
+                nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+                nlh.nlmsg_type = netlink.NLMSG_NOOP
+                nlh.nlmsg_flags = netlink.NLM_F_ACK
+                ack = d._register(nlh)
+                nl.send_nlmsg(nlh)
+                return links, ack.result(1)
+
+        links, replies = self.loop.run_until_complete(run())
+        self.assertTrue(len(links) > 0) # lo at least
+        self.assertEqual(set(links), set([rtnl.RTM_NEWLINK]))
+        self.assertEqual(replies, [])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
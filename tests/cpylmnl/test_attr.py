@@ -3,7 +3,7 @@
 
 from __future__ import print_function
 
-import sys, random, unittest, struct, errno
+import sys, random, unittest, struct, errno, ipaddress
 import ctypes
 
 import cpylmnl.linux.netlinkh as netlink
@@ -87,6 +87,48 @@ class TestSuite(unittest.TestCase):
         self.assertTrue(bytearray(self.nla.get_payload_v()) == self.abuf[mnl.MNL_ATTR_HDRLEN:234])
 
 
+    def test_get_payload_mv(self):
+        self.rand_abuf.len = 234
+        mv = self.rand_nla.get_payload_mv()
+        self.assertTrue(isinstance(mv, memoryview))
+        self.assertEqual(mv.format, "B")
+        self.assertEqual(bytes(mv), bytes(self.rand_abuf[mnl.MNL_ATTR_HDRLEN:234]))
+
+        # refers the buffer in place
+        self.rand_abuf[mnl.MNL_ATTR_HDRLEN] = 0x12
+        self.assertEqual(mv[0], 0x12)
+
+        self.abuf.len = mnl.MNL_ATTR_HDRLEN + 4
+        self.abuf[mnl.MNL_ATTR_HDRLEN:mnl.MNL_ATTR_HDRLEN + 4] = bytearray([10, 0, 0, 1])
+        mv = self.nla.get_payload_mv()
+        self.assertEqual(int.from_bytes(mv, "big"), 0x0a000001)
+        self.assertEqual(str(ipaddress.ip_address(bytes(mv))), "10.0.0.1")
+
+        self.abuf.len = mnl.MNL_ATTR_HDRLEN
+        self.assertEqual(len(self.nla.get_payload_mv()), 0)
+        self.abuf.len = mnl.MNL_ATTR_HDRLEN - 1
+        with self.assertRaises(OSError) as cm:
+            self.nla.get_payload_mv()
+        self.assertEqual(cm.exception.errno, errno.ERANGE)
+
+        # truncated, nla_len runs over the end of the buffer
+        self.abuf.len = 513
+        with self.assertRaises(OSError) as cm:
+            self.nla.get_payload_mv()
+        self.assertEqual(cm.exception.errno, errno.ERANGE)
+        buf = bytearray(20)
+        nla = mnl.Attr(buf, 8)
+        buf[8:10] = struct.pack("H", 12)
+        self.assertEqual(len(nla.get_payload_mv()), 8)
+        with self.assertRaises(OSError) as cm:
+            nla.get_payload_mv(8)
+        self.assertEqual(cm.exception.errno, errno.ERANGE)
+        buf[8:10] = struct.pack("H", 16)
+        with self.assertRaises(OSError) as cm:
+            nla.get_payload_mv()
+        self.assertEqual(cm.exception.errno, errno.ERANGE)
+
+
     def test_ok(self):
         self.abuf.len = 3
         self.assertTrue(self.nla.ok(3) == False)
@@ -334,6 +376,23 @@ class TestSuite(unittest.TestCase):
         self.assertTrue(self.nla.get_u64() == 0x123456789abcdef)
 
 
+    def test_get_be(self):
+        self.abuf.len = 12
+        self.abuf[4:12] = struct.pack(">Q", 0x123456789abcdef)
+        self.assertEqual(self.nla.get_be64(), 0x123456789abcdef)
+        self.abuf[4:8] = struct.pack(">I", 0x12345678)
+        self.assertEqual(self.nla.get_be32(), 0x12345678)
+        self.abuf[4:6] = struct.pack(">H", 0x1234)
+        self.assertEqual(self.nla.get_be16(), 0x1234)
+
+
+    def test_get_in_addr(self):
+        self.abuf.len = 20
+        self.abuf[4:20] = bytearray(range(1, 17))
+        self.assertEqual(self.nla.get_in_addr(), b"\1\2\3\4")
+        self.assertEqual(self.nla.get_in6_addr(), bytes(bytearray(range(1, 17))))
+
+
     def test_get_str(self):
         self.abuf.len = 11
         self.abuf.type = mnl.MNL_TYPE_STRING
@@ -361,6 +420,23 @@ class TestSuite(unittest.TestCase):
             self.fail("not raise OSError")
 
 
+    def test_put_bytes(self):
+        data = (b"\1\2\3", bytearray(b"\1\2\3"), memoryview(b"\0\1\2\3\4")[1:4],
+                (ctypes.c_ubyte * 3)(1, 2, 3))
+        for d in data:
+            nlh = mnl.Nlmsg(NlmsghdrBuf(64))
+            nlh.put_header()
+            nlh.put_bytes(1, d)
+            nlh.put_bytes(2, b"")
+            expected = mnl.Nlmsg.put_new_header(64)
+            expected.put(1, (ctypes.c_ubyte * 3)(1, 2, 3))
+            expected.put(2, (ctypes.c_ubyte * 0)())
+            self.assertEqual(nlh.marshal_binary(), expected.marshal_binary())
+
+        self.nlh.put_header()
+        self.assertRaises(OSError, self.nlh.put_bytes, 1, bytearray(0x10000))
+
+
     def test_put_u8(self):
         self.nlh.put_header()
         self.nlh.put_u8(mnl.MNL_TYPE_U8, 7)
@@ -404,6 +480,20 @@ class TestSuite(unittest.TestCase):
         self.assertTrue(_tbuf.len == mnl.MNL_ATTR_HDRLEN + 8)
         self.assertTrue(struct.unpack("Q", bytes(_tbuf[mnl.MNL_ATTR_HDRLEN:mnl.MNL_ATTR_HDRLEN + 8]))[0] == 0x123456789abcdef0)
 
+    def test_put_be(self):
+        self.nlh.put_header()
+        self.nlh.put_be16(1, 0x1234)
+        self.nlh.put_be32(2, 0x12345678)
+        self.nlh.put_be64(3, 0x123456789abcdef0)
+        self.assertEqual(self.hbuf.len, mnl.MNL_NLMSG_HDRLEN + mnl.MNL_ATTR_HDRLEN * 3 + 4 + 4 + 8)
+
+        attrs = list(self.nlh.attributes(0))
+        self.assertEqual([a.get_len() for a in attrs], [6, 8, 12])
+        self.assertEqual(bytes(attrs[0].get_payload_v()), struct.pack(">H", 0x1234))
+        self.assertEqual(bytes(attrs[1].get_payload_v()), struct.pack(">I", 0x12345678))
+        self.assertEqual(bytes(attrs[2].get_payload_v()), struct.pack(">Q", 0x123456789abcdef0))
+        self.assertEqual(attrs[2].get_be64(), 0x123456789abcdef0)
+
     def test_put_str(self):
         s = b"abcdEFGH"
         self.nlh.put_header()
@@ -475,6 +565,27 @@ class TestSuite(unittest.TestCase):
             self.fail("not raise OSError")
 
 
+    def test_put_bytes_check(self):
+        self.nlh.put_header()
+        self.assertTrue(self.nlh.put_bytes_check(len(self.hbuf), 1, b"\1\2\3"))
+        self.assertTrue(self.hbuf.len == self.msg_attr_hlen + mnl.MNL_ALIGN(3))
+        _tbuf = NlattrBuf(self.hbuf[mnl.MNL_NLMSG_HDRLEN:])
+        self.assertTrue(_tbuf.type == 1)
+        self.assertTrue(_tbuf.len == mnl.MNL_ATTR_HDRLEN + 3)
+        self.assertEqual(_tbuf[mnl.MNL_ATTR_HDRLEN:mnl.MNL_ATTR_HDRLEN + 3], b"\1\2\3")
+
+        # same condition as put_check()
+        b = (ctypes.c_ubyte * 3).from_buffer(bytearray([1, 2, 3]))
+        for l in range(self.msg_attr_hlen, self.msg_attr_hlen + 8):
+            _nlh = mnl.Nlmsg(NlmsghdrBuf(64))
+            _nlh.put_header()
+            ok = _nlh.put_check(l, 1, b)
+            _nlh = mnl.Nlmsg(NlmsghdrBuf(64))
+            _nlh.put_header()
+            self.assertEqual(_nlh.put_bytes_check(l, 1, bytes(b)), ok)
+            self.assertEqual(_nlh.nlmsg_len, ok and self.msg_attr_hlen + 4 or mnl.MNL_NLMSG_HDRLEN)
+
+
     def test_put_u8_check(self):
         self.nlh.put_header()
         self.assertTrue(self.nlh.put_u8_check(len(self.hbuf), mnl.MNL_TYPE_U8, 7))
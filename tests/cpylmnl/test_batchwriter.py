@@ -0,0 +1,97 @@
+#! /usr/bin/env python
+# -*- coding:utf-8 -*-
+
+from __future__ import print_function
+
+import sys, unittest, errno
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+def put_noop(buf, nlmsg_type=netlink.NLMSG_NOOP):
+    nlh = mnl.Nlmsg(buf)
+    nlh.put_header()
+    nlh.nlmsg_type = nlmsg_type
+    nlh.nlmsg_flags = netlink.NLM_F_REQUEST
+    return nlh
+
+
+class TestSuite(unittest.TestCase):
+    def setUp(self):
+        self.nl = mnl.Socket(netlink.NETLINK_ROUTE)
+        self.nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+
+    def tearDown(self):
+        self.nl.close()
+
+
+    def test_commit(self):
+        done = []
+        # 16 messages per batch
+        with mnl.BatchWriter(self.nl, 16 * mnl.MNL_NLMSG_HDRLEN, window=20, callback=done.append) as w:
+            txs = []
+            for i in range(100):
+                put_noop(w.current())
+                txs.append(w.commit())
+                # the window is bounded
+                self.assertTrue(w.pending() - len(w._unsent) <= 20)
+            self.assertTrue(len(done) > 0)
+        self.assertEqual(w.pending(), 0)
+        self.assertEqual(len(set(tx.seq for tx in txs)), 100)
+        self.assertEqual(len(done), 100)
+        self.assertEqual(w.failed, [])
+        for tx in txs:
+            self.assertEqual(tx.result(), [])
+
+
+    def test_failed(self):
+        with mnl.BatchWriter(self.nl, 4 * mnl.MNL_NLMSG_HDRLEN) as w:
+            txs = []
+            for i in range(10):
+                put_noop(w.current(), i % 3 == 0 and 0xffff or netlink.NLMSG_NOOP)
+                txs.append(w.commit())
+        self.assertEqual(w.failed, txs[::3])
+        for tx in w.failed:
+            self.assertTrue(isinstance(tx.exception(), OSError))
+        for i, tx in enumerate(txs):
+            if i % 3:
+                self.assertEqual(tx.exception(), None)
+
+
+    def test_flush(self):
+        w = mnl.BatchWriter(self.nl)
+        put_noop(w.current())
+        tx = w.commit()
+        self.assertFalse(tx.done())
+        w.flush()
+        self.assertTrue(tx.done())
+        # empty
+        w.flush()
+        self.assertEqual(w.pending(), 0)
+        w._batch.stop()
+
+
+    def test_fail_all(self):
+        w = mnl.BatchWriter(self.nl, 4 * mnl.MNL_NLMSG_HDRLEN)
+        txs = []
+        for i in range(6):
+            put_noop(w.current())
+            txs.append(w.commit())
+        # sent ones are completed, not sent ones are left
+        sent = len(txs) - len(w._unsent)
+        self.assertTrue(0 < sent < len(txs))
+        err = OSError(errno.ECONNRESET, "reset")
+        w.fail_all(err)
+        for tx in txs[:sent]:
+            self.assertTrue(tx.done())
+        for tx in txs[sent:]:
+            self.assertFalse(tx.done())
+        w.flush()
+        for tx in txs[sent:]:
+            self.assertEqual(tx.result(), [])
+        w._batch.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -273,6 +273,51 @@ class TestSuite(unittest.TestCase):
             else:
                 self.fail("not raise OSError")
 
+    def test_callback_table(self):
+        @mnl.nlmsg_cb
+        def cb_data(h, d):
+            d.append(h.nlmsg_type)
+            if h.nlmsg_type == 0x7f: return mnl.MNL_CB_STOP
+            return mnl.MNL_CB_OK
+
+        @mnl.nlmsg_cb
+        def cb_noop(h, d):
+            d.append(-1)
+            return mnl.MNL_CB_OK
+
+        l = []
+        table = mnl.CallbackTable(1, 1, cb_data, l, {netlink.NLMSG_NOOP: cb_noop})
+        self.assertEqual(table.run(self.nlmsghdr_type7F), mnl.MNL_CB_STOP)
+        self.assertEqual(l, [-1, netlink.NLMSG_MIN_TYPE, 0x7f])
+
+        # same buffer, partial
+        del l[:]
+        self.assertEqual(table.run(self.nlmsghdr_type7F, 32), mnl.MNL_CB_OK)
+        self.assertEqual(l, [-1, netlink.NLMSG_MIN_TYPE])
+        try:
+            table.run(self.nlmsghdr_type7F, 64)
+        except OSError as e:
+            self.assertEqual(e.errno, errno.EINVAL)
+        else:
+            self.fail("not raise OSError")
+
+        # default control callbacks and changed seq
+        table = mnl.CallbackTable(2, 1, cb_data, l)
+        try:
+            table.run(self.nlmsghdr_error)
+        except OSError as e:
+            self.assertEqual(e.errno, errno.EPROTO)
+        else:
+            self.fail("not raise OSError")
+        table.seq = 1
+        try:
+            table.run(self.nlmsghdr_error)
+        except OSError as e:
+            self.assertEqual(e.errno, errno.EPERM)
+        else:
+            self.fail("not raise OSError")
+        self.assertEqual(table.run(self.nlmsghdr_done), mnl.MNL_CB_STOP)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,166 @@
+#! /usr/bin/env python
+# -*- coding:utf-8 -*-
+
+from __future__ import print_function
+
+import sys, unittest, errno, socket, ctypes
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl.linux.rtnetlinkh as rtnl
+import cpylmnl.linux.netfilter.nfnetlinkh as nfnl
+import cpylmnl.linux.netfilter.nfnetlink_conntrackh as nfnlct
+import cpylmnl as mnl
+
+
+CT_TYPE = (nfnl.NFNL_SUBSYS_CTNETLINK << 8) | nfnlct.IPCTNL_MSG_CT_NEW
+CT_FLAGS = netlink.NLM_F_REQUEST | netlink.NLM_F_CREATE | netlink.NLM_F_ACK
+
+ip_policy = mnl.Policy(nfnlct.CTA_IP_MAX, {nfnlct.CTA_IP_V4_SRC: mnl.MNL_TYPE_U32,
+                                           nfnlct.CTA_IP_V4_DST: mnl.MNL_TYPE_U32})
+proto_policy = mnl.Policy(nfnlct.CTA_PROTO_MAX, {nfnlct.CTA_PROTO_NUM: mnl.MNL_TYPE_U8,
+                                                 nfnlct.CTA_PROTO_SRC_PORT: mnl.MNL_TYPE_U16,
+                                                 nfnlct.CTA_PROTO_DST_PORT: mnl.MNL_TYPE_U16})
+tuple_policy = mnl.Policy(nfnlct.CTA_TUPLE_MAX,
+                          {nfnlct.CTA_TUPLE_IP: (mnl.MNL_TYPE_NESTED, 0, ip_policy),
+                           nfnlct.CTA_TUPLE_PROTO: (mnl.MNL_TYPE_NESTED, 0, proto_policy)})
+ct_policy = mnl.Policy(nfnlct.CTA_MAX,
+                       {nfnlct.CTA_TUPLE_ORIG: (mnl.MNL_TYPE_NESTED, 0, tuple_policy),
+                        nfnlct.CTA_TIMEOUT: mnl.MNL_TYPE_U32,
+                        nfnlct.CTA_HELP: mnl.MNL_TYPE_NUL_STRING,
+                        nfnlct.CTA_MARK: (mnl.MNL_TYPE_BINARY, 4)})
+
+
+class TestSuite(unittest.TestCase):
+    def _nfgenmsg(self):
+        nfh = nfnl.Nfgenmsg()
+        nfh.nfgen_family = socket.AF_INET
+        nfh.version = nfnl.NFNETLINK_V0
+        nfh.res_id = 0x1234
+        return nfh
+
+    def test_same_as_put(self):
+        nlh = mnl.Nlmsg.put_new_header(512)
+        nlh.nlmsg_type = CT_TYPE
+        nlh.nlmsg_flags = CT_FLAGS
+        nlh.nlmsg_seq = 7
+        nfh = nlh.put_extra_header_as(nfnl.Nfgenmsg)
+        nfh.nfgen_family = socket.AF_INET
+        nfh.version = nfnl.NFNETLINK_V0
+        nfh.res_id = 0x1234
+        nest1 = nlh.nest_start(nfnlct.CTA_TUPLE_ORIG)
+        nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_IP)
+        nlh.put_be32(nfnlct.CTA_IP_V4_SRC, 0x01010101)
+        nlh.put_be32(nfnlct.CTA_IP_V4_DST, 0x02020202)
+        nlh.nest_end(nest2)
+        nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_PROTO)
+        nlh.put_u8(nfnlct.CTA_PROTO_NUM, socket.IPPROTO_TCP)
+        nlh.put_be16(nfnlct.CTA_PROTO_SRC_PORT, 1024)
+        nlh.put_be16(nfnlct.CTA_PROTO_DST_PORT, 1025)
+        nlh.nest_end(nest2)
+        nlh.nest_end(nest1)
+        nlh.put_strz(nfnlct.CTA_HELP, b"ftp")
+        nlh.put_be32(nfnlct.CTA_TIMEOUT, 1000)
+        expected = nlh.marshal_binary()
+
+        encoder = mnl.MessageEncoder(ct_policy, CT_TYPE, CT_FLAGS, ">")
+        attrs = {nfnlct.CTA_TUPLE_ORIG: {nfnlct.CTA_TUPLE_IP: {nfnlct.CTA_IP_V4_SRC: 0x01010101,
+                                                               nfnlct.CTA_IP_V4_DST: 0x02020202},
+                                         nfnlct.CTA_TUPLE_PROTO: [(nfnlct.CTA_PROTO_NUM, socket.IPPROTO_TCP),
+                                                                  (nfnlct.CTA_PROTO_SRC_PORT, 1024),
+                                                                  (nfnlct.CTA_PROTO_DST_PORT, 1025)]},
+                 nfnlct.CTA_HELP: b"ftp",
+                 nfnlct.CTA_TIMEOUT: 1000,
+                 nfnlct.CTA_MARK: None}
+        self.assertEqual(encoder.size(attrs, self._nfgenmsg()), len(expected))
+
+        buf = bytearray(b"\xff" * 512)
+        n = encoder.encode_into(buf, attrs, self._nfgenmsg(), seq=7, offset=4)
+        self.assertEqual(n, len(expected))
+        self.assertEqual(buf[4:4 + n], expected)
+        self.assertEqual(buf[:4], b"\xff" * 4)
+        self.assertEqual(buf[4 + n:], b"\xff" * (512 - 4 - n))
+        self.assertEqual(encoder.encode(attrs, bytes(self._nfgenmsg()), seq=7), expected)
+
+        # parsed back by the policy
+        tb = mnl.Nlmsg(buf, 4).parse_policy(nfnl.Nfgenmsg.csize(), ct_policy)
+        self.assertEqual(tb.get_be32(nfnlct.CTA_TIMEOUT), 1000)
+        self.assertEqual(tb.nested(nfnlct.CTA_TUPLE_ORIG).nested(nfnlct.CTA_TUPLE_PROTO)
+                         .get_be16(nfnlct.CTA_PROTO_DST_PORT), 1025)
+
+    def test_no_rule(self):
+        # native byte order, raw payloads, nested without policy
+        encoder = mnl.MessageEncoder(mnl.Policy(rtnl.RTA_MAX, {rtnl.RTA_OIF: mnl.MNL_TYPE_U32}),
+                                     rtnl.RTM_NEWROUTE)
+        rtm = rtnl.Rtmsg()
+        rtm.rtm_family = socket.AF_INET6
+        dst = socket.inet_pton(socket.AF_INET6, "fdff::1")
+        attrs = [(rtnl.RTA_DST, dst),
+                 (rtnl.RTA_OIF, 2),
+                 (rtnl.RTA_GATEWAY, bytearray(dst)),
+                 (rtnl.RTA_METRICS, {1: (ctypes.c_uint32 * 1)(1500)}),
+                 (rtnl.RTA_PRIORITY, memoryview(b"\1\2\3"))]
+        buf = encoder.encode(attrs, rtm)
+
+        nlh = mnl.Nlmsg.put_new_header(512)
+        nlh.nlmsg_type = rtnl.RTM_NEWROUTE
+        nlh.put_extra_header_as(rtnl.Rtmsg).rtm_family = socket.AF_INET6
+        nlh.put(rtnl.RTA_DST, (ctypes.c_ubyte * 16).from_buffer_copy(dst))
+        nlh.put_u32(rtnl.RTA_OIF, 2)
+        nlh.put(rtnl.RTA_GATEWAY, (ctypes.c_ubyte * 16).from_buffer_copy(dst))
+        nest = nlh.nest_start(rtnl.RTA_METRICS)
+        nlh.put_u32(1, 1500)
+        nlh.nest_end(nest)
+        nlh.put(rtnl.RTA_PRIORITY, (ctypes.c_ubyte * 3).from_buffer_copy(b"\1\2\3"))
+        self.assertEqual(buf, nlh.marshal_binary())
+
+        # padding is cleared
+        dirty = bytearray(b"\xff" * len(buf))
+        encoder.encode_into(dirty, attrs, rtm)
+        self.assertEqual(dirty, buf)
+
+    def test_flag(self):
+        encoder = mnl.MessageEncoder(mnl.Policy(3, {1: mnl.MNL_TYPE_FLAG, 2: mnl.MNL_TYPE_U32}), 0x10)
+        buf = encoder.encode({1: True, 2: 1})
+        self.assertEqual(len(buf), mnl.MNL_NLMSG_HDRLEN + mnl.MNL_ATTR_HDRLEN * 2 + 4)
+        self.assertEqual(mnl.Nlmsg(buf).get_payload_offset_as(0, mnl.Attr).get_type(), 1)
+
+        # False is not put
+        attrs = {1: False, 2: 1}
+        buf = encoder.encode(attrs)
+        self.assertEqual(encoder.size(attrs), len(buf))
+        self.assertEqual(len(buf), mnl.MNL_NLMSG_HDRLEN + mnl.MNL_ATTR_HDRLEN + 4)
+        self.assertEqual(mnl.Nlmsg(buf).get_payload_offset_as(0, mnl.Attr).get_type(), 2)
+
+    def test_errors(self):
+        encoder = mnl.MessageEncoder(ct_policy, CT_TYPE, CT_FLAGS, ">")
+        attrs = {nfnlct.CTA_TIMEOUT: 1}
+        size = encoder.size(attrs)
+        buf = bytearray(size)
+        with self.assertRaises(OSError) as cm:
+            encoder.encode_into(buf, attrs, offset=1)
+        self.assertEqual(cm.exception.errno, errno.ENOSPC)
+        self.assertEqual(buf, bytearray(size))
+        self.assertEqual(encoder.encode_into(buf, attrs), size)
+
+        with self.assertRaises(OSError) as cm:
+            encoder.encode({nfnlct.CTA_MARK: b"\0\0\0"})
+        self.assertEqual(cm.exception.errno, errno.ERANGE)
+        self.assertRaises(Exception, encoder.encode, {nfnlct.CTA_TIMEOUT: 1 << 32})
+
+        # bytes-like only for strings
+        for v in (3, u"ftp"):
+            with self.assertRaises(OSError) as cm:
+                encoder.encode({nfnlct.CTA_HELP: v})
+            self.assertEqual(cm.exception.errno, errno.EINVAL)
+        self.assertEqual(encoder.encode({nfnlct.CTA_HELP: bytearray(b"ftp")}),
+                         encoder.encode({nfnlct.CTA_HELP: b"ftp"}))
+        encoder = mnl.MessageEncoder(mnl.Policy(1, {1: mnl.MNL_TYPE_STRING}), 0x10)
+        for v in (3, u"ftp"):
+            with self.assertRaises(OSError) as cm:
+                encoder.encode({1: v})
+            self.assertEqual(cm.exception.errno, errno.EINVAL)
+        self.assertEqual(encoder.encode({1: memoryview(b"ftp")}), encoder.encode({1: b"ftp"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
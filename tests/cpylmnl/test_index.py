@@ -0,0 +1,115 @@
+#! /usr/bin/env python
+# -*- coding:utf-8 -*-
+
+from __future__ import print_function
+
+import sys, unittest, struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl.linux.rtnetlinkh as rtnl
+import cpylmnl.linux.netfilter.nfnetlinkh as nfnl
+import cpylmnl.linux.netfilter.nfnetlink_conntrackh as nfnlct
+import cpylmnl as mnl
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestSuite(unittest.TestCase):
+    def _ct(self, src, orig_bytes=None):
+        nlh = mnl.Nlmsg.put_new_header(512)
+        nlh.nlmsg_type = (nfnl.NFNL_SUBSYS_CTNETLINK << 8) | nfnlct.IPCTNL_MSG_CT_NEW
+        nlh.nlmsg_flags = netlink.NLM_F_MULTI
+        nlh.put_extra_header_as(nfnl.Nfgenmsg)
+        nest1 = nlh.nest_start(nfnlct.CTA_TUPLE_ORIG)
+        nest2 = nlh.nest_start(nfnlct.CTA_TUPLE_IP)
+        nlh.put_be32(nfnlct.CTA_IP_V4_SRC, src)
+        nlh.put_be32(nfnlct.CTA_IP_V4_DST, 0x0a000002)
+        nlh.nest_end(nest2)
+        nlh.nest_end(nest1)
+        if orig_bytes is not None:
+            nest1 = nlh.nest_start(nfnlct.CTA_COUNTERS_ORIG)
+            nlh.put_be64(nfnlct.CTA_COUNTERS_PACKETS, 1)
+            nlh.put_be64(nfnlct.CTA_COUNTERS_BYTES, orig_bytes)
+            nlh.nest_end(nest1)
+        # same type as CTA_COUNTERS_BYTES at depth 1, must not be selected
+        nest1 = nlh.nest_start(nfnlct.CTA_COUNTERS_REPLY)
+        nlh.put_be64(nfnlct.CTA_COUNTERS_BYTES, 0xffff)
+        nlh.nest_end(nest1)
+        nlh.put_be32(nfnlct.CTA_MARK, 7)
+        return nlh.marshal_binary()
+
+    def _policy(self):
+        ip_policy = mnl.Policy(nfnlct.CTA_IP_MAX, {})
+        tuple_policy = mnl.Policy(nfnlct.CTA_TUPLE_MAX,
+                                  {nfnlct.CTA_TUPLE_IP: (mnl.MNL_TYPE_NESTED, 0, ip_policy)})
+        counters_policy = mnl.Policy(nfnlct.CTA_COUNTERS_MAX, {})
+        return mnl.Policy(nfnlct.CTA_MAX,
+                          {nfnlct.CTA_TUPLE_ORIG: (mnl.MNL_TYPE_NESTED, 0, tuple_policy),
+                           nfnlct.CTA_COUNTERS_ORIG: (mnl.MNL_TYPE_NESTED, 0, counters_policy),
+                           nfnlct.CTA_COUNTERS_REPLY: (mnl.MNL_TYPE_NESTED, 0, counters_policy)})
+
+    def test_index_attributes(self):
+        buf = self._ct(0x0a000001, 100)
+        done = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+        done.nlmsg_type = netlink.NLMSG_DONE
+        buf += self._ct(0x0a000003) + done.marshal_binary()
+
+        idx = mnl.index_attributes(buf, nfnl.Nfgenmsg.csize(), self._policy())
+        self.assertEqual(len(idx), 2)
+        self.assertEqual(list(idx.msgs["offset"]), [0, len(self._ct(0x0a000001, 100))])
+
+        # msg 0: TUPLE_ORIG, TUPLE_IP, V4_SRC, V4_DST, COUNTERS_ORIG, PACKETS, BYTES,
+        #        COUNTERS_REPLY, BYTES, MARK
+        attrs = idx.attrs[idx.attrs["msg"] == 0]
+        self.assertEqual(len(attrs), 10)
+        self.assertEqual(list(attrs["depth"]), [0, 1, 2, 2, 0, 1, 1, 0, 1, 0])
+        self.assertEqual(list(attrs["parent"]), [-1, 0, 1, 1, -1, 4, 4, -1, 7, -1])
+        self.assertEqual(list(attrs["type"][:3]),
+                         [nfnlct.CTA_TUPLE_ORIG, nfnlct.CTA_TUPLE_IP, nfnlct.CTA_IP_V4_SRC])
+        self.assertEqual(struct.unpack_from(">I", buf, attrs["offset"][2] + mnl.MNL_ATTR_HDRLEN)[0],
+                         0x0a000001)
+        self.assertEqual(attrs["len"][2], mnl.MNL_ATTR_HDRLEN + 4)
+
+        # without policy, top level only
+        idx = mnl.index_attributes(buf, nfnl.Nfgenmsg.csize())
+        self.assertEqual(len(idx.attrs), 7)
+        self.assertEqual(int(idx.attrs["depth"].max()), 0)
+
+    def test_column(self):
+        buf = self._ct(0x0a000001, 100) + self._ct(0x0a000003) + self._ct(0xc0a80001, 1 << 40)
+        idx = mnl.index_attributes(buf, nfnl.Nfgenmsg.csize(), self._policy())
+
+        orig_bytes = (nfnlct.CTA_COUNTERS_ORIG, nfnlct.CTA_COUNTERS_BYTES)
+        src = (nfnlct.CTA_TUPLE_ORIG, nfnlct.CTA_TUPLE_IP, nfnlct.CTA_IP_V4_SRC)
+        self.assertEqual(list(idx.present(orig_bytes)), [True, False, True])
+        col = idx.column(orig_bytes, ">u8")
+        self.assertTrue(col.dtype.isnative)
+        self.assertEqual(list(col), [100, 0, 1 << 40])
+        self.assertEqual(list(idx.column(src, ">u4")), [0x0a000001, 0x0a000003, 0xc0a80001])
+        self.assertEqual(list(idx.column((nfnlct.CTA_MARK, ), ">u4")), [7, 7, 7])
+        cols = idx.columns({"bytes": (orig_bytes, ">u8"), "src": (src, ">u4")}, fill=1)
+        self.assertEqual(list(cols["bytes"]), [100, 1, 1 << 40])
+
+        # payload shorter than dtype
+        self.assertEqual(list(idx.column(src, ">u8", fill=2)), [2, 2, 2])
+
+    def test_rtnl(self):
+        buf = bytearray()
+        for dst in (0x0a000000, 0xc0a80000):
+            nlh = mnl.Nlmsg.put_new_header(512)
+            nlh.nlmsg_type = rtnl.RTM_NEWROUTE
+            nlh.put_extra_header_as(rtnl.Rtmsg)
+            nlh.put_u32(rtnl.RTA_TABLE, 254)
+            nlh.put_be32(rtnl.RTA_DST, dst)
+            buf += nlh.marshal_binary()
+        idx = mnl.index_attributes(buf, rtnl.Rtmsg.csize())
+        self.assertEqual(list(idx.column((rtnl.RTA_DST, ), ">u4")), [0x0a000000, 0xc0a80000])
+        self.assertEqual(list(idx.column((rtnl.RTA_TABLE, ), "=u4")), [254, 254])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -110,6 +110,19 @@ class TestSuite(unittest.TestCase):
         self.assertTrue(b == self.rand_hbuf[mnl.MNL_NLMSG_HDRLEN:mnl.MNL_ALIGN(384)])
 
 
+    def test_get_payload_mv(self):
+        self.rand_nlh.nlmsg_len = mnl.MNL_ALIGN(384)
+        mv = self.rand_nlh.get_payload_mv()
+        self.assertTrue(isinstance(mv, memoryview))
+        self.assertEqual(len(mv), 384 - mnl.MNL_NLMSG_HDRLEN)
+        self.assertEqual(bytes(mv), bytes(self.rand_hbuf[mnl.MNL_NLMSG_HDRLEN:mnl.MNL_ALIGN(384)]))
+        self.rand_hbuf[mnl.MNL_NLMSG_HDRLEN] = 0x34
+        self.assertEqual(mv[0], 0x34)
+
+        self.rand_nlh.nlmsg_len = mnl.MNL_NLMSG_HDRLEN - 1
+        self.assertRaises(OSError, self.rand_nlh.get_payload_mv)
+
+
     def test_get_payload_offset(self):
         p = self.rand_nlh.get_payload_offset(191)
         buflen = self.buflen - mnl.MNL_NLMSG_HDRLEN - mnl.MNL_ALIGN(191)
@@ -123,6 +136,14 @@ class TestSuite(unittest.TestCase):
         self.assertTrue(b == self.rand_hbuf[mnl.MNL_NLMSG_HDRLEN + mnl.MNL_ALIGN(191):])
 
 
+    def test_get_payload_offset_mv(self):
+        mv = self.rand_nlh.get_payload_offset_mv(191)
+        self.assertEqual(len(mv), self.buflen - mnl.MNL_NLMSG_HDRLEN - mnl.MNL_ALIGN(191))
+        self.assertEqual(bytes(mv), bytes(self.rand_hbuf[mnl.MNL_NLMSG_HDRLEN + mnl.MNL_ALIGN(191):]))
+        self.assertEqual(len(self.rand_nlh.get_payload_offset_mv(self.buflen - mnl.MNL_NLMSG_HDRLEN)), 0)
+        self.assertRaises(OSError, self.rand_nlh.get_payload_offset_mv, self.buflen)
+
+
     def test_get_payload_offset_as(self):
         exhdr = self.nlh.get_payload_offset_as(191, nfnl.Nfgenmsg)
         self.assertTrue(isinstance(exhdr, nfnl.Nfgenmsg))
@@ -195,6 +216,44 @@ class TestSuite(unittest.TestCase):
         self.assertTrue(self.rand_nlh.portid_ok(888))
 
 
+    def test_get_ext_ack(self):
+        # original request: header and 4 bytes payload
+        orig = struct.pack("IHHII", 20, 0x10, 0, 1, 0) + b"abcd"
+        tlvs = struct.pack("HH", 8, netlink.NLMSGERR_ATTR_MSG) + b"bad\0" \
+               + struct.pack("HHI", 8, netlink.NLMSGERR_ATTR_OFFS, 16) \
+               + struct.pack("HH", 6, netlink.NLMSGERR_ATTR_COOKIE) + b"ck\0\0"
+
+        # not capped, followed by the original request
+        payload = struct.pack("i", -22) + orig + tlvs
+        buf = bytearray(struct.pack("IHHII", 16 + len(payload), netlink.NLMSG_ERROR,
+                                    netlink.NLM_F_ACK_TLVS, 1, 0) + payload)
+        ack = mnl.Nlmsg(buf).get_ext_ack()
+        self.assertEqual(ack.error, -22)
+        self.assertEqual(ack.message, b"bad")
+        self.assertEqual(ack.offset, 16)
+        self.assertEqual(ack.cookie, b"ck")
+        e = ack.os_error()
+        self.assertEqual(e.errno, 22)
+        self.assertTrue(e.strerror.endswith(": bad"))
+        self.assertTrue(e.ext_ack is ack)
+
+        # capped, the original header only
+        payload = struct.pack("i", -22) + orig[:16] + tlvs
+        buf = bytearray(struct.pack("IHHII", 16 + len(payload), netlink.NLMSG_ERROR,
+                                    netlink.NLM_F_CAPPED | netlink.NLM_F_ACK_TLVS, 1, 0) + payload)
+        ack = mnl.Nlmsg(buf).get_ext_ack()
+        self.assertEqual((ack.error, ack.message, ack.offset, ack.cookie), (-22, b"bad", 16, b"ck"))
+
+        # no TLVs
+        buf = bytearray(struct.pack("IHHII", 36, netlink.NLMSG_ERROR, netlink.NLM_F_CAPPED, 1, 0)
+                        + struct.pack("i", 0) + orig[:16])
+        ack = mnl.Nlmsg(buf).get_ext_ack()
+        self.assertEqual((ack.error, ack.message, ack.offset, ack.cookie), (0, None, None, None))
+
+        buf[4] = netlink.NLMSG_DONE
+        self.assertRaises(OSError, mnl.Nlmsg(buf).get_ext_ack)
+
+
     # XXX: no assertion
     def _test_print(self):
         self.nlh.nlmsg_type = netlink.NLMSG_MIN_TYPE
@@ -257,5 +316,63 @@ class TestSuite(unittest.TestCase):
         b.stop()
 
 
+    def test_py_batches(self):
+        b = mnl.PyNlmsgBatch(301, 163) # bufsize, limit
+
+        # empty
+        self.assertEqual(b.size(), 0)
+        self.assertEqual(len(b.current_v()), 301)
+        self.assertEqual(len(b.head()), 0)
+        self.assertTrue(b.is_empty())
+
+        # make buf full
+        for i in range(1, 11):
+            nlh = b.put_header()
+            nlh.nlmsg_seq = i
+            self.assertTrue(b.next_batch())
+            self.assertEqual(b.size(), mnl.MNL_NLMSG_HDRLEN * i)
+            self.assertEqual(b.current(), mnl.MNL_NLMSG_HDRLEN * i)
+            self.assertEqual(len(b.current_v()), 301 - mnl.MNL_NLMSG_HDRLEN * i)
+            self.assertEqual(len(b.head()), mnl.MNL_NLMSG_HDRLEN * i)
+            self.assertFalse(b.is_empty())
+        # Nlmsg shares the buffer
+        shared = mnl.Nlmsg(b.head(), mnl.MNL_NLMSG_HDRLEN * 9)
+        self.assertEqual(shared.nlmsg_seq, 10)
+        shared.nlmsg_seq = 100
+        self.assertEqual(nlh.nlmsg_seq, 100)
+        nlh.nlmsg_seq = 10
+        self.assertEqual(shared.nlmsg_seq, 10)
+        del shared
+
+        # after full
+        nlh = b.put_header()
+        nlh.nlmsg_seq = 11
+        self.assertEqual(b.current_nlmsg().nlmsg_seq, 11)
+        self.assertFalse(b.next_batch())
+        self.assertEqual(b.size(), mnl.MNL_NLMSG_HDRLEN * i)
+        self.assertEqual(len(b.current_v()), 301 - mnl.MNL_NLMSG_HDRLEN * i)
+        self.assertEqual(len(b.head()), mnl.MNL_NLMSG_HDRLEN * i)
+
+        # reset, the last one is moved to the head
+        b.reset()
+        self.assertEqual(b.size(), mnl.MNL_NLMSG_HDRLEN)
+        self.assertEqual(len(b.current_v()), 301 - mnl.MNL_NLMSG_HDRLEN)
+        self.assertEqual(mnl.Nlmsg(bytearray(b.head())).nlmsg_seq, 11)
+        self.assertFalse(b.is_empty())
+
+        # reset again, buf will empty after next
+        b.put_header()
+        b.next_batch()
+        b.reset()
+        self.assertTrue(b.is_empty())
+
+        # written by current_v()
+        v = b.current_v()
+        v[:mnl.MNL_NLMSG_HDRLEN] = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN).marshal_binary()
+        self.assertTrue(b.next_batch())
+        self.assertEqual(b.size(), mnl.MNL_NLMSG_HDRLEN)
+        b.stop()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,183 @@
+#! /usr/bin/env python
+# -*- coding:utf-8 -*-
+
+from __future__ import print_function
+
+import sys, unittest, errno, ctypes, gc
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+def validate_errno(f, *args):
+    try:
+        f(*args)
+    except OSError as e:
+        return e.errno
+    return 0
+
+
+class TestSuite(unittest.TestCase):
+    def _nlmsg(self, *attrs):
+        nlh = mnl.Nlmsg.put_new_header(512)
+        nlh.nlmsg_type = netlink.NLMSG_MIN_TYPE
+        nlh.put_extra_header(4)
+        for t, d in attrs:
+            nlh.put(t, (ctypes.c_ubyte * len(d)).from_buffer_copy(d))
+        return nlh
+
+    def test_policy_compile(self):
+        self.assertRaises(OSError, mnl.Policy, 3, {4: mnl.MNL_TYPE_U8})
+        self.assertRaises(OSError, mnl.Policy, 3, {1: mnl.MNL_TYPE_MAX})
+        self.assertRaises(OSError, mnl.Policy, 3, {1: (mnl.MNL_TYPE_U32, 0, mnl.Policy(1, {}))})
+
+    def test_same_as_validate(self):
+        payloads = (b"", b"\1", b"\1\0", b"\1\2\3\0", b"\1\0\0\0\1\2\3\0", b"\1\2\3\4\5\6\7\x08\x09")
+        for data_type in range(mnl.MNL_TYPE_MAX):
+            for exp_len in (None, 1, 4):
+                if exp_len is None:
+                    rule = data_type
+                else:
+                    rule = (data_type, exp_len)
+                policy = mnl.Policy(1, {1: rule})
+                for payload in payloads:
+                    nlh = self._nlmsg((1, payload))
+                    attr = next(nlh.attributes(4))
+                    if exp_len is None:
+                        en = validate_errno(attr.validate, data_type)
+                    else:
+                        en = validate_errno(attr.validate2, data_type, exp_len)
+                    self.assertEqual(validate_errno(nlh.parse_policy, 4, policy), en,
+                                     "type: %d, exp_len: %r, payload: %r" % (data_type, exp_len, payload))
+
+    def test_parse_policy(self):
+        ip_policy = mnl.Policy(3, {1: mnl.MNL_TYPE_U32,
+                                   2: (mnl.MNL_TYPE_BINARY, 16)})
+        policy = mnl.Policy(4, {1: mnl.MNL_TYPE_U8,
+                                2: mnl.MNL_TYPE_NUL_STRING,
+                                3: (mnl.MNL_TYPE_NESTED, 0, ip_policy)})
+        nlh = mnl.Nlmsg.put_new_header(512)
+        nlh.put_extra_header(4)
+        nlh.put_u8(1, 7)
+        nlh.put_strz(2, b"abc")
+        nest = nlh.nest_start(3)
+        nlh.put_u32(1, 0x01020304)
+        nlh.put_u32(3, 1)		# no rule
+        nlh.put_u32(5, 1)		# ignored
+        nlh.nest_end(nest)
+        nlh.put_u32(4, 2)
+        nlh.put_u32(9, 2)		# ignored
+
+        tb = nlh.parse_policy(4, policy)
+        self.assertEqual(len(tb), 5)
+        self.assertFalse(0 in tb)
+        self.assertFalse(9 in tb)
+        self.assertEqual(tb[1].get_u8(), 7)
+        self.assertEqual(tb[2].get_str(), b"abc")
+        self.assertEqual(tb[4].get_u32(), 2)
+        self.assertEqual(tb.get(0), None)
+        self.assertEqual(tb.get(9, 1), 1)
+        self.assertEqual(tb.nested(1), None)
+        ntb = tb.nested(3)
+        self.assertEqual(len(ntb), 4)
+        self.assertEqual(ntb[1].get_u32(), 0x01020304)
+        self.assertFalse(2 in ntb)
+        self.assertEqual(ntb[3].get_u32(), 1)
+
+        # views
+        buf = nlh.marshal_binary()
+        vtb = mnl.NlmsgView(buf).parse_policy(4, policy)
+        self.assertEqual([a and a.get_len() for a in vtb.attrs],
+                         [a and a.get_len() for a in tb.attrs])
+        ntb = vtb[3].parse_policy(ip_policy)
+        self.assertEqual(ntb[1].get_u32(), 0x01020304)
+
+        # nested validation error
+        buf[mnl.MNL_NLMSG_HDRLEN + 4 + 8 + 8 + 4] = 6 # nla_len of the first nested, u32
+        self.assertEqual(validate_errno(mnl.NlmsgView(buf).parse_policy, 4, policy), errno.ERANGE)
+
+    def test_parse_policy_keeps_buffer(self):
+        policy = mnl.Policy(1, {1: mnl.MNL_TYPE_U32})
+        def parse():
+            nlh = mnl.Nlmsg.put_new_header(64)
+            nlh.put_u32(1, 0x11223344)
+            return nlh.parse_policy(0, policy)
+        tb = parse()
+        gc.collect()
+        # overwrite freed memory, if any
+        junk = [bytearray(b"\xee" * 64) for i in range(64)]
+        self.assertEqual(tb.get_u32(1), 0x11223344)
+
+    def test_attr_table(self):
+        nested_policy = mnl.Policy(2, {1: mnl.MNL_TYPE_U32})
+        policy = mnl.Policy(6, {1: mnl.MNL_TYPE_U8,
+                                2: mnl.MNL_TYPE_U16,
+                                3: (mnl.MNL_TYPE_NESTED, 0, nested_policy),
+                                4: mnl.MNL_TYPE_U64,
+                                5: mnl.MNL_TYPE_FLAG})
+
+        nlh = mnl.Nlmsg.put_new_header(512)
+        nlh.put_u8(1, 1)
+        nlh.put_u16(2, 2)
+        nest = nlh.nest_start(3)
+        nlh.put_u32(1, 3)
+        nlh.nest_end(nest)
+        nlh.put_u64(4, 4)
+        nlh.put(5, (ctypes.c_ubyte * 0)())
+        nlh.put_strz(6, b"six")
+
+        tb = mnl.AttrTable(6)
+        self.assertTrue(nlh.parse_policy(0, policy, tb) is tb)
+        self.assertEqual(tb.get_u8(1), 1)
+        self.assertEqual(tb.get_u16(2), 2)
+        ntb = tb.nested(3)
+        self.assertEqual(ntb.get_u32(1), 3)
+        self.assertEqual(tb.get_u64(4), 4)
+        self.assertTrue(tb.get_flag(5))
+        self.assertEqual(tb.get_str(6), b"six")
+        self.assertEqual(ntb.get_u32(2, 0), 0)
+
+        # reuse
+        nlh = mnl.Nlmsg.put_new_header(512)
+        nlh.put_u16(2, 22)
+        self.assertTrue(nlh.parse_policy(0, policy, tb) is tb)
+        self.assertEqual(tb.get_u16(2), 22)
+        self.assertEqual(tb.get_u8(1), None)
+        self.assertEqual(tb.get_u8(1, -1), -1)
+        self.assertFalse(tb.get_flag(5))
+        self.assertEqual(tb.nested(3), None)
+
+        nlh = mnl.Nlmsg.put_new_header(512)
+        nest = nlh.nest_start(3)
+        nlh.put_u32(2, 33)
+        nlh.nest_end(nest)
+        nlh.parse_policy(0, policy, tb)
+        self.assertTrue(tb.nested(3) is ntb)
+        self.assertFalse(1 in ntb)
+        self.assertEqual(ntb.get_u32(2), 33)
+
+        tb.clear()
+        self.assertEqual(tb.attrs, [None] * 7)
+        self.assertEqual(len(tb), 7)
+
+        # filled by attr_cb
+        @mnl.attr_cb
+        def cb(attr, tb):
+            try:
+                attr.type_valid(6)
+            except OSError:
+                return mnl.MNL_CB_OK
+            tb[attr.get_type()] = attr
+            return mnl.MNL_CB_OK
+
+        nlh = mnl.Nlmsg.put_new_header(512)
+        nlh.put_u32(4, 44)
+        nlh.put_u32(7, 77)
+        nlh.parse(0, cb, tb)
+        self.assertTrue(4 in tb)
+        self.assertFalse(7 in tb)
+        self.assertEqual(tb.get_u32(4), 44)
+
+
+if __name__ == '__main__':
+    unittest.main()
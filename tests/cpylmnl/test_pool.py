@@ -0,0 +1,123 @@
+#! /usr/bin/env python
+# -*- coding:utf-8 -*-
+
+from __future__ import print_function
+
+import sys, unittest, errno, threading, time
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+def noop():
+    nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+    nlh.nlmsg_type = netlink.NLMSG_NOOP
+    nlh.nlmsg_flags = netlink.NLM_F_ACK
+    return nlh
+
+
+class TestSuite(unittest.TestCase):
+    def setUp(self):
+        self.pool = mnl.SocketPool(netlink.NETLINK_ROUTE, maxsize=2)
+
+    def tearDown(self):
+        self.pool.close()
+
+
+    def test_reuse(self):
+        with self.pool.socket() as nl:
+            portid = nl.get_portid()
+            self.assertNotEqual(portid, 0)
+            nl.send_nlmsg(noop())
+            nl.recv(256)
+        with self.pool.socket() as nl:
+            self.assertEqual(nl.get_portid(), portid)
+        stats = self.pool.stats()
+        self.assertEqual(stats["size"], 1)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["discarded"], 0)
+
+
+    def test_discard(self):
+        # reply left in the queue
+        with self.pool.socket() as nl:
+            nl.send_nlmsg(noop())
+        self.assertEqual(self.pool.stats()["discarded"], 1)
+        self.assertEqual(self.pool.stats()["size"], 0)
+
+        try:
+            with self.pool.socket() as nl:
+                raise OSError(errno.ENOBUFS, "test")
+        except OSError:
+            pass
+        self.assertEqual(self.pool.stats()["discarded"], 2)
+
+        # other errors keep the socket
+        try:
+            with self.pool.socket() as nl:
+                raise OSError(errno.EINVAL, "test")
+        except OSError:
+            pass
+        self.assertEqual(self.pool.stats()["discarded"], 2)
+        self.assertEqual(self.pool.stats()["idle"], 1)
+
+
+    def test_wait(self):
+        nl1 = self.pool.acquire()
+        nl2 = self.pool.acquire()
+        try:
+            self.pool.acquire(0.01)
+        except OSError as e:
+            self.assertEqual(e.errno, errno.ETIMEDOUT)
+        else:
+            self.fail("not raise OSError")
+
+        ret = []
+        def worker():
+            with self.pool.socket() as nl:
+                ret.append(nl)
+        t = threading.Thread(target=worker)
+        t.start()
+        time.sleep(0.05)
+        self.assertEqual(ret, [])
+        self.pool.release(nl1)
+        t.join()
+        self.assertTrue(ret[0] is nl1)
+        self.pool.release(nl2)
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["waits"], 2)
+        self.assertTrue(stats["wait_time"] >= 0.05)
+        self.assertTrue(stats["max_wait"] >= 0.04)
+        self.assertEqual(stats["size"], 2)
+
+
+    def test_threads(self):
+        errors = []
+        def worker():
+            try:
+                for i in range(100):
+                    with self.pool.socket() as nl:
+                        nl.send_nlmsg(noop())
+                        buf = nl.recv(256)
+                        self.assertEqual(mnl.Nlmsg(buf).nlmsg_type, netlink.NLMSG_ERROR)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=worker) for i in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertEqual(errors, [])
+        self.assertTrue(self.pool.stats()["size"] <= 2)
+
+
+    def test_close(self):
+        nl = self.pool.acquire()
+        self.pool.close()
+        self.assertRaises(OSError, self.pool.acquire)
+        self.pool.release(nl)
+        self.assertEqual(self.pool.stats()["size"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -97,6 +97,347 @@ class TestSuite(unittest.TestCase):
         self.assertEquals(nle.msg.nlmsg_seq, 1234)
 
 
+    def test_recv_timeout(self):
+        self.nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        buf = bytearray(256)
+        self.assertEqual(self.nl.recv_into(buf, 0), None)
+        self.assertEqual(self.nl.recv_into(buf, 0.01), None)
+
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+        nlh.nlmsg_type = netlink.NLMSG_NOOP
+        nlh.nlmsg_flags = netlink.NLM_F_ACK
+        self.nl.send_nlmsg(nlh)
+        self.assertEqual(self.nl.recv_into(buf, 1), 36)
+
+        self.nl.send_nlmsg(nlh)
+        try:
+            self.nl.recv_into(bytearray(16), 1)
+        except OSError as e:
+            self.assertEqual(e.errno, errno.ENOSPC)
+        else:
+            self.fail("not raise OSError")
+
+
+    def test_drain(self):
+        self.nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        self.assertEqual(list(self.nl.drain()), [])
+
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+        nlh.nlmsg_type = netlink.NLMSG_NOOP
+        nlh.nlmsg_flags = netlink.NLM_F_ACK
+        for seq in range(1234, 1237):
+            nlh.nlmsg_seq = seq
+            self.nl.send_nlmsg(nlh)
+
+        seq = 1234
+        for buf in self.nl.drain():
+            self.assertEqual(mnl.cb_run(buf, seq, self.nl.get_portid(), None, None), mnl.MNL_CB_STOP)
+            seq += 1
+        self.assertEqual(seq, 1237)
+
+
+    def test_dispatch_groups(self):
+        sender = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, netlink.NETLINK_USERSOCK)
+        sender.bind((0, 0))
+        with mnl.Socket(netlink.NETLINK_USERSOCK) as nl:
+            nl.bind(1 << 0 | 1 << 1, mnl.MNL_SOCKET_AUTOPID)
+            for seq, dst in ((1, (0, 1 << 1)), (2, (0, 1 << 0)), (3, (nl.get_portid(), 0))):
+                try:
+                    sender.sendto(struct.pack("IHHII", 16, netlink.NLMSG_NOOP, 0, seq, 0), dst)
+                except OSError as e:
+                    # unicast part to port 0
+                    self.assertEqual(e.errno, errno.ECONNREFUSED)
+
+            ret = []
+            def handler(buf, group):
+                ret.append((mnl.Nlmsg(buf).nlmsg_seq, group))
+                return group
+
+            handlers = {1: handler, 2: handler}
+            self.assertEqual(nl.dispatch_groups(handlers), 2)
+            self.assertEqual(nl.dispatch_groups(handlers), 1)
+            self.assertEqual(nl.dispatch_groups(handlers), None)
+            self.assertEqual(ret, [(1, 2), (2, 1)])
+
+            sender.sendto(struct.pack("IHHII", 16, netlink.NLMSG_NOOP, 0, 4, 0), (nl.get_portid(), 0))
+            self.assertEqual(nl.dispatch_groups(handlers, handler), 0)
+            self.assertEqual(ret[-1], (4, 0))
+        sender.close()
+
+
+    def test_send_nlmsg_offset(self):
+        self.nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+
+        # messages in a buffer, and grown after sent
+        buf = bytearray(256)
+        nlh = mnl.Nlmsg(buf, 64)
+        nlh.put_header()
+        nlh.nlmsg_type = netlink.NLMSG_NOOP
+        nlh.nlmsg_flags = netlink.NLM_F_ACK
+        nlh.nlmsg_seq = 1234
+        self.assertEqual(self.nl.send_nlmsg(nlh), mnl.MNL_NLMSG_HDRLEN)
+        nlh.nlmsg_seq = 1235
+        nlh.put_u32(1, 1)
+        self.assertEqual(self.nl.send_nlmsg(nlh), mnl.MNL_NLMSG_HDRLEN + 8)
+        for seq in (1234, 1235):
+            buf = self.nl.recv(256)
+            self.assertEqual(mnl.cb_run(buf, seq, self.nl.get_portid(), None, None), mnl.MNL_CB_STOP)
+
+
+    def test_send_many(self):
+        self.nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+
+        msgs = []
+        for seq in range(1234, 1237):
+            nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+            nlh.nlmsg_type = netlink.NLMSG_NOOP
+            nlh.nlmsg_flags = netlink.NLM_F_ACK
+            nlh.nlmsg_seq = seq
+            msgs.append(nlh)
+
+        self.assertEqual(self.nl.send_many(msgs), mnl.MNL_NLMSG_HDRLEN * 3)
+        for seq in range(1234, 1237):
+            buf = self.nl.recv(256)
+            self.assertEqual(mnl.cb_run(buf, seq, self.nl.get_portid(), None, None), mnl.MNL_CB_STOP)
+
+        self.assertEqual(self.nl.send_mmsg(msgs), 3)
+        for seq in range(1234, 1237):
+            buf = self.nl.recv(256)
+            self.assertEqual(mnl.cb_run(buf, seq, self.nl.get_portid(), None, None), mnl.MNL_CB_STOP)
+
+        # vectors are reused
+        self.assertEqual(self.nl.send_mmsg(msgs[:2]), 2)
+        for seq in range(1234, 1236):
+            buf = self.nl.recv(256)
+            self.assertEqual(mnl.cb_run(buf, seq, self.nl.get_portid(), None, None), mnl.MNL_CB_STOP)
+
+        # larger than the send buffer, EMSGSIZE
+        size = 1 << 22
+        big = mnl.Nlmsg.put_new_header(size)
+        big.nlmsg_len = size
+        with self.assertRaises(OSError) as cm:
+            self.nl.send_mmsg([msgs[0], big, msgs[2]])
+        self.assertEqual(cm.exception.errno, errno.EMSGSIZE)
+        self.assertEqual(cm.exception.sent, 1)
+        buf = self.nl.recv(256)
+        self.assertEqual(mnl.cb_run(buf, 1234, self.nl.get_portid(), None, None), mnl.MNL_CB_STOP)
+
+
+    def test_recv_many(self):
+        self.nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+        nlh.nlmsg_type = netlink.NLMSG_NOOP
+        nlh.nlmsg_flags = netlink.NLM_F_ACK
+        for seq in range(1234, 1237):
+            nlh.nlmsg_seq = seq
+            self.nl.send_nlmsg(nlh)
+
+        ret = self.nl.recv_many(8)
+        self.assertEqual(len(ret), 3)
+        for i, (buf, n) in enumerate(ret):
+            self.assertEqual(n, 36)
+            self.assertEqual(len(buf), n)
+            nlr = mnl.Nlmsg(buf)
+            self.assertEqual(nlr.nlmsg_type, netlink.NLMSG_ERROR)
+            self.assertEqual(nlr.nlmsg_seq, 1234 + i)
+            self.assertEqual(mnl.cb_run(buf, 1234 + i, self.nl.get_portid(), None, None), mnl.MNL_CB_STOP)
+
+        # too small buffer for the first, the second is not lost
+        big = mnl.Nlmsg.put_new_header(64)
+        big.nlmsg_type = 0xffff
+        big.nlmsg_flags = netlink.NLM_F_REQUEST | netlink.NLM_F_ACK
+        big.nlmsg_len = 64
+        self.nl.send_nlmsg(big) # error ACK has the whole request
+        self.nl.send_nlmsg(nlh)
+        ret = self.nl.recv_many(2, 40)
+        self.assertEqual(len(ret), 2)
+        buf, n = ret[0]
+        self.assertEqual(n, 84)
+        self.assertEqual(len(buf), 40)
+        buf, n = ret[1]
+        self.assertEqual(n, 36)
+        self.assertEqual(len(buf), 36)
+        self.assertEqual(mnl.cb_run(buf, 1236, self.nl.get_portid(), None, None), mnl.MNL_CB_STOP)
+
+
+    def test_recv_pooled(self):
+        self.nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        self.nl.set_recv_pool(mnl.RecvBufferPool(1, 256))
+
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+        nlh.nlmsg_type = netlink.NLMSG_NOOP
+        nlh.nlmsg_flags = netlink.NLM_F_ACK
+        nlh.nlmsg_seq = 1234
+        self.nl.send_nlmsg(nlh)
+        self.nl.send_nlmsg(nlh)
+
+        with self.nl.recv_pooled() as rb:
+            self.assertEqual(len(rb), 36)
+            self.assertEqual(mnl.cb_run(rb.view, 1234, 0, None, None), mnl.MNL_CB_STOP)
+            # all lent, a new buffer is added
+            rb2 = self.nl.recv_pooled()
+            self.assertEqual(self.nl._recv_pool.available(), 0)
+            view = rb.view
+        self.assertRaises(ValueError, view.tobytes)
+        self.assertEqual(self.nl._recv_pool.available(), 1)
+        self.assertEqual(bytes(rb2.view[:4]), struct.pack("I", 36))
+        rb2.release()
+        rb2.release() # no effect
+        self.assertEqual(self.nl._recv_pool.available(), 2)
+        self.assertEqual(len(self.nl._recv_pool), 2)
+
+
+    def test_recv_pooled_limit(self):
+        self.nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        self.nl.set_recv_pool(mnl.RecvBufferPool(1, 256, 2))
+
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+        nlh.nlmsg_type = netlink.NLMSG_NOOP
+        nlh.nlmsg_flags = netlink.NLM_F_ACK
+        for i in range(3):
+            self.nl.send_nlmsg(nlh)
+
+        rb = self.nl.recv_pooled()
+        rb2 = self.nl.recv_pooled()
+        try:
+            self.nl.recv_pooled()
+        except OSError as e:
+            self.assertEqual(e.errno, errno.ENOMEM)
+        else:
+            self.fail("not raise OSError")
+        self.assertEqual(len(self.nl._recv_pool), 2)
+
+        # referred storage is not returned to the pool
+        c_buf = (ctypes.c_ubyte * len(rb)).from_buffer(rb.view)
+        self.assertRaises(BufferError, rb.release)
+        self.assertEqual(self.nl._recv_pool.available(), 0)
+        del c_buf
+        rb.release()
+        self.assertEqual(self.nl._recv_pool.available(), 1)
+        hdr = rb2.view[:4]
+        self.assertRaises(BufferError, rb2.release)
+        self.assertEqual(bytes(hdr), struct.pack("I", 36))
+        del hdr
+        rb2.release()
+        # the datagram not received at ENOMEM
+        with self.nl.recv_pooled() as rb:
+            self.assertEqual(len(rb), 36)
+
+
+    def test_rcvbuf(self):
+        self.nl.set_rcvbuf(65536)
+        self.assertEqual(self.nl.get_rcvbuf(), 65536 * 2)
+        self.nl.set_rcvbuf(65536 * 2, True) # requires CAP_NET_ADMIN
+        self.assertEqual(self.nl.get_rcvbuf(), 65536 * 4)
+
+
+    def test_overrun(self):
+        sender = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, netlink.NETLINK_USERSOCK)
+        sender.bind((0, 0))
+        payload = struct.pack("IHHII", 16, netlink.NLMSG_NOOP, 0, 0, 0)
+        with mnl.Socket(netlink.NETLINK_USERSOCK) as nl:
+            # unicast from user space blocks the sender instead of overrun,
+            # use multicast. ECONNREFUSED is for unicast part to port 0
+            nl.bind(1, mnl.MNL_SOCKET_AUTOPID)
+            nl.set_rcvbuf(4096)
+            nl.set_rcvbuf_auto(16384)
+            for i in range(256):
+                try:
+                    sender.sendto(payload, (0, 1))
+                except OSError as e:
+                    self.assertEqual(e.errno, errno.ECONNREFUSED)
+            stats = nl.overrun_stats()
+            self.assertEqual(stats["enobufs"], 0)
+            self.assertTrue(stats["lost"] > 0)
+
+            try:
+                nl.recv(256)
+            except OSError as e:
+                self.assertEqual(e.errno, errno.ENOBUFS)
+            else:
+                self.fail("not raise OSError")
+            stats = nl.overrun_stats()
+            self.assertEqual(stats["enobufs"], 1)
+            self.assertEqual(stats["rcvbuf"], 8192 * 2)
+            self.assertEqual(stats["grown"], 1)
+
+            nl.reset_overrun_stats()
+            stats = nl.overrun_stats()
+            self.assertEqual(stats["enobufs"], 0)
+            self.assertEqual(stats["lost"], 0)
+            self.assertEqual(stats["grown"], 0)
+        sender.close()
+
+
+    def test_overrun_not_grown(self):
+        sender = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, netlink.NETLINK_USERSOCK)
+        sender.bind((0, 0))
+        payload = struct.pack("IHHII", 16, netlink.NLMSG_NOOP, 0, 0, 0)
+
+        def eperm(size, force=False):
+            raise OSError(errno.EPERM, "Operation not permitted")
+
+        def capped(size, force=False):
+            pass
+
+        for set_rcvbuf in (eperm, capped):
+            with mnl.Socket(netlink.NETLINK_USERSOCK) as nl:
+                nl.bind(1, mnl.MNL_SOCKET_AUTOPID)
+                nl.set_rcvbuf(4096)
+                nl.set_rcvbuf_auto(16384, True)
+                nl.set_rcvbuf = set_rcvbuf
+                for i in range(256):
+                    try:
+                        sender.sendto(payload, (0, 1))
+                    except OSError as e:
+                        self.assertEqual(e.errno, errno.ECONNREFUSED)
+                # ENOBUFS, not the error of growing
+                with self.assertRaises(OSError) as cm:
+                    nl.recv(256)
+                self.assertEqual(cm.exception.errno, errno.ENOBUFS)
+                stats = nl.overrun_stats()
+                self.assertEqual(stats["enobufs"], 1)
+                self.assertEqual(stats["rcvbuf"], 4096 * 2)
+                self.assertEqual(stats["grown"], 0)
+        sender.close()
+
+
+    def test_stats(self):
+        self.assertEqual(self.nl.stats(), None)
+        self.nl.enable_stats()
+        self.nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+        nlh.nlmsg_type = netlink.NLMSG_NOOP
+        nlh.nlmsg_flags = netlink.NLM_F_ACK
+        self.nl.send_nlmsg(nlh)
+        self.nl.send_many([nlh, nlh])
+        buf = bytearray(256)
+        for i in range(3):
+            self.nl.recv_into(buf)
+        self.assertEqual(self.nl.recv_into(buf, 0), None)
+        self.assertEqual(self.nl.recv_into(buf, 0.01), None) # timed out
+
+        stats = self.nl.stats()
+        self.assertEqual(stats["tx_bytes"], 16 * 3)
+        self.assertEqual(stats["tx_datagrams"], 2)
+        self.assertEqual(stats["tx_syscalls"], 2)
+        self.assertEqual(stats["rx_bytes"], 36 * 3)
+        self.assertEqual(stats["rx_datagrams"], 3)
+        self.assertEqual(stats["rx_syscalls"], 5)
+        self.assertEqual(stats["rx_messages"], 3)
+        self.assertEqual(stats["msgs_per_datagram"], 1.0)
+        self.assertEqual(stats["max_datagram"], 36)
+        self.assertEqual(stats["eagain"], 2)
+        self.assertEqual(stats["enobufs"], 0)
+
+        self.nl.reset_stats()
+        self.assertEqual(set(self.nl.stats().values()), set([0]))
+        self.nl.enable_stats(False)
+        self.assertEqual(self.nl.stats(), None)
+
+
     def test_opt(self):
         on = struct.pack("i", 1)
         self.nl.setsockopt(netlink.NETLINK_BROADCAST_ERROR, on)
@@ -119,5 +460,29 @@ class TestSuiteFd(TestSuite):
         self.kernel_version = tuple([int(i) for i in m.groups()])
 
 
+class TestSuitePython(TestSuite):
+    """Same as TestSuite except python socket backend
+    """
+    def setUp(self):
+        self.nl = mnl.Socket(netlink.NETLINK_NETFILTER, backend="python")
+        m = re.search('([0-9]+)\.([0-9]+)\.([0-9]+)', platform.release())
+        if not m: self.fail("sorry, could not get kernel version")
+        self.kernel_version = tuple([int(i) for i in m.groups()])
+
+    def test_backend(self):
+        self.assertRaises(ValueError, mnl.Socket, netlink.NETLINK_NETFILTER, 0, "unknown")
+
+
+class TestSuitePythonFd(TestSuite):
+    """Same as TestSuite except python socket backend from socket object
+    """
+    def setUp(self):
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, netlink.NETLINK_NETFILTER)
+        self.nl = mnl.Socket(sock, backend="python")
+        m = re.search('([0-9]+)\.([0-9]+)\.([0-9]+)', platform.release())
+        if not m: self.fail("sorry, could not get kernel version")
+        self.kernel_version = tuple([int(i) for i in m.groups()])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,107 @@
+#! /usr/bin/env python
+# -*- coding:utf-8 -*-
+
+from __future__ import print_function
+
+import sys, unittest, errno, struct, socket
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl.linux.netfilter.nfnetlinkh as nfnl
+import cpylmnl.linux.netfilter.nfnetlink_queueh as nfqnl
+import cpylmnl.linux.netfilterh as nf
+import cpylmnl as mnl
+
+
+def build_verdict(buf, packet_id, queue_num, verd, seq=0):
+    # same as nfq_build_verdict() in examples/netfilter/nf-queue.py
+    nlh = mnl.Nlmsg(buf)
+    nlh.put_header()
+    nlh.nlmsg_type = (nfnl.NFNL_SUBSYS_QUEUE << 8) | nfqnl.NFQNL_MSG_VERDICT
+    nlh.nlmsg_flags = netlink.NLM_F_REQUEST
+    nlh.nlmsg_seq = seq
+    nfg = nlh.put_extra_header_as(nfnl.Nfgenmsg)
+    nfg.nfgen_family = socket.AF_UNSPEC
+    nfg.version = nfnl.NFNETLINK_V0
+    nfg.res_id = socket.htons(queue_num)
+
+    vh = nfqnl.NfqnlMsgVerdictHdr()
+    vh.verdict = socket.htonl(verd)
+    vh.id = socket.htonl(packet_id)
+    nlh.put(nfqnl.NFQA_VERDICT_HDR, vh)
+    nlh.put_u32(nfqnl.NFQA_MARK, 0)
+    return nlh
+
+
+class TestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpl = mnl.MessageTemplate(build_verdict(bytearray(256), 0, 0, nf.NF_DROP))
+        self.tmpl.add_field("queue_num", mnl.MNL_NLMSG_HDRLEN + nfnl.Nfgenmsg.res_id.offset, ">H")
+        off = self.tmpl.attr_offset(nfnl.Nfgenmsg.csize(), nfqnl.NFQA_VERDICT_HDR)
+        self.tmpl.add_field("verdict", off + nfqnl.NfqnlMsgVerdictHdr.verdict.offset, ">I")
+        self.tmpl.add_field("id", off + nfqnl.NfqnlMsgVerdictHdr.id.offset, ">I")
+
+    def test_render_into(self):
+        nlh = build_verdict(bytearray(256), 0x12345678, 3, nf.NF_ACCEPT, seq=99)
+        expected = nlh.marshal_binary()
+        self.assertEqual(len(self.tmpl), len(expected))
+
+        buf = bytearray(b"\xff" * 512)
+        n = self.tmpl.render_into(buf, 8, seq=99, queue_num=3, verdict=nf.NF_ACCEPT, id=0x12345678)
+        self.assertEqual(n, len(expected))
+        self.assertEqual(buf[8:8 + n], expected)
+        self.assertEqual(buf[:8], b"\xff" * 8)
+        self.assertEqual(buf[8 + n:], b"\xff" * (512 - 8 - n))
+
+        # not specified fields are same as the original
+        msg = self.tmpl.render(id=1)
+        self.assertEqual(msg, build_verdict(bytearray(256), 1, 0, nf.NF_DROP).marshal_binary())
+
+        # into memoryview
+        mv = memoryview(buf)
+        self.tmpl.render_into(mv, 0, flags=netlink.NLM_F_REQUEST | netlink.NLM_F_ACK)
+        self.assertEqual(mnl.Nlmsg(buf).nlmsg_flags, netlink.NLM_F_REQUEST | netlink.NLM_F_ACK)
+
+    def test_errors(self):
+        with self.assertRaises(OSError) as cm:
+            self.tmpl.render_into(bytearray(len(self.tmpl) - 1))
+        self.assertEqual(cm.exception.errno, errno.ENOSPC)
+        with self.assertRaises(OSError) as cm:
+            self.tmpl.render_into(bytearray(len(self.tmpl)), 1)
+        self.assertEqual(cm.exception.errno, errno.ENOSPC)
+
+        with self.assertRaises(OSError) as cm:
+            self.tmpl.add_field("over", len(self.tmpl) - 2, "I")
+        self.assertEqual(cm.exception.errno, errno.EINVAL)
+
+        with self.assertRaises(OSError) as cm:
+            self.tmpl.attr_offset(nfnl.Nfgenmsg.csize(), nfqnl.NFQA_PAYLOAD)
+        self.assertEqual(cm.exception.errno, errno.ENOENT)
+
+        with self.assertRaises(OSError) as cm:
+            self.tmpl.attr_offset(nfnl.Nfgenmsg.csize())
+        self.assertEqual(cm.exception.errno, errno.EINVAL)
+
+        with self.assertRaises(OSError) as cm:
+            self.tmpl.render(unknown=1)
+        self.assertEqual(cm.exception.errno, errno.EINVAL)
+
+        self.assertRaises(struct.error, self.tmpl.render, queue_num=0x10000)
+
+    def test_attr_offset_nested(self):
+        nlh = mnl.Nlmsg.put_new_header(256)
+        nlh.put_u32(1, 1)
+        nest = nlh.nest_start(2)
+        nlh.put_u16(1, 2)
+        nlh.put_u32(3, 3)
+        nlh.nest_end(nest)
+        tmpl = mnl.MessageTemplate(nlh, {"a": (mnl.MNL_NLMSG_HDRLEN + mnl.MNL_ATTR_HDRLEN, "I")})
+        off = tmpl.attr_offset(0, 2, 3)
+        self.assertEqual(off, mnl.MNL_NLMSG_HDRLEN + 8 + 4 + 8 + 4)
+        tmpl.add_field("b", off, "I")
+        msg = tmpl.render(a=10, b=30)
+        self.assertEqual(struct.unpack_from("I", msg, mnl.MNL_NLMSG_HDRLEN + mnl.MNL_ATTR_HDRLEN)[0], 10)
+        self.assertEqual(struct.unpack_from("I", msg, off)[0], 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+#! /usr/bin/env python
+# -*- coding:utf-8 -*-
+
+from __future__ import print_function
+
+import sys, unittest, errno, socket, struct
+import ctypes
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl.linux.rtnetlinkh as rtnl
+import cpylmnl.linux.if_linkh as ifl
+import cpylmnl as mnl
+
+
+def noop(flags=netlink.NLM_F_ACK):
+    nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+    nlh.nlmsg_type = netlink.NLMSG_NOOP
+    nlh.nlmsg_flags = flags
+    return nlh
+
+
+def getlink():
+    nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
+    nlh.nlmsg_type = rtnl.RTM_GETLINK
+    nlh.nlmsg_flags = netlink.NLM_F_REQUEST | netlink.NLM_F_DUMP
+    rt = nlh.put_extra_header_as(rtnl.Rtgenmsg)
+    rt.rtgen_family = socket.AF_PACKET
+    return nlh
+
+
+class TestSuite(unittest.TestCase):
+    def setUp(self):
+        self.nl = mnl.Socket(netlink.NETLINK_ROUTE)
+        self.nl.bind(0, mnl.MNL_SOCKET_AUTOPID)
+        self.pipeline = mnl.Pipeline(self.nl)
+
+    def tearDown(self):
+        self.nl.close()
+
+
+    def test_submit(self):
+        txs = [self.pipeline.submit(noop()) for i in range(100)]
+        self.assertEqual(len(set(tx.seq for tx in txs)), 100)
+        self.assertEqual(self.pipeline.pending(), 100)
+        # reversed order
+        for tx in reversed(txs):
+            self.assertEqual(tx.result(), [])
+        self.assertEqual(self.pipeline.pending(), 0)
+
+
+    def test_submit_many(self):
+        txs = self.pipeline.submit_many([noop() for i in range(10)])
+        self.pipeline.wait_all()
+        for tx in txs:
+            self.assertTrue(tx.done())
+            self.assertEqual(tx.exception(), None)
+
+
+    def test_dump(self):
+        ack = self.pipeline.submit(noop())
+        dump = self.pipeline.submit(getlink())
+        ack2 = self.pipeline.submit(noop())
+        n = 0
+        for nlh in dump:
+            self.assertEqual(nlh.nlmsg_type, rtnl.RTM_NEWLINK)
+            self.assertEqual(nlh.nlmsg_seq, dump.seq)
+            n += 1
+        self.assertTrue(n > 0) # lo at least
+        self.assertEqual(len(dump.result()), n)
+        self.assertEqual(ack.result(), [])
+        self.assertEqual(ack2.result(), [])
+
+
+    def test_error(self):
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN)
+        nlh.nlmsg_type = 0xffff
+        nlh.nlmsg_flags = netlink.NLM_F_REQUEST | netlink.NLM_F_ACK
+        tx = self.pipeline.submit(nlh)
+        ok = self.pipeline.submit(noop())
+        self.assertEqual(ok.result(), [])
+        self.assertTrue(tx.done())
+        self.assertTrue(isinstance(tx.exception(), OSError))
+        self.assertRaises(OSError, tx.result)
+
+
+    def test_ext_ack(self):
+        self.nl.set_ext_ack()
+        self.nl.set_cap_ack()
+        nlh = mnl.Nlmsg.put_new_header(mnl.MNL_SOCKET_BUFFER_SIZE)
+        nlh.nlmsg_type = rtnl.RTM_NEWLINK
+        nlh.nlmsg_flags = netlink.NLM_F_REQUEST | netlink.NLM_F_ACK
+        nlh.put_extra_header_as(rtnl.Ifinfomsg)
+        # invalid length of u32 attribute
+        nlh.put_u8(ifl.IFLA_MTU, 1)
+        try:
+            self.pipeline.submit(nlh).result()
+        except OSError as e:
+            self.assertTrue(e.errno > 0)
+            self.assertTrue(e.ext_ack.message)
+            # the attribute just after ifinfomsg
+            self.assertEqual(e.ext_ack.offset, mnl.MNL_NLMSG_HDRLEN + mnl.MNL_ALIGN(ctypes.sizeof(rtnl.Ifinfomsg)))
+        else:
+            self.fail("not raise OSError")
+
+
+    def test_timeout(self):
+        # no reply without NLM_F_ACK
+        tx = self.pipeline.submit(noop(0))
+        try:
+            tx.result(0.05)
+        except OSError as e:
+            self.assertEqual(e.errno, errno.ETIMEDOUT)
+        else:
+            self.fail("not raise OSError")
+        self.assertFalse(tx.done())
+
+
+    def test_unmatched(self):
+        ret = []
+        pipeline = mnl.Pipeline(self.nl, unmatched=ret.append)
+        tx = pipeline.submit(noop())
+        nlh = noop()
+        nlh.nlmsg_seq = 0
+        self.nl.send_nlmsg(nlh)
+        self.assertEqual(tx.result(), [])
+        pipeline.process()
+        self.assertEqual(len(ret), 1)
+        self.assertEqual(ret[0].nlmsg_seq, 0)
+
+
+    def test_foreign_pid(self):
+        ret = []
+        pipeline = mnl.Pipeline(self.nl, unmatched=ret.append)
+        # registered, not sent
+        tx = pipeline._register(noop())
+        portid = self.nl.get_portid()
+
+        def error(pid):
+            nlh = mnl.Nlmsg.put_new_header(mnl.MNL_NLMSG_HDRLEN + 20)
+            nlh.nlmsg_type = netlink.NLMSG_ERROR
+            nlh.nlmsg_seq = tx.seq
+            nlh.nlmsg_pid = pid
+            nlh.put_extra_header(20)
+            buf = nlh.marshal_binary()
+            struct.pack_into("i", buf, mnl.MNL_NLMSG_HDRLEN, -errno.EPERM)
+            return buf
+
+        # from other port, not completed
+        pipeline.feed(error(portid + 1))
+        self.assertFalse(tx.done())
+        self.assertEqual(len(ret), 1)
+        self.assertEqual(ret[0].nlmsg_pid, portid + 1)
+
+        pipeline.feed(error(portid))
+        self.assertTrue(tx.done())
+        self.assertEqual(tx.exception().errno, errno.EPERM)
+
+        # from kernel
+        tx = pipeline._register(noop())
+        pipeline.feed(error(0))
+        self.assertEqual(tx.exception().errno, errno.EPERM)
+        self.assertEqual(len(ret), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+#! /usr/bin/env python
+# -*- coding:utf-8 -*-
+
+from __future__ import print_function
+
+import sys, unittest, struct, errno
+
+import cpylmnl.linux.netlinkh as netlink
+import cpylmnl as mnl
+
+
+def nlmsg(mtype, flags=netlink.NLM_F_REQUEST, seq=1, pid=1, payload=b""):
+    b = bytearray(struct.pack("IHHII", 16 + len(payload), mtype, flags, seq, pid) + payload)
+    b += b"\0" * (mnl.MNL_ALIGN(len(b)) - len(b))
+    return b
+
+
+class TestSuite(unittest.TestCase):
+    def setUp(self):
+        self.data = nlmsg(netlink.NLMSG_MIN_TYPE, payload=b"abcde") \
+                    + nlmsg(netlink.NLMSG_NOOP) \
+                    + nlmsg(0x7f)
+
+    def assertRaisesErrno(self, en, f, *args):
+        try:
+            f(*args)
+        except OSError as e:
+            self.assertEqual(e.errno, en)
+        else:
+            self.fail("not raise OSError")
+
+    def test_nlmsg_view(self):
+        v = mnl.NlmsgView(self.data)
+        self.assertEqual(v.nlmsg_len, 21)
+        self.assertEqual(v.nlmsg_type, netlink.NLMSG_MIN_TYPE)
+        self.assertEqual(v.nlmsg_flags, netlink.NLM_F_REQUEST)
+        self.assertEqual(v.nlmsg_seq, 1)
+        self.assertEqual(v.nlmsg_pid, 1)
+        self.assertEqual(v.get_payload_len(), 5)
+        self.assertEqual(bytes(v.get_payload()), b"abcde")
+        self.assertEqual(bytes(v.get_payload_offset(1)), b"e")
+
+        v = mnl.NlmsgView(self.data, 40)
+        self.assertEqual(v.nlmsg_type, 0x7f)
+        nlh = v.to_nlmsg()
+        self.assertEqual(nlh.nlmsg_type, 0x7f)
+        nlh.nlmsg_seq = 3
+        self.assertEqual(mnl.NlmsgView(self.data, 40).nlmsg_seq, 3)
+
+    def test_iter_messages(self):
+        it = mnl.iter_messages(self.data, 1, 1)
+        self.assertEqual([(m.offset, m.nlmsg_type) for m in it],
+                         [(0, netlink.NLMSG_MIN_TYPE), (40, 0x7f)])
+        self.assertEqual(it.ret, mnl.MNL_CB_OK)
+
+        # any seq and portid
+        self.assertEqual(len(list(mnl.iter_messages(self.data, 0, 0))), 2)
+        # truncated
+        self.assertEqual(len(list(mnl.iter_messages(self.data[:-1], 1, 1))), 1)
+        self.assertEqual(len(list(mnl.iter_messages(bytes(self.data), 1, 1))), 2)
+
+    def test_iter_messages_stop(self):
+        buf = self.data + nlmsg(netlink.NLMSG_DONE) + nlmsg(0x10)
+        it = mnl.iter_messages(buf, 1, 1)
+        self.assertEqual(len(list(it)), 2)
+        self.assertEqual(it.ret, mnl.MNL_CB_STOP)
+
+        ack = nlmsg(netlink.NLMSG_ERROR, payload=struct.pack("i", 0) + bytes(nlmsg(0x10)))
+        it = mnl.iter_messages(ack + nlmsg(0x10), 1, 1)
+        self.assertEqual(list(it), [])
+        self.assertEqual(it.ret, mnl.MNL_CB_STOP)
+
+    def test_iter_messages_error(self):
+        err = nlmsg(netlink.NLMSG_ERROR, payload=struct.pack("i", -errno.EPERM) + bytes(nlmsg(0x10)))
+        it = mnl.iter_messages(self.data + err, 1, 1)
+        self.assertEqual(next(it).nlmsg_type, netlink.NLMSG_MIN_TYPE)
+        self.assertEqual(next(it).nlmsg_type, 0x7f)
+        self.assertRaisesErrno(errno.EPERM, next, it)
+        self.assertRaisesErrno(errno.EBADMSG, list,
+                               mnl.iter_messages(nlmsg(netlink.NLMSG_ERROR), 1, 1))
+
+        self.assertRaisesErrno(errno.ESRCH, list,
+                               mnl.iter_messages(self.data + nlmsg(0xff, pid=2), 1, 1))
+        self.assertRaisesErrno(errno.EPROTO, list,
+                               mnl.iter_messages(self.data + nlmsg(0xff, seq=2), 1, 1))
+        self.assertRaisesErrno(errno.EINTR, list,
+                               mnl.iter_messages(self.data + nlmsg(0xff, flags=netlink.NLM_F_DUMP_INTR), 1, 1))
+
+    def test_same_as_cb_run(self):
+        buf = self.data + nlmsg(netlink.NLMSG_OVERRUN) + nlmsg(0x20) + nlmsg(netlink.NLMSG_DONE)
+        l = []
+        @mnl.nlmsg_cb
+        def cb(nlh, d):
+            d.append(nlh.nlmsg_type)
+            return mnl.MNL_CB_OK
+        ret = mnl.cb_run(buf, 1, 1, cb, l)
+        it = mnl.iter_messages(buf, 1, 1)
+        self.assertEqual([m.nlmsg_type for m in it], l)
+        self.assertEqual(it.ret, ret)
+
+    def _nlmsg_attrs(self):
+        nlh = mnl.Nlmsg.put_new_header(512)
+        nlh.nlmsg_type = 0x20
+        nlh.nlmsg_seq = 1
+        nlh.put_extra_header(4)
+        nlh.put_u8(1, 0x12)
+        nlh.put_u16(2, 0x1234)
+        nlh.put_u32(3, 0x12345678)
+        nlh.put_u64(4, 0x123456789abcdef0)
+        nlh.put_strz(5, b"abcde")
+        nest = nlh.nest_start(6)
+        nlh.put_str(7, b"xyz")
+        nlh.put_u32(8, 1)
+        nlh.nest_end(nest)
+        return nlh.marshal_binary()
+
+    def test_attr_view(self):
+        buf = self._nlmsg_attrs()
+        attrs = list(mnl.NlmsgView(buf).attributes(4))
+        self.assertEqual([a.get_type() for a in attrs], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(attrs[0].get_u8(), 0x12)
+        self.assertEqual(attrs[1].get_u16(), 0x1234)
+        self.assertEqual(attrs[2].get_u32(), 0x12345678)
+        self.assertEqual(attrs[2].get_len(), 8)
+        self.assertEqual(attrs[2].get_payload_len(), 4)
+        self.assertEqual(attrs[3].get_u64(), 0x123456789abcdef0)
+        self.assertEqual(attrs[4].get_str(), b"abcde")
+        self.assertEqual(bytes(attrs[4].get_payload()), b"abcde\0")
+        self.assertTrue(attrs[5].nla_type & netlink.NLA_F_NESTED)
+        nesteds = list(attrs[5].nesteds())
+        self.assertEqual([a.get_type() for a in nesteds], [7, 8])
+        self.assertEqual(nesteds[0].get_str(), b"xyz")
+        self.assertEqual(nesteds[1].get_u32(), 1)
+
+        self.assertEqual(attrs[2].get_be32(), 0x78563412)
+        self.assertEqual(attrs[1].get_be16(), 0x3412)
+        self.assertEqual(attrs[3].get_be64(), 0xf0debc9a78563412)
+        self.assertEqual(attrs[2].get_in_addr(), b"\x78\x56\x34\x12")
+
+        # same as ctypes Attr
+        nlh = mnl.Nlmsg(buf)
+        for a, v in zip(nlh.attributes(4), attrs):
+            self.assertEqual(a.get_type(), v.get_type())
+            self.assertEqual(a.get_len(), v.get_len())
+            self.assertEqual(bytes(a.get_payload_v()), bytes(v.get_payload()))
+        for a, v in zip(list(nlh.attributes(4))[:4], attrs):
+            self.assertEqual(a.get_be16(), v.get_be16())
+            self.assertEqual(a.get_be32(), v.get_be32())
+            self.assertEqual(a.get_in_addr(), v.get_in_addr())
+
+        payload = attrs[5].get_payload()
+        self.assertEqual([a.get_type() for a in mnl.payload_attribute_views(payload)], [7, 8])
+        # truncated
+        self.assertEqual(len(list(mnl.payload_attribute_views(payload[:-1]))), 1)
+
+    def test_view_cb(self):
+        buf = self._nlmsg_attrs()
+
+        @mnl.attr_view_cb
+        def attr_cb(a, d):
+            d.append((a.get_type(), a.get_len()))
+            return mnl.MNL_CB_OK
+
+        @mnl.nlmsg_view_cb
+        def data_cb(v, d):
+            self.assertTrue(isinstance(v, mnl.NlmsgView))
+            d.append(v.nlmsg_type)
+            d.append([a.get_type() for a in v.attributes(4)])
+            v.to_nlmsg().parse(4, attr_cb, d)
+            return mnl.MNL_CB_OK
+
+        l = []
+        self.assertEqual(mnl.cb_run(buf, 1, 0, data_cb, l), mnl.MNL_CB_OK)
+        self.assertEqual(l[:2], [0x20, [1, 2, 3, 4, 5, 6]])
+        self.assertEqual(l[2:], [(1, 5), (2, 6), (3, 8), (4, 12), (5, 10), (6, 20)])
+
+
+if __name__ == '__main__':
+    unittest.main()